@@ -48,7 +48,8 @@ CREATE TABLE Flights (
     departure_time TIMESTAMP NOT NULL,
     arrival_time TIMESTAMP NOT NULL,
     number_seats INT NOT NULL,
-    price DECIMAL(10, 2) NOT NULL
+    price DECIMAL(10, 2) NOT NULL,
+    seat_map BIT VARYING
 );
 COMMENT ON TABLE Flights IS 'Информация о рейсах';
 COMMENT ON COLUMN Flights.flight_id IS 'Уникальный идентификатор рейса';
@@ -59,6 +60,7 @@ COMMENT ON COLUMN Flights.departure_time IS 'Время отправления 
 COMMENT ON COLUMN Flights.arrival_time IS 'Время прибытия рейса';
 COMMENT ON COLUMN Flights.number_seats IS 'Кол-во мест';
 COMMENT ON COLUMN Flights.price IS 'Цена билета на рейс';
+COMMENT ON COLUMN Flights.seat_map IS 'Карта мест: бит i = 1 - место i + 1 занято';
 
 -- Таблица для хранения информации о бронированиях
 CREATE TABLE Bookings (
@@ -66,7 +68,8 @@ CREATE TABLE Bookings (
     user_id INT REFERENCES Users(user_id),
     flight_id INT REFERENCES Flights(flight_id),
     booking_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    status VARCHAR(100) NOT NULL
+    status VARCHAR(100) NOT NULL,
+    seat INT
 );
 COMMENT ON TABLE Bookings IS 'Информация о бронированиях рейсов';
 COMMENT ON COLUMN Bookings.booking_id IS 'Уникальный идентификатор бронирования';
@@ -74,6 +77,7 @@ COMMENT ON COLUMN Bookings.user_id IS 'Идентификатор пользов
 COMMENT ON COLUMN Bookings.flight_id IS 'Идентификатор рейса, который был забронирован';
 COMMENT ON COLUMN Bookings.booking_time IS 'Время, когда было сделано бронирование';
 COMMENT ON COLUMN Bookings.status IS 'Статус бронирования (например, подтверждено, ожидает)';
+COMMENT ON COLUMN Bookings.seat IS 'Номер места на рейсе';
 
 -- Таблица для хранения отзывов о рейсах
 CREATE TABLE Reviews (
@@ -106,47 +110,69 @@ COMMENT ON COLUMN Payments.payment_date IS 'Дата и время, когда 
 COMMENT ON COLUMN Payments.payment_method IS 'Способ оплаты (например, кредитная карта, PayPal)';
 
 
-CREATE VIEW flight_details AS
-SELECT 
-    f.flight_id,
-    a.name AS airline_name,
-    dep.name AS departure_airport_name,
-    arr.name AS arrival_airport_name,
-    f.departure_time,
-    f.arrival_time,
-    f.price,
-    f.number_seats
-FROM 
-    Flights f
-JOIN 
-    Airlines a ON f.airline_id = a.airline_id
-JOIN 
-    Airports dep ON f.departure_airport_id = dep.airport_id
-JOIN 
-    Airports arr ON f.arrival_airport_id = arr.airport_id;
+-- Новый рейс получает пустую карту мест по количеству мест
+CREATE OR REPLACE FUNCTION init_seat_map()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.seat_map IS NULL THEN
+        NEW.seat_map := repeat('0', NEW.number_seats)::BIT VARYING;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+CREATE TRIGGER before_flight_insert
+BEFORE INSERT ON Flights
+FOR EACH ROW
+EXECUTE FUNCTION init_seat_map();
 
 
+-- Бронь без места получает первое свободное, выбранное место проверяется по карте.
+-- Место и остаток мест меняются одним UPDATE под блокировкой строки рейса
 CREATE OR REPLACE FUNCTION decrement_seat_count()
 RETURNS TRIGGER AS $$
+DECLARE
+    seats BIT VARYING;
 BEGIN
+    SELECT seat_map INTO seats FROM Flights WHERE flight_id = NEW.flight_id FOR UPDATE;
+    IF seats IS NULL THEN
+        RAISE EXCEPTION 'Рейс % не найден', NEW.flight_id
+            USING ERRCODE = 'foreign_key_violation';
+    END IF;
+
+    IF NEW.seat IS NULL THEN
+        NEW.seat := NULLIF(position(B'0' IN seats), 0);
+        -- Последний рубеж против овербукинга, если бронь прошла мимо удержания в Redis
+        IF NEW.seat IS NULL THEN
+            RAISE EXCEPTION 'Нет свободных мест на рейс %', NEW.flight_id
+                USING ERRCODE = 'check_violation';
+        END IF;
+    ELSIF NEW.seat < 1 OR NEW.seat > length(seats) OR get_bit(seats, NEW.seat - 1) = 1 THEN
+        RAISE EXCEPTION 'Место % на рейсе % занято или не существует', NEW.seat, NEW.flight_id
+            USING ERRCODE = 'unique_violation';
+    END IF;
+
     UPDATE Flights
-    SET number_seats = number_seats - 1
-    WHERE flight_id = NEW.flight_id AND number_seats > 0;
+    SET seat_map = set_bit(seat_map, NEW.seat - 1, 1),
+        number_seats = number_seats - 1
+    WHERE flight_id = NEW.flight_id;
 
     RETURN NEW;
 END;
 $$ LANGUAGE plpgsql;
-CREATE TRIGGER after_booking_insert
-AFTER INSERT ON Bookings
+CREATE TRIGGER before_booking_insert
+BEFORE INSERT ON Bookings
 FOR EACH ROW
 EXECUTE FUNCTION decrement_seat_count();
 
+CREATE UNIQUE INDEX uq_bookings_flight_seat ON Bookings (flight_id, seat) WHERE seat IS NOT NULL;
+
 
 CREATE OR REPLACE FUNCTION increment_seat_count()
 RETURNS TRIGGER AS $$
 BEGIN
     UPDATE Flights
-    SET number_seats = number_seats + 1
+    SET number_seats = number_seats + 1,
+        seat_map = CASE WHEN OLD.seat IS NULL THEN seat_map ELSE set_bit(seat_map, OLD.seat - 1, 0) END
     WHERE flight_id = OLD.flight_id;
 
 
@@ -172,4 +198,414 @@ BEGIN
     VALUES (flight_id, user_id, booking_date, 'ожидает подтверждения');
     
 END;
-$$;
\ No newline at end of file
+$$;
+
+-- Первое место блока из n свободных мест подряд, NULL - такого блока нет
+CREATE OR REPLACE FUNCTION find_adjacent_seats(p_flight_id INT, n INT)
+RETURNS INT
+LANGUAGE sql
+AS $$
+    SELECT NULLIF(position(repeat('0', n)::BIT VARYING IN seat_map), 0)
+    FROM Flights
+    WHERE flight_id = p_flight_id;
+$$;
+
+
+-- Пакетное бронирование: вся корзина одним запросом, возвращает id и места созданных броней.
+-- Брони без выбранного места на один рейс получают соседние места, если такой блок свободен,
+-- иначе первые свободные. Места, явно выбранные в этой же корзине, считаются занятыми
+CREATE OR REPLACE FUNCTION create_bookings(
+    flight_ids INT[],
+    user_ids INT[],
+    booking_dates TIMESTAMP[],
+    seats INT[] DEFAULT NULL
+)
+RETURNS TABLE (booking_id INT, seat INT)
+LANGUAGE sql
+AS $$
+    WITH cart AS (
+        SELECT t.*,
+               row_number() OVER (PARTITION BY t.flight_id, t.seat IS NULL ORDER BY t.ord) AS n
+        FROM unnest(flight_ids, user_ids, booking_dates, seats) WITH ORDINALITY
+             AS t(flight_id, user_id, booking_date, seat, ord)
+    ),
+    groups AS (
+        SELECT flight_id, COUNT(*)::INT AS group_size
+        FROM cart
+        WHERE seat IS NULL
+        GROUP BY flight_id
+    ),
+    -- Блокировка до выбора мест, чтобы две корзины не выбрали одни и те же места
+    locked AS (
+        SELECT flight_id, seat_map
+        FROM Flights
+        WHERE flight_id IN (SELECT flight_id FROM groups)
+        ORDER BY flight_id
+        FOR UPDATE
+    ),
+    -- Карта мест рейса строкой '0'/'1', где явно выбранные в корзине места уже заняты
+    masks AS (
+        SELECT l.flight_id,
+               string_agg(CASE WHEN get_bit(l.seat_map, s.seat - 1) = 1 OR e.seat IS NOT NULL THEN '1' ELSE '0' END,
+                          '' ORDER BY s.seat) AS mask
+        FROM locked l
+        CROSS JOIN generate_series(1, length(l.seat_map)) AS s(seat)
+        LEFT JOIN (SELECT DISTINCT flight_id, seat FROM cart WHERE seat IS NOT NULL) e
+               ON e.flight_id = l.flight_id AND e.seat = s.seat
+        GROUP BY l.flight_id
+    ),
+    free AS (
+        SELECT m.flight_id, s.seat, row_number() OVER (PARTITION BY m.flight_id ORDER BY s.seat) AS n
+        FROM masks m
+        CROSS JOIN generate_series(1, length(m.mask)) AS s(seat)
+        WHERE substr(m.mask, s.seat, 1) = '0'
+    ),
+    blocks AS (
+        SELECT g.flight_id, NULLIF(position(repeat('0', g.group_size) IN m.mask), 0) AS first_seat
+        FROM groups g
+        JOIN masks m ON m.flight_id = g.flight_id
+        WHERE g.group_size > 1
+    )
+    -- Если свободных мест меньше, чем броней, корзина целиком отклоняется триггером
+    INSERT INTO Bookings (flight_id, user_id, booking_time, status, seat)
+    SELECT c.flight_id, c.user_id, c.booking_date, 'ожидает подтверждения',
+           COALESCE(c.seat, b.first_seat + c.n - 1, f.seat)
+    FROM cart c
+    LEFT JOIN blocks b ON b.flight_id = c.flight_id AND c.seat IS NULL
+    LEFT JOIN free f ON f.flight_id = c.flight_id AND f.n = c.n AND c.seat IS NULL
+    ORDER BY c.ord
+    RETURNING Bookings.booking_id, Bookings.seat;
+$$;
+
+
+-- Индексы для поиска рейсов: имя аэропорта -> id, затем маршрут + диапазон времени вылета
+CREATE INDEX idx_airports_name ON Airports (name);
+CREATE INDEX idx_flights_route_departure ON Flights (departure_airport_id, arrival_airport_id, departure_time);
+
+
+-- Денормализованная таблица для поиска рейсов (заменяет представление flight_details).
+-- Поддерживается триггерами на Flights, Airlines и Airports, полная пересборка - rebuild_flight_search()
+CREATE TABLE flight_search (
+    flight_id INT PRIMARY KEY,
+    airline_id INT NOT NULL,
+    departure_airport_id INT NOT NULL,
+    arrival_airport_id INT NOT NULL,
+    airline_name VARCHAR(100) NOT NULL,
+    departure_airport_name VARCHAR(100) NOT NULL,
+    arrival_airport_name VARCHAR(100) NOT NULL,
+    departure_time TIMESTAMP NOT NULL,
+    arrival_time TIMESTAMP NOT NULL,
+    price DECIMAL(10, 2) NOT NULL,
+    number_seats INT NOT NULL
+);
+COMMENT ON TABLE flight_search IS 'Денормализованные данные рейсов для поиска';
+CREATE INDEX idx_flight_search_route ON flight_search (departure_airport_name, arrival_airport_name, departure_time);
+CREATE INDEX idx_flight_search_airline ON flight_search (airline_id);
+CREATE INDEX idx_flight_search_departure_airport ON flight_search (departure_airport_id);
+CREATE INDEX idx_flight_search_arrival_airport ON flight_search (arrival_airport_id);
+
+
+CREATE OR REPLACE FUNCTION sync_flight_search()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Частый случай: изменились только места, цена или время (в том числе из decrement_seat_count)
+    IF TG_OP = 'UPDATE'
+       AND NEW.flight_id = OLD.flight_id
+       AND NEW.airline_id IS NOT DISTINCT FROM OLD.airline_id
+       AND NEW.departure_airport_id IS NOT DISTINCT FROM OLD.departure_airport_id
+       AND NEW.arrival_airport_id IS NOT DISTINCT FROM OLD.arrival_airport_id THEN
+        UPDATE flight_search
+        SET departure_time = NEW.departure_time,
+            arrival_time = NEW.arrival_time,
+            price = NEW.price,
+            number_seats = NEW.number_seats
+        WHERE flight_id = NEW.flight_id;
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM flight_search WHERE flight_id = OLD.flight_id;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO flight_search
+        SELECT NEW.flight_id, NEW.airline_id, NEW.departure_airport_id, NEW.arrival_airport_id,
+               a.name, dep.name, arr.name,
+               NEW.departure_time, NEW.arrival_time, NEW.price, NEW.number_seats
+        FROM Airlines a, Airports dep, Airports arr
+        WHERE a.airline_id = NEW.airline_id
+          AND dep.airport_id = NEW.departure_airport_id
+          AND arr.airport_id = NEW.arrival_airport_id;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+CREATE TRIGGER after_flights_sync_search
+AFTER INSERT OR UPDATE OR DELETE ON Flights
+FOR EACH ROW
+EXECUTE FUNCTION sync_flight_search();
+
+
+CREATE OR REPLACE FUNCTION sync_flight_search_airline()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE flight_search SET airline_name = NEW.name WHERE airline_id = NEW.airline_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+CREATE TRIGGER after_airline_name_update
+AFTER UPDATE OF name ON Airlines
+FOR EACH ROW
+WHEN (OLD.name IS DISTINCT FROM NEW.name)
+EXECUTE FUNCTION sync_flight_search_airline();
+
+
+CREATE OR REPLACE FUNCTION sync_flight_search_airport()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE flight_search SET departure_airport_name = NEW.name WHERE departure_airport_id = NEW.airport_id;
+    UPDATE flight_search SET arrival_airport_name = NEW.name WHERE arrival_airport_id = NEW.airport_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+CREATE TRIGGER after_airport_name_update
+AFTER UPDATE OF name ON Airports
+FOR EACH ROW
+WHEN (OLD.name IS DISTINCT FROM NEW.name)
+EXECUTE FUNCTION sync_flight_search_airport();
+
+
+CREATE OR REPLACE PROCEDURE rebuild_flight_search()
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    TRUNCATE flight_search;
+    INSERT INTO flight_search
+    SELECT f.flight_id, f.airline_id, f.departure_airport_id, f.arrival_airport_id,
+           a.name, dep.name, arr.name,
+           f.departure_time, f.arrival_time, f.price, f.number_seats
+    FROM Flights f
+    JOIN Airlines a ON f.airline_id = a.airline_id
+    JOIN Airports dep ON f.departure_airport_id = dep.airport_id
+    JOIN Airports arr ON f.arrival_airport_id = arr.airport_id;
+    ANALYZE flight_search;
+END;
+$$;
+
+
+-- Уведомление об изменении строк поиска для сброса кеша (маршрут + день вылета)
+CREATE OR REPLACE FUNCTION notify_flights_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM pg_notify('flights_changed', json_build_object(
+            'departure_airport', OLD.departure_airport_name,
+            'arrival_airport', OLD.arrival_airport_name,
+            'date', OLD.departure_time::date
+        )::text);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM pg_notify('flights_changed', json_build_object(
+            'departure_airport', NEW.departure_airport_name,
+            'arrival_airport', NEW.arrival_airport_name,
+            'date', NEW.departure_time::date
+        )::text);
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+CREATE TRIGGER after_flight_search_change
+AFTER INSERT OR UPDATE OR DELETE ON flight_search
+FOR EACH ROW
+EXECUTE FUNCTION notify_flights_changed();
+
+
+-- Индексы для постраничных админских списков с фильтром (фильтр, первичный ключ)
+CREATE INDEX idx_bookings_user ON Bookings (user_id, booking_id);
+CREATE INDEX idx_bookings_flight ON Bookings (flight_id, booking_id);
+CREATE INDEX idx_payments_booking ON Payments (booking_id, payment_id);
+CREATE INDEX idx_reviews_airline ON Reviews (airline_id, review_id);
+CREATE INDEX idx_reviews_user ON Reviews (user_id, review_id);
+CREATE INDEX idx_flights_airline ON Flights (airline_id, flight_id);
+
+
+-- Рейс однозначно определяется авиакомпанией, аэропортом и временем вылета: ключ для загрузки расписания
+CREATE UNIQUE INDEX uq_flights_schedule ON Flights (airline_id, departure_airport_id, departure_time);
+
+-- STABLE: разбор текста зависит от DateStyle. Специальные значения ('now', 'today', 'infinity' и т.п.)
+-- не принимаются - дата в расписании должна начинаться с цифр
+CREATE OR REPLACE FUNCTION is_valid_timestamp(value TEXT)
+RETURNS BOOLEAN
+LANGUAGE plpgsql
+STABLE
+AS $$
+BEGIN
+    IF value !~ '^\s*\d' THEN
+        RETURN FALSE;
+    END IF;
+    PERFORM value::TIMESTAMP;
+    RETURN TRUE;
+EXCEPTION WHEN others THEN
+    RETURN FALSE;
+END;
+$$;
+
+
+-- Шаблоны регулярных рейсов, разворачиваются в Flights на скользящий горизонт
+CREATE TABLE flight_templates (
+    template_id SERIAL PRIMARY KEY,
+    airline_id INT NOT NULL REFERENCES Airlines(airline_id),
+    departure_airport_id INT NOT NULL REFERENCES Airports(airport_id),
+    arrival_airport_id INT NOT NULL REFERENCES Airports(airport_id),
+    weekdays SMALLINT[] NOT NULL,
+    departure_local_time TIME NOT NULL,
+    duration INTERVAL NOT NULL,
+    number_seats INT NOT NULL CHECK (number_seats > 0),
+    price DECIMAL(10, 2) NOT NULL,
+    valid_from DATE NOT NULL,
+    valid_to DATE NOT NULL,
+    CHECK (valid_to >= valid_from),
+    CHECK (weekdays <@ ARRAY[1, 2, 3, 4, 5, 6, 7]::SMALLINT[])
+);
+COMMENT ON TABLE flight_templates IS 'Шаблоны регулярных рейсов';
+COMMENT ON COLUMN flight_templates.weekdays IS 'Дни недели вылета по ISO (1 - понедельник, 7 - воскресенье)';
+COMMENT ON COLUMN flight_templates.departure_local_time IS 'Местное время вылета';
+COMMENT ON COLUMN flight_templates.duration IS 'Длительность полета';
+COMMENT ON COLUMN flight_templates.valid_from IS 'Первый день действия шаблона';
+COMMENT ON COLUMN flight_templates.valid_to IS 'Последний день действия шаблона';
+
+-- Разворачивает шаблоны в рейсы на [horizon_start, horizon_end] одним INSERT.
+-- Уже созданные рейсы пропускаются по uq_flights_schedule, поэтому повторный запуск добавляет только недостающие
+CREATE OR REPLACE FUNCTION expand_flight_templates(
+    template_ids INT[],
+    horizon_start DATE,
+    horizon_end DATE
+)
+RETURNS INT
+LANGUAGE sql
+AS $$
+    WITH inserted AS (
+        INSERT INTO Flights (airline_id, departure_airport_id, arrival_airport_id,
+                             departure_time, arrival_time, number_seats, price)
+        SELECT t.airline_id, t.departure_airport_id, t.arrival_airport_id,
+               g.day::DATE + t.departure_local_time,
+               g.day::DATE + t.departure_local_time + t.duration,
+               t.number_seats, t.price
+        FROM flight_templates t
+        CROSS JOIN LATERAL generate_series(
+            GREATEST(t.valid_from, horizon_start),
+            LEAST(t.valid_to, horizon_end),
+            INTERVAL '1 day'
+        ) AS g(day)
+        WHERE t.template_id = ANY(template_ids)
+          AND EXTRACT(ISODOW FROM g.day)::SMALLINT = ANY(t.weekdays)
+        ON CONFLICT (airline_id, departure_airport_id, departure_time) DO NOTHING
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INT FROM inserted;
+$$;
+
+
+-- Сводка оценок по авиакомпаниям: количество, сумма и гистограмма (histogram[i] - число оценок i).
+-- Поддерживается триггером на Reviews, полная пересборка - rebuild_airline_rating_summary()
+CREATE TABLE airline_rating_summary (
+    airline_id INT PRIMARY KEY REFERENCES Airlines(airline_id) ON DELETE CASCADE,
+    review_count INT NOT NULL DEFAULT 0,
+    rating_sum INT NOT NULL DEFAULT 0,
+    histogram INT[] NOT NULL DEFAULT '{0,0,0,0,0}'
+);
+COMMENT ON TABLE airline_rating_summary IS 'Агрегированные оценки авиакомпаний';
+
+CREATE OR REPLACE FUNCTION sync_airline_rating_summary()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.airline_id IS NOT NULL AND OLD.rating IS NOT NULL THEN
+        UPDATE airline_rating_summary
+        SET review_count = review_count - 1,
+            rating_sum = rating_sum - OLD.rating,
+            histogram[OLD.rating] = histogram[OLD.rating] - 1
+        WHERE airline_id = OLD.airline_id;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.airline_id IS NOT NULL AND NEW.rating IS NOT NULL THEN
+        INSERT INTO airline_rating_summary AS s (airline_id, review_count, rating_sum, histogram)
+        SELECT NEW.airline_id, 1, NEW.rating,
+               array_agg(CASE WHEN i = NEW.rating THEN 1 ELSE 0 END ORDER BY i)
+        FROM generate_series(1, 5) AS i
+        ON CONFLICT (airline_id) DO UPDATE
+        SET review_count = s.review_count + 1,
+            rating_sum = s.rating_sum + NEW.rating,
+            histogram[NEW.rating] = s.histogram[NEW.rating] + 1;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER after_review_change
+AFTER INSERT OR DELETE OR UPDATE OF airline_id, rating ON Reviews
+FOR EACH ROW
+EXECUTE FUNCTION sync_airline_rating_summary();
+
+CREATE OR REPLACE PROCEDURE rebuild_airline_rating_summary()
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    TRUNCATE airline_rating_summary;
+    INSERT INTO airline_rating_summary (airline_id, review_count, rating_sum, histogram)
+    SELECT airline_id, COUNT(*), SUM(rating),
+           ARRAY[COUNT(*) FILTER (WHERE rating = 1), COUNT(*) FILTER (WHERE rating = 2),
+                 COUNT(*) FILTER (WHERE rating = 3), COUNT(*) FILTER (WHERE rating = 4),
+                 COUNT(*) FILTER (WHERE rating = 5)]::INT[]
+    FROM Reviews
+    WHERE airline_id IS NOT NULL AND rating IS NOT NULL
+    GROUP BY airline_id;
+END;
+$$;
+
+
+-- Полнотекстовый поиск по отзывам для модерации: русская и английская морфология в одном векторе
+ALTER TABLE Reviews ADD COLUMN comment_tsv TSVECTOR GENERATED ALWAYS AS (
+    to_tsvector('russian', COALESCE(comment, '')) || to_tsvector('english', COALESCE(comment, ''))
+) STORED;
+COMMENT ON COLUMN Reviews.comment_tsv IS 'Поисковый вектор комментария (russian + english)';
+CREATE INDEX idx_reviews_comment_tsv ON Reviews USING GIN (comment_tsv);
+
+
+-- Версии справочников для кеша: триггер повышает версию и шлёт NOTIFY reference_changed,
+-- приложение переносит её в Redis и рассылает процессам через pub/sub
+CREATE TABLE reference_versions (
+    namespace VARCHAR(50) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+COMMENT ON TABLE reference_versions IS 'Версии справочных данных для сброса кеша';
+
+CREATE OR REPLACE FUNCTION bump_reference_version()
+RETURNS TRIGGER AS $$
+DECLARE
+    new_version BIGINT;
+BEGIN
+    INSERT INTO reference_versions AS r (namespace, version)
+    VALUES (TG_ARGV[0], 1)
+    ON CONFLICT (namespace) DO UPDATE SET version = r.version + 1
+    RETURNING r.version INTO new_version;
+
+    PERFORM pg_notify(
+        'reference_changed',
+        json_build_object('namespace', TG_ARGV[0], 'version', new_version)::text
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER after_airports_reference_change
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON Airports
+FOR EACH STATEMENT
+EXECUTE FUNCTION bump_reference_version('airports');
+
+CREATE TRIGGER after_airlines_reference_change
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON Airlines
+FOR EACH STATEMENT
+EXECUTE FUNCTION bump_reference_version('airlines');
@@ -239,4 +239,9 @@ VALUES
     (46, 1918455, 13, 15, '2023-12-09 12:00:00', '2023-12-09 13:30:00',80, 260.00),
     (47, 2941943, 13, 26, '2023-12-09 14:00:00', '2023-12-09 15:30:00',90, 270.00),
     (48, 1918455, 13, 43, '2023-12-09 16:00:00', '2023-12-09 17:30:00',110, 280.00),
-    (49, 1918455, 13, 49, '2023-12-09 18:00:00', '2023-12-09 19:30:00',100,290.00);
\ No newline at end of file
+    (49, 1918455, 13, 49, '2023-12-09 18:00:00', '2023-12-09 19:30:00',100,290.00);
+
+-- Данные вставлены с явными id: сдвигаем последовательности SERIAL, чтобы новые строки получали свободные id
+SELECT setval(pg_get_serial_sequence('airlines', 'airline_id'), (SELECT MAX(airline_id) FROM Airlines));
+SELECT setval(pg_get_serial_sequence('airports', 'airport_id'), (SELECT MAX(airport_id) FROM Airports));
+SELECT setval(pg_get_serial_sequence('flights', 'flight_id'), (SELECT MAX(flight_id) FROM Flights));
@@ -0,0 +1,28 @@
+# Разворачивание шаблонов рейсов на скользящий горизонт, рассчитано на запуск по расписанию (cron).
+# Запуск из каталога src: python -m cli.expand_templates --days 90
+import argparse
+import asyncio
+from infra.db import get_pool_manager
+from services.flight_templates import generate_flights
+from settings import FLIGHT_TEMPLATE_HORIZON_DAYS, FLIGHT_TEMPLATE_BATCH_SIZE
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Создание рейсов по шаблонам")
+    parser.add_argument("--days", type=int, default=FLIGHT_TEMPLATE_HORIZON_DAYS, help="Горизонт в днях")
+    parser.add_argument("--batch-size", type=int, default=FLIGHT_TEMPLATE_BATCH_SIZE,
+                        help="Шаблонов на один INSERT")
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    result = await generate_flights(get_pool_manager(), args.days, args.batch_size)
+    print(
+        f"Шаблонов: {result['templates']}, создано рейсов: {result['created']} "
+        f"({result['horizon_start']} - {result['horizon_end']})"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
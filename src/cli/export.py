@@ -0,0 +1,35 @@
+# Потоковая выгрузка таблиц и истории бронирований пользователя в CSV/Parquet.
+# Запуск из каталога src:
+#   python -m cli.export payments --format parquet --output payments.parquet
+#   python -m cli.export bookings --user-id 42 --output bookings_42.csv
+import argparse
+import asyncio
+import time
+from infra.db import get_pool_manager
+from services.export import EXPORT_TABLES, EXPORT_FORMATS, export_table, export_user_bookings
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Выгрузка данных через COPY / серверный курсор")
+    parser.add_argument("table", choices=EXPORT_TABLES)
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+    parser.add_argument("--output", required=True, help="Путь к файлу выгрузки")
+    parser.add_argument("--user-id", type=int, help="Только бронирования этого пользователя (для bookings)")
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    pool = get_pool_manager()
+    started = time.perf_counter()
+    if args.user_id is not None:
+        if args.table != "bookings":
+            raise SystemExit("--user-id поддерживается только для bookings")
+        await export_user_bookings(pool, args.user_id, args.format, args.output)
+    else:
+        await export_table(pool, args.table, args.format, args.output)
+    print(f"Выгрузка {args.table} в {args.output} заняла {time.perf_counter() - started:.1f} с")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
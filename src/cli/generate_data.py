@@ -0,0 +1,53 @@
+# Детерминированная генерация объёмных данных поверх migrations/dml.sql для нагрузочных тестов и проверки планов.
+# Запуск из каталога src:
+#   python -m cli.generate_data --scale 0.1 --as-of 2025-06-01 --dry-run
+#   python -m cli.generate_data --scale 1 --seed 42 --as-of 2025-06-01 --workers 8
+import argparse
+import asyncio
+import json
+import os
+from datetime import date
+from infra.db import get_pool_manager
+from infra.password_hasher import get_password_hasher
+from infra.redis_pool import get_redis
+from repositories.search_cache import clear_search_cache
+from services.synthetic_data import SyntheticDataGenerator, scaled_volumes
+from settings import DB_CONFIG
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Генерация синтетических данных через параллельный COPY")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="Множитель объёмов; 1 - около 2 млн рейсов и 20 млн броней")
+    parser.add_argument("--as-of", type=date.fromisoformat, default=date.today(),
+                        help="Условная текущая дата: половина рейсов до неё, половина после. "
+                             "Для воспроизводимости задайте явно")
+    parser.add_argument("--days", type=int, default=365, help="Горизонт расписания в днях")
+    for name in ("airlines", "airports", "users", "flights", "reviews"):
+        parser.add_argument(f"--{name}", type=int, help=f"Число {name}, вместо вычисленного по --scale")
+    parser.add_argument("--bookings-per-flight", type=int, help="Среднее число броней на вылетевший рейс")
+    parser.add_argument("--password", default="password",
+                        help="Пароль всех созданных пользователей (хеш вычисляется один раз)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Процессов генерации и загрузки")
+    parser.add_argument("--dry-run", action="store_true", help="Только посчитать объёмы, ничего не загружать")
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    volumes = scaled_volumes(args.scale, {
+        "airlines": args.airlines, "airports": args.airports, "users": args.users,
+        "flights": args.flights, "reviews": args.reviews, "bookings_per_flight": args.bookings_per_flight,
+    })
+    generator = SyntheticDataGenerator(DB_CONFIG, args.seed, volumes, args.as_of, args.days, args.workers)
+    password_hash = await get_password_hasher().hash(args.password)
+    result = await generator.run(get_pool_manager(), password_hash, dry_run=args.dry_run)
+    if not args.dry_run:
+        # Строки flight_search добавлены без триггеров, поэтому старые результаты поиска сбрасываются целиком
+        result["search_cache_deleted"] = await clear_search_cache(get_redis())
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,33 @@
+# Загрузка расписания рейсов из CSV через COPY во временную таблицу.
+# Запуск из каталога src: python -m cli.import_schedule schedule.csv
+import argparse
+import asyncio
+import time
+from infra.db import get_pool_manager
+from services.schedule_import import SCHEDULE_COLUMNS, import_schedule
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description=f"Загрузка расписания, колонки CSV: {', '.join(SCHEDULE_COLUMNS)}"
+    )
+    parser.add_argument("path", help="CSV-файл с заголовком")
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    started = time.perf_counter()
+    result = await import_schedule(get_pool_manager(), args.path)
+    print(
+        f"Строк: {result['total']}, добавлено: {result['inserted']}, обновлено: {result['updated']}, "
+        f"с ошибками: {result['error_count']} ({time.perf_counter() - started:.1f} с)"
+    )
+    for line, error in result["errors"]:
+        print(f"  строка {line}: {error}")
+    if result["error_count"] > len(result["errors"]):
+        print(f"  ... и ещё {result['error_count'] - len(result['errors'])}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
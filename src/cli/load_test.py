@@ -0,0 +1,50 @@
+# Нагрузочный прогон сценариев поиска, бронирования, входа и просмотра броней против локальных Postgres и Redis.
+# Запуск из каталога src:
+#   python -m cli.load_test --users 50 --duration 120 --output load_50.json
+#   python -m cli.load_test --mix search=80,book=20 --think-time 0.5 2 --compare load_50.json
+import argparse
+import asyncio
+import json
+from infra.db import get_pool_manager
+from services.load_test import DEFAULT_MIX, LoadTest, compare_reports, parse_mix
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Нагрузочное тестирование без браузера")
+    parser.add_argument("--users", type=int, default=20, help="Число виртуальных пользователей")
+    parser.add_argument("--duration", type=float, default=60, help="Длительность прогона, с")
+    parser.add_argument("--ramp-up", type=float, default=0, help="За сколько секунд стартуют все пользователи")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="Веса сценариев, например search=60,book=10,login=10,my_bookings=20")
+    parser.add_argument("--think-time", type=float, nargs=2, default=(0.5, 2.0), metavar=("MIN", "MAX"),
+                        help="Пауза между действиями пользователя, с")
+    parser.add_argument("--password", default="load_password", help="Пароль учётных записей load_user_N")
+    parser.add_argument("--seed", type=int, help="Зерно для воспроизводимой последовательности действий")
+    parser.add_argument("--output", help="Файл для JSON-отчёта; по умолчанию отчёт печатается")
+    parser.add_argument("--compare", help="JSON-отчёт предыдущего прогона для сравнения")
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    load_test = LoadTest(
+        get_pool_manager(), args.users, args.duration, args.mix, tuple(args.think_time),
+        ramp_up=args.ramp_up, password=args.password, seed=args.seed,
+    )
+    report = await load_test.run()
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline:
+            comparison = compare_reports(json.load(baseline), report)
+        report["comparison"] = {"baseline": args.compare, "operations": comparison}
+
+    text = json.dumps(report, ensure_ascii=False, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            output.write(text)
+        print(f"Отчёт записан в {args.output}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
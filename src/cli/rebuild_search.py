@@ -0,0 +1,23 @@
+# Пересборка flight_search и сброс кеша поиска после сбоя или ручной правки данных.
+# Запуск из каталога src: python -m cli.rebuild_search
+import asyncio
+import time
+from infra.db import get_pool_manager
+from infra.redis_pool import get_redis
+from repositories.flights import rebuild_flight_search
+from repositories.search_cache import clear_search_cache
+
+
+async def main():
+    pool = get_pool_manager()
+    started = time.perf_counter()
+    await rebuild_flight_search(pool)
+    print(f"flight_search пересобрана за {time.perf_counter() - started:.1f} с")
+
+    # TRUNCATE не вызывает строковые триггеры, поэтому кеш поиска сбрасываем целиком
+    deleted = await clear_search_cache(get_redis())
+    print(f"Удалено ключей кеша поиска: {deleted}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,220 @@
+import asyncio
+import atexit
+import threading
+import time
+from collections import deque
+import asyncpg
+from infra import profiler
+from infra.loop import BackgroundLoop, Bridged, get_background_loop
+from settings import (
+    DB_CONFIG, POOL_MIN_CONN, POOL_MAX_CONN, POOL_ACQUIRE_TIMEOUT,
+    POOL_HEALTHCHECK_INTERVAL, POOL_MAX_INACTIVE_LIFETIME, POOL_STATEMENT_CACHE_SIZE,
+)
+
+
+class _AcquireContext:
+    def __init__(self, manager: "PoolManager", timeout: float | None):
+        self._manager = manager
+        self._timeout = timeout
+        self._pool = None
+        self._conn = None
+
+    async def __aenter__(self):
+        background = self._manager.background
+        with profiler.span("db:acquire"):
+            self._pool, self._conn = await background.run(self._manager._acquire(self._timeout))
+        return Bridged(self._conn, background)
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._manager.background.run(self._pool.release(self._conn))
+        self._pool = self._conn = None
+
+
+class PoolManager:
+    """Общий для всех сессий процесса пул asyncpg с проверкой соединений и статистикой.
+
+    Пул создаётся в фоновом цикле один раз и переживает reruns Streamlit.
+    Объект передаётся в репозитории вместо asyncpg.Pool: acquire() работает так же.
+    """
+
+    def __init__(self, background: BackgroundLoop, db_config: dict, min_size: int, max_size: int,
+                 acquire_timeout: float | None = None, healthcheck_interval: float = 30,
+                 max_inactive_lifetime: float = 300, statement_cache_size: int = 100):
+        self.background = background
+        self._db_config = db_config
+        self._min_size = min_size
+        self._max_size = max_size
+        self._acquire_timeout = acquire_timeout
+        self._healthcheck_interval = healthcheck_interval
+        self._max_inactive_lifetime = max_inactive_lifetime
+        self._statement_cache_size = statement_cache_size
+        self._pool: asyncpg.Pool | None = None
+        self._pool_lock: asyncio.Lock | None = None
+        self._healthcheck_task: asyncio.Task | None = None
+        self._closed = False
+
+        self._acquire_count = 0
+        self._acquire_wait_total = 0.0
+        self._acquire_wait_max = 0.0
+        self._acquire_waits = deque(maxlen=1024)
+        self._acquire_listeners = []
+        self._acquire_errors = 0
+        self._connections_opened = 0
+        self._connections_closed = 0
+        self._healthcheck_failures = 0
+        self._reconnects = 0
+
+    async def _on_connect(self, conn):
+        self._connections_opened += 1
+        conn.add_termination_listener(self._on_terminate)
+
+    def _on_terminate(self, conn):
+        self._connections_closed += 1
+
+    async def _create_pool(self) -> asyncpg.Pool:
+        pool = await asyncpg.create_pool(
+            **self._db_config,
+            min_size=self._min_size,
+            max_size=self._max_size,
+            max_inactive_connection_lifetime=self._max_inactive_lifetime,
+            # Каждый текст запроса готовится на соединении один раз, дальше - только Bind/Execute
+            statement_cache_size=self._statement_cache_size,
+            init=self._on_connect,
+        )
+        # Прогрев: min_size соединений уже открыты, проверяем что они рабочие
+        async with pool.acquire() as conn:
+            await conn.fetchval("SELECT 1")
+        return pool
+
+    async def _ensure_pool(self) -> asyncpg.Pool:
+        if self._pool is not None:
+            return self._pool
+        if self._pool_lock is None:
+            self._pool_lock = asyncio.Lock()
+        async with self._pool_lock:
+            if self._pool is None:
+                self._pool = await self._create_pool()
+        return self._pool
+
+    async def _acquire(self, timeout: float | None):
+        started = time.perf_counter()
+        try:
+            pool = await self._ensure_pool()
+            conn = await pool.acquire(timeout=timeout or self._acquire_timeout)
+        except Exception:
+            self._acquire_errors += 1
+            raise
+        wait = time.perf_counter() - started
+        self._acquire_count += 1
+        self._acquire_wait_total += wait
+        self._acquire_wait_max = max(self._acquire_wait_max, wait)
+        self._acquire_waits.append(wait)
+        for listener in self._acquire_listeners:
+            listener(wait)
+        return pool, conn
+
+    def add_acquire_listener(self, listener):
+        # listener(wait_seconds) вызывается в фоновом цикле после каждого успешного acquire
+        self._acquire_listeners.append(listener)
+
+    def remove_acquire_listener(self, listener):
+        self._acquire_listeners.remove(listener)
+
+    async def _start(self):
+        try:
+            await self._ensure_pool()
+        except (OSError, asyncpg.PostgresError, asyncio.TimeoutError) as e:
+            # Пул будет создан при первом acquire или проверке соединений
+            print(f"Не удалось прогреть пул соединений: {e}")
+        self._healthcheck_task = asyncio.create_task(self._healthcheck_loop())
+
+    async def _healthcheck_loop(self):
+        while not self._closed:
+            await asyncio.sleep(self._healthcheck_interval)
+            try:
+                pool = await self._ensure_pool()
+                async with pool.acquire(timeout=self._healthcheck_interval) as conn:
+                    await conn.fetchval("SELECT 1")
+            except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError, asyncio.TimeoutError) as e:
+                self._healthcheck_failures += 1
+                print(f"Проверка пула соединений не прошла: {e}")
+                await self._reconnect()
+
+    async def _reconnect(self):
+        old_pool, self._pool = self._pool, None
+        self._reconnects += 1
+        if old_pool is not None:
+            old_pool.terminate()
+        try:
+            await self._ensure_pool()
+        except (OSError, asyncpg.PostgresError, asyncio.TimeoutError) as e:
+            print(f"Не удалось переподключиться к базе данных: {e}")
+
+    async def _close(self):
+        self._closed = True
+        if self._healthcheck_task is not None:
+            self._healthcheck_task.cancel()
+        if self._pool is not None:
+            try:
+                await asyncio.wait_for(self._pool.close(), timeout=10)
+            except asyncio.TimeoutError:
+                self._pool.terminate()
+            self._pool = None
+
+    def start(self):
+        self.background.run_sync(self._start())
+
+    def close(self):
+        if not self._closed:
+            self.background.run_sync(self._close(), timeout=15)
+            print("Connection pool closed.")
+
+    def acquire(self, timeout: float | None = None) -> _AcquireContext:
+        return _AcquireContext(self, timeout)
+
+    def stats(self) -> dict:
+        pool = self._pool
+        size = pool.get_size() if pool is not None else 0
+        idle = pool.get_idle_size() if pool is not None else 0
+        waits = sorted(self._acquire_waits)
+        p95 = waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else 0.0
+        count = self._acquire_count
+        return {
+            "size": size,
+            "idle": idle,
+            "busy": size - idle,
+            "min_size": self._min_size,
+            "max_size": self._max_size,
+            "acquire_count": count,
+            "acquire_errors": self._acquire_errors,
+            "acquire_wait_avg_ms": self._acquire_wait_total / count * 1000 if count else 0.0,
+            "acquire_wait_p95_ms": p95 * 1000,
+            "acquire_wait_max_ms": self._acquire_wait_max * 1000,
+            "connections_opened": self._connections_opened,
+            "connections_closed": self._connections_closed,
+            "healthcheck_failures": self._healthcheck_failures,
+            "reconnects": self._reconnects,
+        }
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_pool_manager() -> PoolManager:
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = PoolManager(
+                get_background_loop(),
+                DB_CONFIG,
+                min_size=POOL_MIN_CONN,
+                max_size=POOL_MAX_CONN,
+                acquire_timeout=POOL_ACQUIRE_TIMEOUT,
+                healthcheck_interval=POOL_HEALTHCHECK_INTERVAL,
+                max_inactive_lifetime=POOL_MAX_INACTIVE_LIFETIME,
+                statement_cache_size=POOL_STATEMENT_CACHE_SIZE,
+            )
+            _manager.start()
+            atexit.register(_manager.close)
+    return _manager
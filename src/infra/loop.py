@@ -0,0 +1,133 @@
+import asyncio
+import atexit
+import threading
+import time
+
+# Streamlit выполняет каждый rerun через asyncio.run(), то есть в новом цикле
+# событий, а пулы asyncpg и redis.asyncio привязаны к циклу, в котором созданы.
+# Поэтому долгоживущие ресурсы процесса живут в отдельном фоновом цикле,
+# а вызовы из скрипта страницы передаются в него через Bridged.
+
+_PLAIN_TYPES = (type(None), bool, int, float, str, bytes, list, tuple, dict, set)
+
+
+class BackgroundLoop:
+    def __init__(self, name: str = "aviapp-loop"):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self._loop
+
+    def in_loop(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def submit(self, coro):
+        if not asyncio.iscoroutine(coro):
+            coro = _await(coro)
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    async def run(self, coro):
+        if self.in_loop():
+            return await coro
+        return await asyncio.wrap_future(self.submit(coro))
+
+    def run_sync(self, coro, timeout: float | None = None):
+        return self.submit(coro).result(timeout)
+
+    def stop(self):
+        if self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+
+
+async def _await(awaitable):
+    return await awaitable
+
+
+class Bridged:
+    """Прокси, выполняющий awaitable-вызовы объекта в фоновом цикле.
+
+    metrics - необязательный объект с методом record(name, seconds, ok),
+    куда записывается время каждого вызова.
+    """
+
+    def __init__(self, target, background: BackgroundLoop, metrics=None):
+        self._target = target
+        self._background = background
+        self._metrics = metrics
+
+    def _wrap(self, value):
+        if isinstance(value, _PLAIN_TYPES):
+            return value
+        return Bridged(value, self._background, self._metrics)
+
+    async def _call(self, name: str, coro):
+        if self._metrics is None:
+            return await self._background.run(coro)
+        started = time.perf_counter()
+        try:
+            result = await self._background.run(coro)
+        except Exception:
+            self._metrics.record(name, time.perf_counter() - started, False)
+            raise
+        self._metrics.record(name, time.perf_counter() - started, True)
+        return result
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            if asyncio.iscoroutine(result):
+                return self._call(name, result)
+            return self._wrap(result)
+
+        return call
+
+    def __call__(self, *args, **kwargs):
+        result = self._target(*args, **kwargs)
+        if asyncio.iscoroutine(result):
+            return self._call(type(self._target).__name__, result)
+        return self._wrap(result)
+
+    def __await__(self):
+        async def resolve():
+            return self._wrap(await self._background.run(self._target))
+        return resolve().__await__()
+
+    async def __aenter__(self):
+        return self._wrap(await self._background.run(self._target.__aenter__()))
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return await self._background.run(self._target.__aexit__(exc_type, exc, tb))
+
+    def __aiter__(self):
+        return Bridged(self._target.__aiter__(), self._background, self._metrics)
+
+    async def __anext__(self):
+        return await self._background.run(self._target.__anext__())
+
+
+_background = None
+_background_lock = threading.Lock()
+
+
+def get_background_loop() -> BackgroundLoop:
+    global _background
+    with _background_lock:
+        if _background is None:
+            _background = BackgroundLoop()
+            atexit.register(_background.stop)
+    return _background
@@ -0,0 +1,86 @@
+import atexit
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from infra.queries import get_query_registry
+from infra.redis_pool import get_redis_manager
+from settings import METRICS_PORT
+
+
+def render_metrics(pool) -> str:
+    """Метрики процесса в текстовом формате Prometheus: запросы реестра, команды Redis, пул Postgres."""
+    lines = [get_query_registry().prometheus().rstrip("\n")]
+
+    redis_metrics = get_redis_manager().metrics.snapshot()
+    lines.append("# HELP aviapp_redis_commands_total Выполнено команд Redis")
+    lines.append("# TYPE aviapp_redis_commands_total counter")
+    lines.extend(f'aviapp_redis_commands_total{{command="{name}"}} {item["calls"]}'
+                 for name, item in sorted(redis_metrics.items()))
+    lines.append("# HELP aviapp_redis_errors_total Ошибок команд Redis")
+    lines.append("# TYPE aviapp_redis_errors_total counter")
+    lines.extend(f'aviapp_redis_errors_total{{command="{name}"}} {item["errors"]}'
+                 for name, item in sorted(redis_metrics.items()))
+    lines.append("# HELP aviapp_redis_command_seconds_total Суммарное время команд Redis")
+    lines.append("# TYPE aviapp_redis_command_seconds_total counter")
+    lines.extend(f'aviapp_redis_command_seconds_total{{command="{name}"}} {item["avg_ms"] * item["calls"] / 1000}'
+                 for name, item in sorted(redis_metrics.items()))
+
+    lines.append("# HELP aviapp_pool_stat Состояние пула соединений Postgres")
+    lines.append("# TYPE aviapp_pool_stat gauge")
+    lines.extend(f'aviapp_pool_stat{{stat="{name}"}} {value}' for name, value in pool.stats().items())
+    return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """HTTP-сервер /metrics в отдельном потоке, чтобы Prometheus не зависел от reruns Streamlit."""
+
+    def __init__(self, pool, port: int):
+        pool_ref = pool
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = render_metrics(pool_ref).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("", port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+_server = None
+_server_failed = False
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(pool) -> MetricsServer | None:
+    global _server, _server_failed
+    if METRICS_PORT is None:
+        return None
+    with _server_lock:
+        if _server is None and not _server_failed:
+            try:
+                _server = MetricsServer(pool, METRICS_PORT)
+            except OSError as e:
+                # Порт занят, например вторым процессом на той же машине
+                print(f"Не удалось запустить сервер метрик на порту {METRICS_PORT}: {e}")
+                _server_failed = True
+                return None
+            _server.start()
+            atexit.register(_server.stop)
+    return _server
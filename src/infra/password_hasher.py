@@ -0,0 +1,106 @@
+import asyncio
+import atexit
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+from settings import BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_SIZE
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    """bcrypt в отдельном пуле потоков с ограничением параллелизма и очереди.
+
+    bcrypt отпускает GIL на время вычисления, поэтому потоков достаточно, а цикл событий
+    вызывающей сессии не блокируется. Если очередь заполнена, запрос сразу отклоняется
+    с PasswordHasherBusy, а не ждёт неограниченно.
+    """
+
+    def __init__(self, rounds: int, workers: int, queue_size: int):
+        self.rounds = rounds
+        self._workers = workers
+        self._queue_size = queue_size
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_seconds = 0.0
+        self._work_seconds = 0.0
+
+    def _run(self, func, submitted_at: float, *args):
+        started = time.perf_counter()
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            self._wait_seconds += started - submitted_at
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+                self._work_seconds += time.perf_counter() - started
+
+    async def _submit(self, func, *args):
+        with self._lock:
+            if self._queued + self._running >= self._workers + self._queue_size:
+                self._rejected += 1
+                raise PasswordHasherBusy("Слишком много одновременных проверок пароля")
+            self._queued += 1
+        future = self._executor.submit(self._run, func, time.perf_counter(), *args)
+        future.add_done_callback(self._release_cancelled)
+        return await asyncio.wrap_future(future)
+
+    def _release_cancelled(self, future):
+        # Отменённая задача не дошла до _run (отмена возможна только в очереди), её место освобождается здесь
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
+
+    async def hash(self, password: str) -> str:
+        hashed = await self._submit(bcrypt.hashpw, password.encode('utf-8'), bcrypt.gensalt(self.rounds))
+        return hashed.decode('utf-8')
+
+    async def verify(self, password: str, password_hash: str) -> bool:
+        return await self._submit(bcrypt.checkpw, password.encode('utf-8'), password_hash.encode('utf-8'))
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        # Формат $2b$<cost>$<salt+hash>
+        try:
+            return int(password_hash.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self._workers,
+                "queue_size": self._queue_size,
+                "queued": self._queued,
+                "running": self._running,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "avg_wait_ms": self._wait_seconds / self._completed * 1000 if self._completed else 0.0,
+                "avg_hash_ms": self._work_seconds / self._completed * 1000 if self._completed else 0.0,
+            }
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_hasher = None
+_hasher_lock = threading.Lock()
+
+
+def get_password_hasher() -> PasswordHasher:
+    global _hasher
+    with _hasher_lock:
+        if _hasher is None:
+            _hasher = PasswordHasher(BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_SIZE)
+            atexit.register(_hasher.close)
+    return _hasher
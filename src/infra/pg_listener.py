@@ -0,0 +1,95 @@
+import asyncio
+import atexit
+import threading
+from collections import defaultdict
+import asyncpg
+from infra.loop import BackgroundLoop, get_background_loop
+from settings import DB_CONFIG, POOL_HEALTHCHECK_INTERVAL
+
+
+class PgListener:
+    """Выделенное соединение для LISTEN/NOTIFY с переподключением.
+
+    Колбэки - корутинные функции callback(payload: str), выполняются в фоновом цикле.
+    """
+
+    def __init__(self, background: BackgroundLoop, db_config: dict, healthcheck_interval: float):
+        self._background = background
+        self._db_config = db_config
+        self._healthcheck_interval = healthcheck_interval
+        self._callbacks = defaultdict(list)
+        self._conn: asyncpg.Connection | None = None
+        self._task = None
+        self._tasks = set()
+        self._stopped = False
+
+    def _dispatch(self, conn, pid, channel, payload):
+        for callback in self._callbacks[channel]:
+            task = asyncio.create_task(callback(payload))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self):
+        while not self._stopped:
+            closed = asyncio.Event()
+            try:
+                self._conn = await asyncpg.connect(**self._db_config)
+                self._conn.add_termination_listener(lambda conn: closed.set())
+                for channel in list(self._callbacks):
+                    await self._conn.add_listener(channel, self._dispatch)
+                while not closed.is_set():
+                    try:
+                        await asyncio.wait_for(closed.wait(), timeout=self._healthcheck_interval)
+                    except asyncio.TimeoutError:
+                        await self._conn.fetchval("SELECT 1", timeout=self._healthcheck_interval)
+            except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError, asyncio.TimeoutError) as e:
+                print(f"Соединение LISTEN потеряно: {e}")
+            finally:
+                if self._conn is not None and not self._conn.is_closed():
+                    self._conn.terminate()
+                self._conn = None
+            if not self._stopped:
+                # Уведомления, пропущенные за время переподключения, не восстановить
+                await asyncio.sleep(1)
+
+    async def _listen(self, channel: str, callback):
+        is_new = channel not in self._callbacks
+        self._callbacks[channel].append(callback)
+        if is_new and self._conn is not None:
+            await self._conn.add_listener(channel, self._dispatch)
+
+    async def _start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def _stop(self):
+        self._stopped = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def start(self):
+        self._background.run_sync(self._start())
+
+    def stop(self):
+        if not self._stopped:
+            self._background.run_sync(self._stop(), timeout=5)
+
+    def listen(self, channel: str, callback):
+        self._background.run_sync(self._listen(channel, callback))
+
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def get_pg_listener() -> PgListener:
+    global _listener
+    with _listener_lock:
+        if _listener is None:
+            _listener = PgListener(get_background_loop(), DB_CONFIG, POOL_HEALTHCHECK_INTERVAL)
+            _listener.start()
+            atexit.register(_listener.stop)
+    return _listener
@@ -0,0 +1,171 @@
+import cProfile
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from settings import (
+    PROFILE_RENDERS, PROFILE_SLOW_MS, PROFILE_SAMPLE_RATE, PROFILE_DIR, PROFILE_HISTORY_SIZE,
+)
+
+# Профилирование reruns Streamlit. Трасса текущего rerun лежит в contextvar: каждая сессия
+# выполняет скрипт в своём потоке, поэтому трассы сессий не смешиваются. Запросы реестра
+# и команды Redis попадают в трассу сами, остальное размечается через span().
+# Время, не покрытое отрезками верхнего уровня, считается отрисовкой ("render").
+
+_current: ContextVar["RenderTrace | None"] = ContextVar("render_trace", default=None)
+
+
+class RenderTrace:
+    def __init__(self, page: str):
+        self.page = page
+        self.started = time.perf_counter()
+        self.spans = defaultdict(lambda: [0.0, 0])
+        self.attributed = 0.0
+        self._depth = 0
+
+    def add(self, name: str, seconds: float):
+        span = self.spans[name]
+        span[0] += seconds
+        span[1] += 1
+        # Вложенные отрезки уже учтены во внешнем
+        if self._depth == 0:
+            self.attributed += seconds
+
+    def breakdown(self, total: float) -> dict:
+        result = {name: {"ms": seconds * 1000, "calls": calls} for name, (seconds, calls) in self.spans.items()}
+        result["render"] = {"ms": max(total - self.attributed, 0.0) * 1000, "calls": 1}
+        return result
+
+
+@contextmanager
+def span(name: str):
+    """Отрезок rerun с именем name; без включённого профилирования ничего не делает."""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    trace._depth += 1
+    try:
+        yield
+    finally:
+        trace._depth -= 1
+        trace.add(name, time.perf_counter() - started)
+
+
+def record(name: str, seconds: float):
+    trace = _current.get()
+    if trace is not None:
+        trace.add(name, seconds)
+
+
+def set_page(page: str):
+    trace = _current.get()
+    if trace is not None:
+        trace.page = page
+
+
+class RenderProfiler:
+    def __init__(self, slow_ms: float, sample_rate: float, profile_dir: str, history_size: int):
+        self.slow_ms = slow_ms
+        self.sample_rate = sample_rate
+        self.profile_dir = profile_dir
+        self._history_size = history_size
+        self._lock = threading.Lock()
+        self._durations = defaultdict(lambda: deque(maxlen=history_size))
+        self._slow = deque(maxlen=history_size)
+        # cProfile нельзя включить в двух потоках сразу, поэтому сэмплируется один rerun за раз
+        self._cprofile_lock = threading.Lock()
+
+    @contextmanager
+    def rerun(self, page: str = "unknown"):
+        trace = RenderTrace(page)
+        token = _current.set(trace)
+        profile = None
+        if self.sample_rate and random.random() < self.sample_rate and self._cprofile_lock.acquire(blocking=False):
+            profile = cProfile.Profile()
+            profile.enable()
+        try:
+            yield trace
+        finally:
+            total = time.perf_counter() - trace.started
+            if profile is not None:
+                profile.disable()
+                self._cprofile_lock.release()
+            _current.reset(token)
+            self._finish(trace, total, profile)
+
+    def _finish(self, trace: RenderTrace, total: float, profile):
+        with self._lock:
+            self._durations[trace.page].append(total)
+        if total * 1000 < self.slow_ms:
+            return
+        entry = {
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "page": trace.page,
+            "total_ms": round(total * 1000, 1),
+            "breakdown": {name: {"ms": round(item["ms"], 1), "calls": item["calls"]}
+                          for name, item in trace.breakdown(total).items()},
+            "profile": None,
+        }
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            if profile is not None:
+                entry["profile"] = os.path.join(
+                    self.profile_dir, f"{datetime.now():%Y%m%d_%H%M%S}_{os.getpid()}_{threading.get_ident()}.prof"
+                )
+                profile.dump_stats(entry["profile"])
+            with open(os.path.join(self.profile_dir, "slow_renders.jsonl"), "a", encoding="utf-8") as log:
+                log.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"Не удалось записать журнал медленных отрисовок: {e}")
+        with self._lock:
+            self._slow.append(entry)
+
+    def page_stats(self) -> list[dict]:
+        with self._lock:
+            durations = {page: sorted(values) for page, values in self._durations.items()}
+        stats = []
+        for page, values in sorted(durations.items()):
+            stats.append({
+                "page": page,
+                "reruns": len(values),
+                "p50_ms": values[int(len(values) * 0.5)] * 1000,
+                "p95_ms": values[min(len(values) - 1, int(len(values) * 0.95))] * 1000,
+                "max_ms": values[-1] * 1000,
+            })
+        return stats
+
+    def slow_renders(self) -> list[dict]:
+        with self._lock:
+            return list(reversed(self._slow))
+
+
+_profiler = None
+_profiler_lock = threading.Lock()
+
+
+def get_render_profiler() -> RenderProfiler | None:
+    """Профилировщик процесса; None, если PROFILE_RENDERS не включён."""
+    global _profiler
+    if not PROFILE_RENDERS:
+        return None
+    with _profiler_lock:
+        if _profiler is None:
+            _profiler = RenderProfiler(PROFILE_SLOW_MS, PROFILE_SAMPLE_RATE, PROFILE_DIR, PROFILE_HISTORY_SIZE)
+    return _profiler
+
+
+@contextmanager
+def profile_rerun():
+    profiler = get_render_profiler()
+    if profiler is None:
+        yield None
+        return
+    with profiler.rerun() as trace:
+        yield trace
@@ -0,0 +1,184 @@
+import threading
+import time
+from bisect import bisect_left
+from infra import profiler
+
+# Реестр SQL репозиториев: у каждого запроса есть имя, под которым копятся гистограмма
+# времени, число строк и ошибок. Подготовку выполняет кеш операторов asyncpg:
+# одинаковый текст на одном соединении готовится один раз (statement_cache_size в PoolManager).
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class QueryStats:
+    def __init__(self, name: str, sql: str | None):
+        self.name = name
+        self.sql = sql
+        self._lock = threading.Lock()
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.seconds = 0.0
+        self.rows = 0
+        self.errors = 0
+
+    def observe(self, seconds: float, rows: int, ok: bool):
+        with self._lock:
+            self.buckets[bisect_left(BUCKETS, seconds)] += 1
+            self.count += 1
+            self.seconds += seconds
+            self.rows += rows
+            if not ok:
+                self.errors += 1
+
+    def quantile(self, q: float) -> float | None:
+        # Верхняя граница корзины, в которую попадает квантиль; None - наблюдений нет
+        with self._lock:
+            if not self.count:
+                return None
+            rank = q * self.count
+            seen = 0
+            for bound, count in zip(BUCKETS + (float("inf"),), self.buckets):
+                seen += count
+                if seen >= rank:
+                    return bound
+        return float("inf")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            count, seconds, rows, errors = self.count, self.seconds, self.rows, self.errors
+            buckets = list(self.buckets)
+        return {
+            "count": count,
+            "errors": errors,
+            "rows": rows,
+            "avg_ms": seconds / count * 1000 if count else 0.0,
+            "p50_ms": _ms(self.quantile(0.5)),
+            "p95_ms": _ms(self.quantile(0.95)),
+            "p99_ms": _ms(self.quantile(0.99)),
+            "buckets": buckets,
+            "seconds": seconds,
+        }
+
+
+def _ms(seconds: float | None) -> float | None:
+    return None if seconds is None else seconds * 1000
+
+
+def _rows(method: str, result) -> int:
+    if method == "fetch":
+        return len(result)
+    if method == "execute":
+        # Статус вида "UPDATE 3" / "INSERT 0 1"
+        last = result.rsplit(" ", 1)[-1] if isinstance(result, str) else ""
+        return int(last) if last.isdigit() else 0
+    return 0 if result is None else 1
+
+
+class Query:
+    """Именованный SQL. Методы повторяют asyncpg: await QUERY.fetch(conn, *args)."""
+
+    __slots__ = ("name", "sql", "stats")
+
+    def __init__(self, name: str, sql: str, stats: QueryStats):
+        self.name = name
+        self.sql = sql
+        self.stats = stats
+
+    async def _run(self, method: str, conn, args, timeout):
+        started = time.perf_counter()
+        ok = False
+        result = None
+        try:
+            result = await getattr(conn, method)(self.sql, *args, timeout=timeout)
+            ok = True
+            return result
+        finally:
+            elapsed = time.perf_counter() - started
+            self.stats.observe(elapsed, _rows(method, result) if ok else 0, ok)
+            profiler.record(f"db:{self.name}", elapsed)
+
+    async def fetch(self, conn, *args, timeout: float | None = None):
+        return await self._run("fetch", conn, args, timeout)
+
+    async def fetchrow(self, conn, *args, timeout: float | None = None):
+        return await self._run("fetchrow", conn, args, timeout)
+
+    async def fetchval(self, conn, *args, timeout: float | None = None):
+        return await self._run("fetchval", conn, args, timeout)
+
+    async def execute(self, conn, *args, timeout: float | None = None):
+        return await self._run("execute", conn, args, timeout)
+
+
+class QueryRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: dict[str, QueryStats] = {}
+
+    def register(self, name: str, sql: str) -> Query:
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = QueryStats(name, sql)
+            elif stats.sql != sql:
+                raise ValueError(f"Запрос {name} уже зарегистрирован с другим текстом")
+        return Query(name, sql, stats)
+
+    def dynamic(self, name: str, sql: str) -> Query:
+        # Для SQL, собираемого во время выполнения: статистика общая для всех вариантов текста
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = QueryStats(name, None)
+        return Query(name, sql, stats)
+
+    def __len__(self) -> int:
+        return len(self._stats)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stats = list(self._stats.values())
+        return {item.name: item.snapshot() for item in stats}
+
+    def prometheus(self) -> str:
+        lines = [
+            "# HELP aviapp_query_duration_seconds Время выполнения SQL-запросов репозиториев",
+            "# TYPE aviapp_query_duration_seconds histogram",
+        ]
+        totals = []
+        for name, snapshot in sorted(self.snapshot().items()):
+            label = _label(name)
+            cumulative = 0
+            for bound, count in zip(BUCKETS, snapshot["buckets"]):
+                cumulative += count
+                lines.append(f'aviapp_query_duration_seconds_bucket{{query="{label}",le="{bound}"}} {cumulative}')
+            lines.append(f'aviapp_query_duration_seconds_bucket{{query="{label}",le="+Inf"}} {snapshot["count"]}')
+            lines.append(f'aviapp_query_duration_seconds_sum{{query="{label}"}} {snapshot["seconds"]}')
+            lines.append(f'aviapp_query_duration_seconds_count{{query="{label}"}} {snapshot["count"]}')
+            totals.append((label, snapshot))
+        lines.append("# HELP aviapp_query_rows_total Строк возвращено или изменено запросом")
+        lines.append("# TYPE aviapp_query_rows_total counter")
+        lines.extend(f'aviapp_query_rows_total{{query="{label}"}} {snapshot["rows"]}' for label, snapshot in totals)
+        lines.append("# HELP aviapp_query_errors_total Ошибок выполнения запроса")
+        lines.append("# TYPE aviapp_query_errors_total counter")
+        lines.extend(f'aviapp_query_errors_total{{query="{label}"}} {snapshot["errors"]}' for label, snapshot in totals)
+        return "\n".join(lines) + "\n"
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+_registry = QueryRegistry()
+
+
+def get_query_registry() -> QueryRegistry:
+    return _registry
+
+
+def register(name: str, sql: str) -> Query:
+    return _registry.register(name, sql)
+
+
+def dynamic(name: str, sql: str) -> Query:
+    return _registry.dynamic(name, sql)
@@ -0,0 +1,111 @@
+import atexit
+import threading
+from collections import defaultdict
+import redis.asyncio as aioredis
+from infra import profiler
+from infra.loop import BackgroundLoop, Bridged, get_background_loop
+from settings import (
+    REDIS_CONFIG, REDIS_MAX_CONNECTIONS, REDIS_SOCKET_TIMEOUT,
+    REDIS_CONNECT_TIMEOUT, REDIS_HEALTH_CHECK_INTERVAL,
+)
+
+
+class CommandMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = defaultdict(int)
+        self._errors = defaultdict(int)
+        self._seconds = defaultdict(float)
+
+    def record(self, name: str, seconds: float, ok: bool):
+        with self._lock:
+            self._calls[name] += 1
+            self._seconds[name] += seconds
+            if not ok:
+                self._errors[name] += 1
+        profiler.record(f"redis:{name}", seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                name: {
+                    "calls": calls,
+                    "errors": self._errors[name],
+                    "avg_ms": self._seconds[name] / calls * 1000,
+                }
+                for name, calls in self._calls.items()
+            }
+
+
+class RedisManager:
+    """Один пул соединений redis.asyncio на процесс.
+
+    Клиент живёт в фоновом цикле, get_redis() отдаёт прокси с awaitable-командами,
+    поэтому параллельные вызовы из одной сессии не блокируют друг друга.
+    """
+
+    def __init__(self, background: BackgroundLoop, config: dict, max_connections: int,
+                 socket_timeout: float, connect_timeout: float, health_check_interval: int):
+        self.background = background
+        self.metrics = CommandMetrics()
+        self._pool = aioredis.ConnectionPool(
+            **{key: value for key, value in config.items() if value is not None},
+            max_connections=max_connections,
+            socket_timeout=socket_timeout,
+            socket_connect_timeout=connect_timeout,
+            health_check_interval=health_check_interval,
+        )
+        self._client = aioredis.Redis(connection_pool=self._pool)
+        self._proxy = Bridged(self._client, background, self.metrics)
+        self._closed = False
+
+    @property
+    def client(self) -> Bridged:
+        return self._proxy
+
+    @property
+    def raw_client(self) -> aioredis.Redis:
+        # Только для кода, который сам выполняется в фоновом цикле
+        return self._client
+
+    async def _close(self):
+        await self._client.aclose()
+        await self._pool.disconnect()
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self.background.run_sync(self._close(), timeout=10)
+
+    def stats(self) -> dict:
+        return {
+            "max_connections": self._pool.max_connections,
+            "created_connections": getattr(self._pool, "_created_connections", 0),
+            "in_use_connections": len(getattr(self._pool, "_in_use_connections", ())),
+            "available_connections": len(getattr(self._pool, "_available_connections", ())),
+            "commands": self.metrics.snapshot(),
+        }
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_redis_manager() -> RedisManager:
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = RedisManager(
+                get_background_loop(),
+                REDIS_CONFIG,
+                max_connections=REDIS_MAX_CONNECTIONS,
+                socket_timeout=REDIS_SOCKET_TIMEOUT,
+                connect_timeout=REDIS_CONNECT_TIMEOUT,
+                health_check_interval=REDIS_HEALTH_CHECK_INTERVAL,
+            )
+            atexit.register(_manager.close)
+    return _manager
+
+
+def get_redis() -> Bridged:
+    return get_redis_manager().client
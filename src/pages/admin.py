@@ -1,66 +1,156 @@
 import streamlit as st
-import threading
-from datetime import datetime
+from datetime import datetime, date, time, timedelta
 import asyncio
-import json
+import os
+import uuid
 import pandas as pd
 import repositories.flights
 import repositories.user
-from settings import get_redis, REDIS_KEY_PREFIX
-
-async def fetch_users(pool):
-    return await repositories.user.get_all_users(pool)
-
-async def fetch_flights(pool):
-    return await repositories.flights.get_all_flights(pool)
-
-async def fetch_bookings(pool):
-    return await repositories.flights.get_all_bookings(pool)
-
-async def fetch_payments(pool):
-    return await repositories.flights.get_all_payments(pool)
-
-async def fetch_reviews(pool):
-    return await repositories.flights.get_all_reviews(pool)
+from infra.profiler import get_render_profiler, span
+from infra.queries import get_query_registry
+from infra.redis_pool import get_redis, get_redis_manager
+from services.booking_notifier import get_booking_notifier
+from services.export import EXPORT_TABLES, EXPORT_FORMATS, export_table_to_file
+from services.schedule_import import SCHEDULE_COLUMNS, import_schedule
+from services.flight_templates import WEEKDAYS, generate_flights
+from services.session import forget_session
+from settings import REDIS_KEY_PREFIX, BOOKING_NOTIFY_INTERVAL, EXPORT_DOWNLOAD_LIMIT_MB
+
+PAGE_SIZE = 50
+
+
+def parse_id_filter(value: str) -> int | None:
+    return int(value) if value.isdigit() else None
+
+
+def parse_id_list(text: str) -> tuple[list[int], list[str]]:
+    # ID через запятую, пробел или с новой строки; возвращает корректные и отклонённые значения
+    tokens = text.replace(",", " ").split()
+    return [int(token) for token in tokens if token.isdigit()], [token for token in tokens if not token.isdigit()]
+
+
+async def show_paginated_table(pool, key: str, fetch_page, columns: list[str], empty_message: str,
+                               filters: dict | None = None, sortable: bool = True, **dataframe_kwargs):
+    # В session_state хранится только стек ключей начала страниц, строки - только текущей страницы
+    descending = st.toggle("Сначала новые", key=f"{key}_descending") if sortable else False
+    params = (filters, descending)
+    state_key = f"{key}_pages"
+    if state_key not in st.session_state or st.session_state[state_key]["params"] != params:
+        st.session_state[state_key] = {"params": params, "stack": [None]}
+    stack = st.session_state[state_key]["stack"]
+
+    rows, next_after = await fetch_page(pool, after=stack[-1], limit=PAGE_SIZE, descending=descending,
+                                        **(filters or {}))
+    if rows:
+        with span("dataframe"):
+            df = pd.DataFrame(rows)
+            df.columns = columns
+        st.dataframe(df, **dataframe_kwargs)
+    else:
+        st.write(empty_message)
+
+    col_prev, col_page, col_next = st.columns(3)
+    col_prev.button("Назад", key=f"{key}_prev", disabled=len(stack) == 1, on_click=stack.pop)
+    col_page.write(f"Страница {len(stack)}")
+    col_next.button("Вперёд", key=f"{key}_next", disabled=next_after is None,
+                    on_click=stack.append, args=(next_after,))
+
+
+async def search_reviews_page(pool, after=None, limit=PAGE_SIZE, descending=False, text="", **filters):
+    return await repositories.flights.search_reviews(pool, text, after=after, limit=limit, **filters)
+
+
+@st.fragment(run_every=BOOKING_NOTIFY_INTERVAL)
+def show_booking_notifications():
+    # Поток бронирований читает один общий подписчик, здесь только забираем очередь сессии
+    if 'notify_session_id' not in st.session_state:
+        st.session_state.notify_session_id = uuid.uuid4().hex
+    for event in get_booking_notifier().drain(st.session_state.notify_session_id):
+        st.toast(f"Новое бронирование! Рейс #{event['flight_id']}", icon="✈️")
 
+async def show_export_form(pool):
+    with st.form(key='export_form'):
+        table = st.selectbox("Таблица", options=EXPORT_TABLES)
+        export_format = st.selectbox("Формат", options=EXPORT_FORMATS)
+        submit_export_button = st.form_submit_button("Выгрузить")
+
+    if submit_export_button:
+        try:
+            # Выгрузка идёт потоком в файл на сервере, память не зависит от числа строк
+            path = await export_table_to_file(pool, table, export_format)
+        except RuntimeError as e:
+            st.error(str(e))
+            return
+        size_mb = os.path.getsize(path) / 1024 / 1024
+        st.success(f"Файл выгрузки: {path} ({size_mb:.1f} МБ)")
+        if size_mb <= EXPORT_DOWNLOAD_LIMIT_MB:
+            with open(path, "rb") as f:
+                st.download_button("Скачать выгрузку", data=f, file_name=os.path.basename(path))
+        else:
+            st.info("Файл слишком большой для скачивания через браузер, заберите его с сервера.")
+
+async def show_flight_templates(pool):
+    st.subheader("Шаблоны регулярных рейсов")
+
+    with st.expander("Показать шаблоны"):
+        await show_paginated_table(
+            pool, "flight_templates", repositories.flights.get_flight_templates_page,
+            ["ID", "id авиакомпании", "id аэропорта вылета", "id аэропорта прилета", "Дни недели",
+             "Время вылета", "Длительность", "Количество мест", "Цена", "Действует с", "Действует по"],
+            "Нет шаблонов для отображения.",
+        )
+
+    with st.form(key='add_template_form'):
+        airline_id = st.text_input("ID авиакомпании", key="template_airline_id")
+        departure_airport_id = st.text_input("ID аэропорта вылета", key="template_departure_airport_id")
+        arrival_airport_id = st.text_input("ID аэропорта прилета", key="template_arrival_airport_id")
+        weekdays = st.multiselect("Дни недели", options=list(WEEKDAYS), format_func=WEEKDAYS.get)
+        departure_local_time = st.time_input("Местное время вылета", value=time(10, 0))
+        duration_minutes = st.number_input("Длительность полета, минут", min_value=1, value=90)
+        number_seats = st.number_input("Количество мест", min_value=1, key="template_number_seats")
+        price = st.number_input("Цена", min_value=0.0, key="template_price")
+        valid_from = st.date_input("Действует с", value=date.today())
+        valid_to = st.date_input("Действует по", value=date.today() + timedelta(days=365))
+
+        submit_template_button = st.form_submit_button("Сохранить шаблон")
+
+        if submit_template_button:
+            if not (airline_id.isdigit() and departure_airport_id.isdigit() and arrival_airport_id.isdigit()):
+                st.error("Ошибка: ID должны быть целыми числами.")
+            elif not weekdays:
+                st.error("Выберите хотя бы один день недели.")
+            elif valid_to < valid_from:
+                st.error("Дата окончания раньше даты начала.")
+            else:
+                template_id = await repositories.flights.add_flight_template(
+                    pool, int(airline_id), int(departure_airport_id), int(arrival_airport_id), sorted(weekdays),
+                    departure_local_time, timedelta(minutes=duration_minutes), number_seats, price,
+                    valid_from, valid_to,
+                )
+                if template_id:
+                    st.success(f"Шаблон {template_id} сохранён.")
+                else:
+                    st.error("Ошибка при сохранении шаблона.")
 
-def listen_bookings():
-    redis_client = get_redis()
-    pubsub = redis_client.pubsub()
-    pubsub.subscribe(f"{REDIS_KEY_PREFIX}bookings")  # Подписываемся на канал
-    
-    while True:
-        message = pubsub.get_message()  # Получаем сообщение
-        if message and message['type'] == 'message':
-            try:
-                data = json.loads(message['data'])
-                # Сохраняем событие в session_state
-                st.session_state.last_booking_event = data
-                st.experimental_rerun()  # Триггерим обновление страницы
-            except Exception as e:
-                print(f"Ошибка обработки сообщения: {e}")
-
-# Запускаем поток при первом открытии админки
-if "pubsub_thread" not in st.session_state:
-    thread = threading.Thread(target=listen_bookings, daemon=True)
-    thread.start()
-    st.session_state.pubsub_thread = thread
+    if st.button("Создать рейсы по шаблонам"):
+        result = await generate_flights(pool)
+        st.success(
+            f"Шаблонов: {result['templates']}, создано рейсов: {result['created']} "
+            f"на период {result['horizon_start']} - {result['horizon_end']}"
+        )
 
 async def admin_page_users(pool):
     st.title("Административная панель")
 
-    if 'users' not in st.session_state:
-        st.session_state.users = await fetch_users(pool)
-
     st.subheader("Управление пользователями")
     
     with st.expander("Показать пользователей"):
-        if st.session_state.users:
-            users_df = pd.DataFrame(st.session_state.users)
-            users_df.columns = ["ID", "Имя", "Логин", "Роль"]
-            st.dataframe(users_df) 
-        else:
-            st.write("Нет пользователей для отображения.")
+        role_filter = st.selectbox("Роль", options=["все", "admin", "user"], key="users_role_filter")
+        await show_paginated_table(
+            pool, "users", repositories.user.get_users_page,
+            ["ID", "Имя", "Логин", "Роль"], "Нет пользователей для отображения.",
+            filters={"role": None if role_filter == "все" else role_filter},
+        )
 
         with st.form(key='change_role_form'):
             user_id = st.text_input("Введите ID пользователя для изменения роли", "")
@@ -73,7 +163,6 @@ async def admin_page_users(pool):
                     success = await repositories.user.change_user_role(pool, int(user_id), new_role)
                     if success:
                         st.success("Роль пользователя изменена успешно!")
-                        st.session_state.users = await fetch_users(pool)
                     else:
                         st.error("Ошибка при изменении роли пользователя.")
                 else:
@@ -89,12 +178,41 @@ async def admin_page_users(pool):
                     success = await repositories.user.delete_user(pool, int(user_id_to_delete))
                     if success:
                         st.success("Пользователь удалён успешно!")
-                        st.session_state.users = await fetch_users(pool)
                     else:
                         st.error("Ошибка при удалении пользователя.")
                 else:
                     st.error("Ошибка: ID пользователя должен быть целым числом.")
 
+        with st.form(key='batch_users_form'):
+            st.write("Пакетная операция над пользователями")
+            ids_text = st.text_area("ID пользователей (через запятую, пробел или с новой строки)")
+            ids_file = st.file_uploader("или файл со списком ID", type=["txt", "csv"])
+            action = st.selectbox("Действие", options=["Удалить", "Назначить роль admin", "Назначить роль user"])
+
+            submit_batch_button = st.form_submit_button("Выполнить")
+
+            if submit_batch_button:
+                text = ids_text + "\n" + (ids_file.getvalue().decode("utf-8-sig") if ids_file else "")
+                user_ids, invalid = parse_id_list(text)
+                if invalid:
+                    st.warning(f"Пропущены некорректные значения: {', '.join(invalid[:20])}")
+                if not user_ids:
+                    st.error("Не указано ни одного ID пользователя.")
+                else:
+                    try:
+                        if action == "Удалить":
+                            done = await repositories.user.delete_users(pool, user_ids)
+                            st.success(f"Удалено пользователей: {len(done)} из {len(set(user_ids))}")
+                        else:
+                            role = action.rsplit(" ", 1)[1]
+                            done = await repositories.user.change_users_role(pool, user_ids, role)
+                            st.success(f"Роль {role} назначена пользователям: {len(done)} из {len(set(user_ids))}")
+                        skipped = sorted(set(user_ids) - set(done))
+                        if skipped:
+                            st.info(f"Не найдены или не могут быть удалены: {', '.join(map(str, skipped[:50]))}")
+                    except Exception as e:
+                        st.error(f"Ошибка пакетной операции: {e}")
+
 
     if st.button("Выход"):
         st.session_state['user'] = None
@@ -103,19 +221,18 @@ async def admin_page_users(pool):
 
 async def admin_page_flights(pool):
 
-    if 'flights' not in st.session_state:
-        st.session_state.flights = await fetch_flights(pool)
-
     st.title("Административная панель")
     st.subheader("Управление рейсами")
     
     with st.expander("Показать рейсы"):
-        if st.session_state.flights:
-            flights_df = pd.DataFrame(st.session_state.flights)
-            flights_df.columns = ["ID", "id авиакомпании", "id аэропорта вылета", "id аэропорта прилета", "Время вылета", "Время прилета ", "Количество мест", "Цена"]
-            st.dataframe(flights_df, width=1500, height=400) 
-        else:
-            st.write("Нет рейсов для отображения.")
+        airline_filter = st.text_input("Фильтр по id авиакомпании", key="flights_airline_filter")
+        await show_paginated_table(
+            pool, "flights", repositories.flights.get_flights_page,
+            ["ID", "id авиакомпании", "id аэропорта вылета", "id аэропорта прилета", "Время вылета", "Время прилета ", "Количество мест", "Цена"],
+            "Нет рейсов для отображения.",
+            filters={"airline_id": parse_id_filter(airline_filter)},
+            width=1500, height=400,
+        )
 
         with st.form(key='add_flight_form'):
             airline_id = st.text_input("ID авиакомпании")
@@ -143,12 +260,36 @@ async def admin_page_flights(pool):
 
                     if success:
                         st.success("Рейс добавлен успешно!")
-                        st.session_state.flights = await fetch_flights(pool)
                     else:
                         st.error("Ошибка при добавлении рейса.")
                 except ValueError:
                     st.error("Ошибка: убедитесь, что все ID введены корректно и являются целыми числами.")
 
+    await show_flight_templates(pool)
+
+    st.subheader("Загрузка расписания")
+    with st.form(key='import_schedule_form'):
+        st.write(f"CSV с заголовком: {', '.join(SCHEDULE_COLUMNS)}")
+        schedule_file = st.file_uploader("Файл расписания", type=["csv"])
+        submit_import_button = st.form_submit_button("Загрузить расписание")
+
+        if submit_import_button:
+            if schedule_file is None:
+                st.error("Выберите файл расписания.")
+            else:
+                try:
+                    result = await import_schedule(pool, schedule_file)
+                    st.success(
+                        f"Строк в файле: {result['total']}, добавлено рейсов: {result['inserted']}, "
+                        f"обновлено: {result['updated']}, с ошибками: {result['error_count']}"
+                    )
+                    if result['errors']:
+                        errors_df = pd.DataFrame(result['errors'])
+                        errors_df.columns = ["Строка", "Ошибка"]
+                        st.dataframe(errors_df)
+                except ValueError as e:
+                    st.error(str(e))
+
 
     if st.button("Выход"):
         st.session_state['user'] = None
@@ -157,56 +298,109 @@ async def admin_page_flights(pool):
 async def admin_page_bookings(pool):
     st.title("Административная панель")
 
-    if 'last_booking_event' in st.session_state:
-        event = st.session_state.last_booking_event
-        st.toast(f"Новое бронирование! Рейс #{event['flight_id']}", icon="✈️")
-        del st.session_state.last_booking_event
-
-    if 'bookings' not in st.session_state:
-        st.session_state.bookings = await fetch_bookings(pool)
+    show_booking_notifications()
 
     st.subheader("Брони")
 
     with st.expander("Показать бронирования"):
-        if st.session_state.bookings:
-            bookings_df = pd.DataFrame(st.session_state.bookings)
-            bookings_df.columns = ["ID", "id пользователя", "Номер рейса", "Время бронирования","Статус"]
-            st.dataframe(bookings_df)
-        else:
-            st.write("Нет бронирований для отображения.")
+        user_filter = st.text_input("Фильтр по id пользователя", key="bookings_user_filter")
+        await show_paginated_table(
+            pool, "bookings", repositories.flights.get_bookings_page,
+            ["ID", "id пользователя", "Номер рейса", "Место", "Время бронирования","Статус"],
+            "Нет бронирований для отображения.",
+            filters={"user_id": parse_id_filter(user_filter)},
+        )
     
     st.subheader("Платежи")
 
-    if 'payments' not in st.session_state:
-        st.session_state.payments = await fetch_payments(pool)
-
     with st.expander("Показать платежи"):
-        if st.session_state.payments:
-            bookings_df = pd.DataFrame(st.session_state.payments)
-            bookings_df.columns = ["ID", "id брони", "Сумма", "Время бронирования","Способ оплаты"]
-            st.dataframe(bookings_df)
-        else:
-            st.write("Нет платежей для отображения.")
+        booking_filter = st.text_input("Фильтр по id брони", key="payments_booking_filter")
+        await show_paginated_table(
+            pool, "payments", repositories.flights.get_payments_page,
+            ["ID", "id брони", "Сумма", "Время бронирования","Способ оплаты"],
+            "Нет платежей для отображения.",
+            filters={"booking_id": parse_id_filter(booking_filter)},
+        )
+
+    st.subheader("Выгрузка")
+    await show_export_form(pool)
     if st.button("Выход"):
         st.session_state['user'] = None
         st.session_state['page'] = 'login'
         st.rerun()
 
-async def admin_page_reviews(pool):
+async def admin_page_performance(pool):
     st.title("Административная панель")
 
-    if 'reviews' not in st.session_state:
-        st.session_state.reviews = await fetch_reviews(pool)
+    st.subheader("Время отрисовки страниц")
+    profiler = get_render_profiler()
+    if profiler is None:
+        st.info("Профилирование выключено, включается переменной окружения PROFILE_RENDERS=1.")
+    else:
+        page_stats = profiler.page_stats()
+        if page_stats:
+            st.dataframe(pd.DataFrame(page_stats).rename(columns={
+                "page": "Страница", "reruns": "Reruns", "p50_ms": "p50, мс", "p95_ms": "p95, мс", "max_ms": "max, мс",
+            }), use_container_width=True)
+        else:
+            st.write("Ещё нет данных.")
+
+        st.subheader(f"Медленные отрисовки (дольше {profiler.slow_ms:.0f} мс)")
+        slow = profiler.slow_renders()
+        if not slow:
+            st.write("Медленных отрисовок нет.")
+        for entry in slow[:PAGE_SIZE]:
+            with st.expander(f"{entry['time']} · {entry['page']} · {entry['total_ms']} мс"):
+                breakdown = sorted(entry['breakdown'].items(), key=lambda item: item[1]['ms'], reverse=True)
+                st.dataframe(pd.DataFrame(
+                    [{"Отрезок": name, "мс": item['ms'], "Вызовов": item['calls']} for name, item in breakdown]
+                ), use_container_width=True)
+                if entry['profile']:
+                    st.write(f"Профиль cProfile: `{entry['profile']}`")
+
+    st.subheader("SQL-запросы")
+    queries = [{"Запрос": name, **{key: value for key, value in item.items() if key not in ("buckets", "seconds")}}
+               for name, item in get_query_registry().snapshot().items() if item["count"]]
+    if queries:
+        st.dataframe(pd.DataFrame(queries).sort_values("p95_ms", ascending=False), use_container_width=True)
+    else:
+        st.write("Запросы ещё не выполнялись.")
+
+    st.subheader("Команды Redis")
+    commands = get_redis_manager().metrics.snapshot()
+    if commands:
+        st.dataframe(pd.DataFrame.from_dict(commands, orient="index"), use_container_width=True)
+
+    st.subheader("Пул соединений Postgres")
+    st.json(pool.stats())
+
+async def admin_page_reviews(pool):
+    st.title("Административная панель")
 
     st.subheader("Отзывы")
 
     with st.expander("Показать отзывы"):
-        if st.session_state.reviews:
-            reviews_df = pd.DataFrame(st.session_state.reviews)
-            reviews_df.columns = ["ID", "id пользователя", "id авиакомпании", "Рейтинг","Комментарий"]
-            st.dataframe(reviews_df)
+        search_text = st.text_input("Поиск по тексту отзыва", key="reviews_search")
+        airline_filter = st.text_input("Фильтр по id авиакомпании", key="reviews_airline_filter")
+        rating_filter = st.selectbox("Рейтинг", [None, 1, 2, 3, 4, 5], key="reviews_rating_filter",
+                                     format_func=lambda rating: "Любой" if rating is None else str(rating))
+        filters = {"airline_id": parse_id_filter(airline_filter), "rating": rating_filter}
+        if search_text.strip():
+            # Поиск идёт по GIN-индексу, результаты отсортированы по релевантности
+            await show_paginated_table(
+                pool, "reviews_search", search_reviews_page,
+                ["ID", "id пользователя", "id авиакомпании", "Рейтинг", "Комментарий", "Релевантность"],
+                "Ничего не найдено.",
+                filters={"text": search_text.strip(), **filters},
+                sortable=False,
+            )
         else:
-            st.write("Нет отзывов для отображения.")
+            await show_paginated_table(
+                pool, "reviews", repositories.flights.get_reviews_page,
+                ["ID", "id пользователя", "id авиакомпании", "Рейтинг","Комментарий"],
+                "Нет отзывов для отображения.",
+                filters=filters,
+            )
 
         with st.form(key='delete_review_form'):
             review_id_to_delete = st.text_input("Введите ID отзыва для удаления", "")
@@ -218,7 +412,6 @@ async def admin_page_reviews(pool):
                     success = await repositories.user.delete_review(pool, int(review_id_to_delete))
                     if success:
                         st.success("Отзыв удалён успешно!")
-                        st.session_state.users = await fetch_reviews(pool)
                     else:
                         st.error("Ошибка при удалении отзыва.")
                 else:
@@ -228,10 +421,11 @@ async def admin_page_reviews(pool):
         if auth_token:
             redis_client = get_redis()
         
-            redis_client.delete(
+            await redis_client.delete(
                 f"{REDIS_KEY_PREFIX}auth_token:{auth_token}",
                 f"{REDIS_KEY_PREFIX}session:{auth_token}"
             )
+            forget_session(auth_token)
     
         st.session_state.clear()
         st.session_state['user'] = None
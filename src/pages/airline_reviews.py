@@ -3,18 +3,29 @@ import pandas as pd
 import logging
 import repositories.flights
 import asyncio
-from settings import get_redis, REDIS_KEY_PREFIX,TOKEN_TTL, SESSION_TTL
+from infra.profiler import span
+from infra.redis_pool import get_redis
+from services.session import forget_session
+from settings import REDIS_KEY_PREFIX,TOKEN_TTL, SESSION_TTL
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+REVIEWS_PAGE_SIZE = 20
+
 async def get_airlines(pool) -> list[dict]:
     
     try:
         logger.info("Получение авиакомпаний")
+        # Авиакомпании - из кеша справочников, сводка оценок посчитана триггерами: один запрос
         airlines = await repositories.flights.get_airlines(pool)
+        summaries = {
+            summary['airline_id']: dict(summary)
+            for summary in await repositories.flights.get_airline_rating_summaries(pool)
+        }
+        empty = {'review_count': 0, 'average_rating': None, 'histogram': [0, 0, 0, 0, 0]}
         
-        airlines = [dict(airline) for airline in airlines]
+        airlines = [{**airline, **summaries.get(airline['airline_id'], empty)} for airline in airlines]
         if not airlines:
             st.warning("Не удалось получить список авиакомпаний.")
             return []
@@ -33,20 +44,46 @@ async def add_review(pool, user_id, airline_id, rating, comment):
         st.error("Произошла ошибка при добавлении отзыва.")
         return False
 
-async def get_reviews(pool, airline_id) -> list[dict]:
+async def get_reviews(pool, airline_id, after=None) -> tuple[list[dict], int | None]:
     try:
         logger.info("Получение отзывов")
-        reviews = await repositories.flights.get_reviews(pool, airline_id)
+        reviews, next_after = await repositories.flights.get_airline_reviews_page(
+            pool, airline_id, after, REVIEWS_PAGE_SIZE
+        )
         
         
-        return [dict(review) for review in reviews]
+        return [dict(review) for review in reviews], next_after
     except Exception as e:
         logger.error(f"Ошибка при получении отзывов: {e}")
         st.error("Произошла ошибка при загрузке списка отзывов.")
-        return []
+        return [], None
     
     
 
+async def show_reviews(pool, airline_id):
+    # Отзывы грузятся только для выбранной авиакомпании, страницами по review_id
+    state_key = f"reviews_pages_{airline_id}"
+    if state_key not in st.session_state:
+        st.session_state[state_key] = [None]
+    stack = st.session_state[state_key]
+
+    reviews, next_after = await get_reviews(pool, airline_id, stack[-1])
+    if reviews:
+        for review in reviews:
+            st.write(f"**Пользователь:** {review['username']}")
+            st.write(f"**Рейтинг:** {review['rating']}")
+            st.write(f"**Отзыв:** {review['comment']}")
+            st.write("---")
+    else:
+        st.write("Нет отзывов для отображения.")
+
+    col_prev, col_page, col_next = st.columns(3)
+    col_prev.button("Назад", key=f"{state_key}_prev", disabled=len(stack) == 1, on_click=stack.pop)
+    col_page.write(f"Страница {len(stack)}")
+    col_next.button("Вперёд", key=f"{state_key}_next", disabled=next_after is None,
+                    on_click=stack.append, args=(next_after,))
+
+
 async def show_airline_reviews_page(pool, user_id):
     st.title("Отзывы об авиакомпаниях")
 
@@ -56,44 +93,48 @@ async def show_airline_reviews_page(pool, user_id):
         st.write("Нет доступных авиакомпаний.")
         return
 
-    airlines_df = pd.DataFrame(airlines)
+    with span("dataframe"):
+        airlines_df = pd.DataFrame(airlines)
     
     st.subheader("Список авиакомпаний")
-    st.dataframe(airlines_df[['name', 'code', 'country']], use_container_width=True)
+    st.dataframe(
+        airlines_df[['name', 'code', 'country', 'average_rating', 'review_count']].rename(
+            columns={'average_rating': 'Средняя оценка', 'review_count': 'Отзывов'}
+        ),
+        use_container_width=True,
+    )
+
+    st.subheader("Подробная информация об авиакомпании")
+    airline = st.selectbox(
+        "Выберите авиакомпанию", airlines, format_func=lambda airline: airline['name'], key="review_airline"
+    )
+    st.write(f"**Код авиакомпании:** {airline['code']}")
+    st.write(f"**Страна:** {airline['country']}")
+    if airline['review_count']:
+        st.write(f"**Средняя оценка:** {airline['average_rating']} ({airline['review_count']} отзывов)")
+        st.bar_chart(pd.DataFrame({"Отзывов": airline['histogram']}, index=[1, 2, 3, 4, 5]))
 
-    st.subheader("Подробная информация об авиакомпаниях")
-    for index, airline in airlines_df.iterrows():
-        with st.expander(airline['name'], expanded=False):
-            st.write(f"**Код авиакомпании:** {airline['code']}")
-            st.write(f"**Страна:** {airline['country']}")
-            
-            review = st.text_area(f"Оставьте отзыв об авиакомпании {airline['name']}", key=f"review_{index}")
-            rating = st.slider(f"Выберите рейтинг для {airline['name']}", 1, 5, 1, key=f"rating_{index}")
-            if st.button("Отправить отзыв", key=f"submit_{index}"):
-                if review:
-                    await add_review(pool, user_id, airline['airline_id'], rating, review)
-                    st.success("Ваш отзыв успешно отправлен!")
-                else:
-                    st.warning("Пожалуйста, напишите отзыв перед отправкой.")
-            st.subheader("Отзывы пользователей")
-            reviews = await get_reviews(pool, airline['airline_id'])
-            if reviews:
-                for review in reviews:
-                    st.write(f"**Пользователь:** {review['username']}")
-                    st.write(f"**Рейтинг:** {review['rating']}")
-                    st.write(f"**Отзыв:** {review['comment']}")
-                    st.write("---")
-            else:
-                st.write("Нет отзывов для отображения.")
+    review = st.text_area(f"Оставьте отзыв об авиакомпании {airline['name']}", key=f"review_{airline['airline_id']}")
+    rating = st.slider(f"Выберите рейтинг для {airline['name']}", 1, 5, 1, key=f"rating_{airline['airline_id']}")
+    if st.button("Отправить отзыв", key=f"submit_{airline['airline_id']}"):
+        if review:
+            await add_review(pool, user_id, airline['airline_id'], rating, review)
+            st.session_state.pop(f"reviews_pages_{airline['airline_id']}", None)
+            st.success("Ваш отзыв успешно отправлен!")
+        else:
+            st.warning("Пожалуйста, напишите отзыв перед отправкой.")
+    st.subheader("Отзывы пользователей")
+    await show_reviews(pool, airline['airline_id'])
     if st.button("Выход"):
         auth_token = st.session_state.get("auth_token")
         if auth_token:
             redis_client = get_redis()
         
-            redis_client.delete(
+            await redis_client.delete(
                 f"{REDIS_KEY_PREFIX}auth_token:{auth_token}",
                 f"{REDIS_KEY_PREFIX}session:{auth_token}"
             )
+            forget_session(auth_token)
     
         st.session_state.clear()
         st.session_state['user'] = None
@@ -5,13 +5,19 @@ import pandas as pd
 import logging
 import asyncio
 from services.book import BookingService
-from settings import get_redis, REDIS_KEY_PREFIX
+from services.seat_inventory import SeatsUnavailableError
+from asyncpg.exceptions import CheckViolationError, UniqueViolationError
+from infra.redis_pool import get_redis
+from services.session import forget_session
+from settings import REDIS_KEY_PREFIX
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 if "booked_flights" not in st.session_state:
-    st.session_state.booked_flights = pd.DataFrame(columns=["Рейс", "пользователь"])
+    st.session_state.booked_flights = pd.DataFrame(columns=["Рейс", "пользователь", "Место"])
+
+SEATS_PER_ROW = 6
 
 async def get_cities(pool) -> list[str]:
     try:
@@ -62,21 +68,37 @@ async def search_flights(pool, departure_airport: str, arrival_airport: str, dep
 
 def clear_table_event():
     st.session_state.booked_flights = pd.DataFrame(
-        columns=["Рейс", "Пользователь"]
+        columns=["Рейс", "Пользователь", "Место"]
     )
 
 
-def book_flight(flight_id, user_id):
+def book_flight(flight_id, user_id, seat=None):
     new_row = pd.DataFrame(
         {
             "Рейс": [flight_id],
-            "Пользователь": [user_id]
+            "Пользователь": [user_id],
+            "Место": [seat]
         }
     )
     st.session_state.booked_flights = pd.concat(
         [st.session_state.booked_flights, new_row], ignore_index=True
     )
 
+def render_seat_map(seat_map: str) -> str:
+    # ■ - занято, □ - свободно; номер ряда слева
+    rows = []
+    for start in range(0, len(seat_map), SEATS_PER_ROW):
+        row = seat_map[start:start + SEATS_PER_ROW]
+        rows.append(f"{start // SEATS_PER_ROW + 1:>3} " + "".join("■" if bit == "1" else "□" for bit in row))
+    return "\n".join(rows)
+
+
+def free_seats(seat_map: str, flight_id) -> list[int]:
+    cart = st.session_state.booked_flights
+    in_cart = set(cart.loc[cart["Рейс"] == flight_id, "Место"].dropna()) if "Место" in cart else set()
+    return [i + 1 for i, bit in enumerate(seat_map) if bit == "0" and i + 1 not in in_cart]
+
+
 async def upload_sales(booked_flights: pd.DataFrame, pool):
     booking_date = datetime.now()
     await BookingService().process_sale(
@@ -134,19 +156,36 @@ async def show_flight_search_and_booking_page(pool, user_id):
 
     flight_ids = [flight['flight_id'] for flight in flights]
     selected_flight= st.selectbox("Выберите рейс", flight_ids)
+    selected_seat = None
+    if selected_flight is not None:
+        seat_map = await repositories.flights.get_seat_map(pool, selected_flight)
+        if seat_map:
+            with st.expander("Карта мест"):
+                st.code(render_seat_map(seat_map))
+            selected_seat = st.selectbox(
+                "Место", [None] + free_seats(seat_map, selected_flight),
+                format_func=lambda seat: "Любое" if seat is None else str(seat),
+            )
     add_flight_btn = st.button("Добавить рейс в корзину")
 
     clear_table_btn = st.button("Очистить корзину")
     apply_btn = st.button("Забронировать билеты")
     if add_flight_btn:
-        book_flight(selected_flight, user_id)
+        book_flight(selected_flight, user_id, selected_seat)
     if clear_table_btn:
         clear_table_event()
     if apply_btn and hasattr(st.session_state, 'booked_flights') and not st.session_state.booked_flights.empty:
-        await upload_sales(st.session_state.booked_flights, pool)
-        #repositories.flights.decrement_seat_count(selected_flight)
-        st.success("Подтвердите бронь на странице 'Мой профиль'")
-        clear_table_event()
+        try:
+            await upload_sales(st.session_state.booked_flights, pool)
+            #repositories.flights.decrement_seat_count(selected_flight)
+            st.success("Подтвердите бронь на странице 'Мой профиль'")
+            clear_table_event()
+        except SeatsUnavailableError as e:
+            st.error(f"{e}. Уберите рейс из корзины и повторите.")
+        except CheckViolationError:
+            st.error("На одном из рейсов закончились места. Обновите поиск и повторите.")
+        except UniqueViolationError:
+            st.error("Выбранное место уже занято. Выберите другое место.")
 
     st.write("Корзина:")
     st.dataframe(st.session_state.booked_flights)
@@ -156,10 +195,11 @@ async def show_flight_search_and_booking_page(pool, user_id):
         if auth_token:
             redis_client = get_redis()
         
-            redis_client.delete(
+            await redis_client.delete(
                 f"{REDIS_KEY_PREFIX}auth_token:{auth_token}",
                 f"{REDIS_KEY_PREFIX}session:{auth_token}"
             )
+            forget_session(auth_token)
     
         st.session_state.clear()
         st.session_state['user'] = None
@@ -1,10 +1,12 @@
 import streamlit as st
-import pandas as pd
 from datetime import datetime
 import repositories.flights
 import repositories.user
+from services.export import export_user_bookings_bytes
 import asyncio
-from settings import get_redis, REDIS_KEY_PREFIX
+from infra.redis_pool import get_redis
+from services.session import forget_session
+from settings import REDIS_KEY_PREFIX
 
 async def confirm_booking(pool, booking_id, booking_price):
     print(f"Подтверждение бронирования {booking_id}")
@@ -38,15 +40,18 @@ async def show_my_bookings_page(pool, user_id):
     bookings = await repositories.flights.get_user_bookings(pool, user_id)
     
     if bookings:
-        df = pd.DataFrame(bookings)
-        
-        csv = df.to_csv(index=False)
-        st.download_button(
-            label="Скачать мои забронированные билеты в формате CSV",
-            data=csv,
-            file_name='my_bookings.csv',
-            mime='text/csv',
-        )
+        export_format = st.selectbox("Формат выгрузки", ["csv", "parquet"], key="my_bookings_format")
+        if st.button("Сформировать выгрузку моих бронирований"):
+            try:
+                data = await export_user_bookings_bytes(pool, user_id, export_format)
+                st.download_button(
+                    label=f"Скачать мои забронированные билеты в формате {export_format.upper()}",
+                    data=data,
+                    file_name=f'my_bookings.{export_format}',
+                    mime='text/csv' if export_format == 'csv' else 'application/octet-stream',
+                )
+            except RuntimeError as e:
+                st.error(str(e))
         
         for booking in bookings:
             st.markdown("---") 
@@ -115,10 +120,11 @@ async def show_my_bookings_page(pool, user_id):
         if auth_token:
             redis_client = get_redis()
         
-            redis_client.delete(
+            await redis_client.delete(
                 f"{REDIS_KEY_PREFIX}auth_token:{auth_token}",
                 f"{REDIS_KEY_PREFIX}session:{auth_token}"
             )
+            forget_session(auth_token)
     
         st.session_state.clear()
         st.session_state['user'] = None
@@ -2,6 +2,7 @@
 import streamlit as st
 import asyncio
 import asyncpg
+from infra.password_hasher import PasswordHasherBusy
 from repositories.user import register_user
 
 
@@ -13,7 +14,12 @@ async def register_page(pool):
 
 
     if st.button("Зарегистрироваться"):
-        if await register_user(pool, name, new_login, new_password):
+        try:
+            registered = await register_user(pool, name, new_login, new_password)
+        except PasswordHasherBusy:
+            st.error("Сервер перегружен, повторите регистрацию через несколько секунд.")
+            return
+        if registered:
             st.success("Регистрация успешна!")
             st.session_state['page'] = 'login'
             st.rerun()
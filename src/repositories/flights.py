@@ -2,45 +2,41 @@ import psycopg2
 import psycopg2.extras
 import asyncpg
 from datetime import datetime
-from pandas import DataFrame
-from settings import get_redis, REDIS_KEY_PREFIX, CITIES_TTL, AIRPORTS_TTL
-import json
+from pandas import DataFrame, Timestamp, isna
+from infra.queries import Query, dynamic, register
+from infra.redis_pool import get_redis
+from repositories.pagination import fetch_page, stream_rows
+from repositories.reference_cache import get_reference_cache
+from repositories.search_cache import search_cache_key, get_cached_search, store_search
+from repositories.single_flight import single_flight
+from settings import REDIS_KEY_PREFIX, CITIES_TTL, AIRPORTS_TTL, AIRLINES_TTL, RATING_SUMMARY_TTL
 
 
 
-async def get_cities(pool) -> list[dict]:
-    print("Получение городов")
-    redis_client = get_redis()
-    cache_key = f"{REDIS_KEY_PREFIX}cities"
-    cached = redis_client.get(cache_key)
-    if cached:
-        return json.loads(cached)
-    
-    query = "SELECT DISTINCT city FROM Airports ORDER BY city;"
+async def _fetch_dicts(pool, query: Query, *args) -> list[dict]:
     async with pool.acquire() as conn:
-        result = await conn.fetch(query)
-    
-    redis_client.setex(cache_key, CITIES_TTL, json.dumps([dict(r) for r in result]))
-    return result
+        return [dict(row) for row in await query.fetch(conn, *args)]
+
+_CITIES = register("flights.cities", "SELECT DISTINCT city FROM Airports ORDER BY city;")
+_AIRPORTS = register("flights.airports", "SELECT name FROM Airports WHERE city = $1 ORDER BY name;")
+
+async def get_cities(pool) -> list[dict]:
+    # Справочники читаются через двухуровневый кеш: память процесса, затем Redis
+    return await get_reference_cache().get(
+        "airports", "cities",
+        lambda: _fetch_dicts(pool, _CITIES),
+        CITIES_TTL,
+    )
         
 async def get_airports(pool, city: str) -> list[dict]:
-    print(f"Получение аэропортов для города: {city}")
-    redis_client = get_redis()
-    cache_key = f"{REDIS_KEY_PREFIX}airports:{city}"
-    cached = redis_client.get(cache_key)
-    if cached:
-        return json.loads(cached)
-    
-    query = "SELECT name FROM Airports WHERE city = $1 ORDER BY name;"
-    async with pool.acquire() as conn:
-        result =  await conn.fetch(query, city)
-    
-    redis_client.setex(cache_key, AIRPORTS_TTL, json.dumps([dict(r) for r in result]))
-    return result
+    return await get_reference_cache().get(
+        "airports", f"city:{city}",
+        lambda: _fetch_dicts(pool, _AIRPORTS, city),
+        AIRPORTS_TTL,
+    )
 
-async def search_flights(pool, departure_airport: str, arrival_airport: str, departure_date: str) -> list[dict]:
-    print(f"Поиск рейсов из аэропорта {departure_airport} в аэропорт {arrival_airport} на {departure_date}")
-    query = """
+# flight_search поддерживается триггерами, поиск - один проход по idx_flight_search_route
+_SEARCH_FLIGHTS = register("flights.search_flights", """
     SELECT 
             flight_id,
             airline_name,
@@ -51,34 +47,81 @@ async def search_flights(pool, departure_airport: str, arrival_airport: str, dep
             price,
             number_seats
         FROM 
-            flight_details
+            flight_search
         WHERE 
             departure_airport_name = $1
             AND arrival_airport_name = $2
-            AND DATE(departure_time) = $3
+            AND departure_time >= $3::date
+            AND departure_time < $3::date + 1
         ORDER BY 
             departure_time;
-    """
-    
+    """)
+
+async def search_flights(pool, departure_airport: str, arrival_airport: str, departure_date: str) -> list[dict]:
+    print(f"Поиск рейсов из аэропорта {departure_airport} в аэропорт {arrival_airport} на {departure_date}")
+    redis_client = get_redis()
+    cache_key = search_cache_key(departure_airport, arrival_airport, departure_date)
+    cached, version = await get_cached_search(redis_client, cache_key)
+    if cached is not None:
+        return cached
+
     async with pool.acquire() as conn:
-        return await conn.fetch(query, departure_airport, arrival_airport, departure_date)
+        rows = await _SEARCH_FLIGHTS.fetch(conn, departure_airport, arrival_airport, departure_date)
+    # Тот же тип, что и при попадании в кеш
+    result = [dict(row) for row in rows]
+
+    await store_search(redis_client, cache_key, version, result)
+    return result
         
         
-async def add_booking(pool, sales: DataFrame) -> None:
-    query = "CALL create_booking($1, $2, $3);"
+_REBUILD_FLIGHT_SEARCH = register("flights.rebuild_flight_search", "CALL rebuild_flight_search();")
+
+async def rebuild_flight_search(pool) -> None:
+    # Полная пересборка flight_search, только для восстановления
     async with pool.acquire() as conn:
-        for _, row in sales.iterrows():
-            await conn.execute(query, row['flight_id'], row['user_id'], row['booking_time'])
+        await _REBUILD_FLIGHT_SEARCH.execute(conn)
+
+_CREATE_BOOKINGS = register(
+    "flights.create_bookings",
+    "SELECT booking_id, seat FROM create_bookings($1::int[], $2::int[], $3::timestamp[], $4::int[]);",
+)
+
+async def add_booking(pool, sales: DataFrame) -> list[tuple[int, int]]:
+    # Вся корзина вставляется одним запросом в одной транзакции, возвращает (booking_id, seat)
+    flight_ids = [int(flight_id) for flight_id in sales['flight_id']]
+    user_ids = [int(user_id) for user_id in sales['user_id']]
+    booking_times = [Timestamp(booking_time).to_pydatetime() for booking_time in sales['booking_time']]
+    seat_column = sales['seat'] if 'seat' in sales else [None] * len(sales)
+    seats = [None if isna(seat) else int(seat) for seat in seat_column]
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            rows = await _CREATE_BOOKINGS.fetch(conn, flight_ids, user_ids, booking_times, seats)
+    return [(row['booking_id'], row['seat']) for row in rows]
+
+
+_SEAT_MAP = register("flights.seat_map", "SELECT seat_map::text FROM Flights WHERE flight_id = $1;")
+_ADJACENT_SEATS = register("flights.find_adjacent_seats", "SELECT find_adjacent_seats($1, $2);")
+
+async def get_seat_map(pool, flight_id: int) -> str | None:
+    # Строка из 0 и 1 по числу мест: занятость видна без подсчёта Bookings
+    async with pool.acquire() as conn:
+        return await _SEAT_MAP.fetchval(conn, flight_id)
+
+
+async def find_adjacent_seats(pool, flight_id: int, count: int) -> int | None:
+    async with pool.acquire() as conn:
+        return await _ADJACENT_SEATS.fetchval(conn, flight_id, count)
+
+
+_CREATE_BOOKING = register("flights.create_booking", "CALL create_booking($1, $2, $3, 'ожидает подтверждения');")
 
 async def create_booking(pool, flight_id: int, user_id: int, booking_date: datetime) -> None:
     #booking_time_dt = datetime.strptime(booking_time, "%Y-%m-%d %H:%M:%S")
-    query = "CALL create_booking($1, $2, $3, 'ожидает подтверждения');"
     async with pool.acquire() as conn:
-        await conn.execute(query, flight_id, user_id, booking_date)
+        await _CREATE_BOOKING.execute(conn, flight_id, user_id, booking_date)
 
-async def get_user_bookings(pool, user_id):
-    query = """
-    SELECT b.booking_id, f.flight_id, f.departure_time, f.arrival_time, f.price, b.status,
+USER_BOOKINGS_QUERY = """
+    SELECT b.booking_id, f.flight_id, b.seat, f.departure_time, f.arrival_time, f.price, b.status,
            a.name AS airline_name,
            dep_airport.name AS departure_airport_name,
            arr_airport.name AS arrival_airport_name
@@ -87,54 +130,67 @@ async def get_user_bookings(pool, user_id):
     JOIN Airlines a ON f.airline_id = a.airline_id
     JOIN Airports dep_airport ON f.departure_airport_id = dep_airport.airport_id
     JOIN Airports arr_airport ON f.arrival_airport_id = arr_airport.airport_id
-    WHERE b.user_id = $1;
+    WHERE b.user_id = $1
     """
+_USER_BOOKINGS = register("flights.user_bookings", USER_BOOKINGS_QUERY)
+
+async def get_user_bookings(pool, user_id):
     async with pool.acquire() as conn:
-        return await conn.fetch(query, user_id)
+        return await _USER_BOOKINGS.fetch(conn, user_id)
         
-async def confirm_booking(pool,booking_id: int) -> bool:
-    query = """
+_CONFIRM_BOOKING = register("flights.confirm_booking", """
     UPDATE Bookings
     SET status = 'Подтверждено'
     WHERE booking_id = $1;
-    """
+    """)
+
+async def confirm_booking(pool,booking_id: int) -> bool:
     async with pool.acquire() as conn:
-        result = await conn.execute(query, booking_id)
+        result = await _CONFIRM_BOOKING.execute(conn, booking_id)
         return result == 'UPDATE 1' 
     
-async def add_payment(pool, booking_id: int, amount: float,payment_date, payment_method: str) -> bool:
-    query = """
+_ADD_PAYMENT = register("flights.add_payment", """
     INSERT INTO Payments (booking_id, amount, payment_date, payment_method)
     VALUES ($1, $2, $3, $4);
-    """
+    """)
+
+async def add_payment(pool, booking_id: int, amount: float,payment_date, payment_method: str) -> bool:
     async with pool.acquire() as conn:
         try:
-            result = await conn.execute(query, booking_id, amount, payment_date, payment_method)
+            result = await _ADD_PAYMENT.execute(conn, booking_id, amount, payment_date, payment_method)
             return result is not None 
         except Exception as e:
             print(f"Ошибка при добавлении платежа: {e}")
             return False
 
+_ALL_FLIGHTS = register("flights.all_flights", "SELECT * FROM Flights")
+
 async def get_all_flights(pool):
     async with pool.acquire() as conn:
         try:
-            flights = await conn.fetch("SELECT * FROM Flights")
+            flights = await _ALL_FLIGHTS.fetch(conn)
             return flights
         except Exception as e:
             print(f"Ошибка при получении рейсов: {e}")
             return []
 
+async def get_flights_page(pool, after=None, limit=50, descending=False, **filters):
+    return await fetch_page(pool, "flights", after, limit, descending, filters)
+
+def stream_flights(pool, batch_size=1000, **filters):
+    return stream_rows(pool, "flights", filters, batch_size=batch_size)
+
+_ADD_FLIGHT = register("flights.add_flight", """
+                INSERT INTO Flights (airline_id, departure_airport_id, arrival_airport_id, 
+                                     departure_time, arrival_time, number_seats, price)
+                VALUES ($1, $2, $3, $4, $5, $6, $7);
+            """)
+
 async def add_flight(pool, airline_id, departure_airport_id, arrival_airport_id, departure_time, arrival_time, number_seats, price):
     async with pool.acquire() as conn:
         try:
-            max_flight_id_row = await conn.fetch("SELECT COALESCE(MAX(flight_id), 0) AS max_flight_id FROM Flights")
-            max_flight_id = max_flight_id_row[0]['max_flight_id'] + 1
-
-            await conn.execute("""
-                INSERT INTO Flights (flight_id, airline_id, departure_airport_id, arrival_airport_id, 
-                                     departure_time, arrival_time, number_seats, price)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8);
-            """, max_flight_id, airline_id, departure_airport_id, arrival_airport_id, 
+            # flight_id выдаёт последовательность SERIAL
+            await _ADD_FLIGHT.execute(conn, airline_id, departure_airport_id, arrival_airport_id, 
             departure_time, arrival_time, number_seats, price)
             return True
         except Exception as e:
@@ -142,54 +198,193 @@ async def add_flight(pool, airline_id, departure_airport_id, arrival_airport_id,
             return False
 
 
+_ADD_FLIGHT_TEMPLATE = register("flights.add_flight_template", """
+                INSERT INTO flight_templates (airline_id, departure_airport_id, arrival_airport_id, weekdays,
+                                              departure_local_time, duration, number_seats, price,
+                                              valid_from, valid_to)
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
+                RETURNING template_id;
+            """)
+
+async def add_flight_template(pool, airline_id, departure_airport_id, arrival_airport_id, weekdays,
+                              departure_local_time, duration, number_seats, price, valid_from, valid_to):
+    async with pool.acquire() as conn:
+        try:
+            return await _ADD_FLIGHT_TEMPLATE.fetchval(conn, airline_id, departure_airport_id, arrival_airport_id, weekdays,
+            departure_local_time, duration, number_seats, price, valid_from, valid_to)
+        except Exception as e:
+            print(f"Ошибка при добавлении шаблона рейса: {e}")
+            return None
+
+async def get_flight_templates_page(pool, after=None, limit=50, descending=False, **filters):
+    return await fetch_page(pool, "flight_templates", after, limit, descending, filters)
+
+_ACTIVE_TEMPLATE_IDS = register("flights.active_template_ids", """
+            SELECT template_id FROM flight_templates
+            WHERE valid_from <= $2 AND valid_to >= $1
+            ORDER BY template_id;
+        """)
+
+async def get_active_template_ids(pool, horizon_start, horizon_end) -> list[int]:
+    async with pool.acquire() as conn:
+        rows = await _ACTIVE_TEMPLATE_IDS.fetch(conn, horizon_start, horizon_end)
+    return [row['template_id'] for row in rows]
+
+_EXPAND_FLIGHT_TEMPLATES = register(
+    "flights.expand_flight_templates", "SELECT expand_flight_templates($1::int[], $2, $3);"
+)
+
+async def expand_flight_templates(pool, template_ids: list[int], horizon_start, horizon_end) -> int:
+    async with pool.acquire() as conn:
+        return await _EXPAND_FLIGHT_TEMPLATES.fetchval(conn, template_ids, horizon_start, horizon_end)
+
+_ALL_BOOKINGS = register("flights.all_bookings", "SELECT * FROM Bookings")
+
 async def get_all_bookings(pool):
     async with pool.acquire() as conn:
         try:
-            bookings = await conn.fetch("SELECT * FROM Bookings")
+            bookings = await _ALL_BOOKINGS.fetch(conn)
             return bookings
         except Exception as e:
             print(f"Ошибка при получении бронирований: {e}")
             return []
 
+async def get_bookings_page(pool, after=None, limit=50, descending=False, **filters):
+    return await fetch_page(pool, "bookings", after, limit, descending, filters)
+
+def stream_bookings(pool, batch_size=1000, **filters):
+    return stream_rows(pool, "bookings", filters, batch_size=batch_size)
+
+_ALL_PAYMENTS = register("flights.all_payments", "SELECT * FROM Payments")
+
 async def get_all_payments(pool):
     async with pool.acquire() as conn:
         try:
-            payments = await conn.fetch("SELECT * FROM Payments")
+            payments = await _ALL_PAYMENTS.fetch(conn)
             return payments
         except Exception as e:
             print(f"Ошибка при получении платежей: {e}")
             return []
 
+async def get_payments_page(pool, after=None, limit=50, descending=False, **filters):
+    return await fetch_page(pool, "payments", after, limit, descending, filters)
+
+def stream_payments(pool, batch_size=1000, **filters):
+    return stream_rows(pool, "payments", filters, batch_size=batch_size)
+
+_ADD_REVIEW = register("flights.add_review", """
+                INSERT INTO Reviews (user_id, airline_id, rating, comment)
+                VALUES ($1, $2, $3, $4);
+            """)
+
 async def add_review(pool, user_id, airline_id, rating, comment):
     async with pool.acquire() as conn:
         try:
-            await conn.execute("""
-                INSERT INTO Reviews (user_id, airline_id, rating, comment)
-                VALUES ($1, $2, $3, $4);
-            """, user_id, airline_id, rating, comment)
+            await _ADD_REVIEW.execute(conn, user_id, airline_id, rating, comment)
             return True
         except Exception as e:
             print(f"Ошибка: {e}")
             return False
 
+_AIRLINES = register("flights.airlines", "SELECT airline_id, name, code, country FROM Airlines ORDER BY name;")
+
 async def get_airlines(pool) -> list[dict]:
-    print("Получение авиакомпаний")
-    query = "SELECT * FROM Airlines ORDER BY name;"
-    async with pool.acquire() as conn:
-        return await conn.fetch(query)
+    return await get_reference_cache().get(
+        "airlines", "all",
+        lambda: _fetch_dicts(pool, _AIRLINES),
+        AIRLINES_TTL,
+    )
 
-async def get_reviews(pool, airline_id) -> list[dict]:
-    query = """
+_REVIEWS = register("flights.reviews", """
     SELECT r.rating, r.comment, u.username
     FROM Reviews r
     JOIN Users u ON r.user_id = u.user_id
     WHERE r.airline_id = $1
     ORDER BY r.review_id DESC;
-    """
+    """)
+
+async def get_reviews(pool, airline_id) -> list[dict]:
     async with pool.acquire() as conn:
-        return await conn.fetch(query, airline_id)
+        return await _REVIEWS.fetch(conn, airline_id)
     
+_RATING_SUMMARIES = register("flights.rating_summaries", """
+    SELECT airline_id, review_count,
+           ROUND(rating_sum::numeric / NULLIF(review_count, 0), 2)::float AS average_rating,
+           histogram
+    FROM airline_rating_summary;
+    """)
+
+@single_flight(key=lambda pool: f"{REDIS_KEY_PREFIX}rating_summaries", ttl=RATING_SUMMARY_TTL,
+               stale_ttl=RATING_SUMMARY_TTL * 10)
+async def get_airline_rating_summaries(pool) -> list[dict]:
+    # Сводки оценок всех авиакомпаний одним запросом, без чтения Reviews.
+    # Авиакомпании без отзывов в результат не попадают, сами авиакомпании - в get_airlines
+    return await _fetch_dicts(pool, _RATING_SUMMARIES)
+
+_AIRLINE_REVIEWS_QUERY = """
+    SELECT r.review_id, r.rating, r.comment, u.username
+    FROM Reviews r
+    JOIN Users u ON r.user_id = u.user_id
+    WHERE r.airline_id = $1 {after}
+    ORDER BY r.review_id DESC
+    LIMIT {limit};
+"""
+
+async def get_airline_reviews_page(pool, airline_id: int, after=None, limit: int = 20) -> tuple[list, int | None]:
+    # Новые отзывы первыми, по индексу idx_reviews_airline; next_after - review_id для следующей страницы
+    if after is None:
+        query = _AIRLINE_REVIEWS_QUERY.format(after="", limit="$2")
+        args = [airline_id, limit + 1]
+    else:
+        query = _AIRLINE_REVIEWS_QUERY.format(after="AND r.review_id < $2", limit="$3")
+        args = [airline_id, after, limit + 1]
+    async with pool.acquire() as conn:
+        rows = await dynamic("flights.airline_reviews_page", query).fetch(conn, *args)
+    if len(rows) > limit:
+        return rows[:limit], rows[limit - 1]['review_id']
+    return rows, None
+
+async def search_reviews(pool, text: str, airline_id: int | None = None, rating: int | None = None,
+                         after: tuple[float, int] | None = None, limit: int = 50) -> tuple[list, tuple | None]:
+    # Ранжированный поиск по idx_reviews_comment_tsv; страницы по ключу (rank, review_id)
+    args = [text]
+    conditions = ["comment_tsv @@ q"]
+    for column, value in (("airline_id", airline_id), ("rating", rating)):
+        if value is not None:
+            args.append(value)
+            conditions.append(f"{column} = ${len(args)}")
+    outer = ""
+    if after is not None:
+        args.extend(after)
+        outer = f"WHERE (rank, review_id) < (${len(args) - 1}::real, ${len(args)})"
+    args.append(limit + 1)
+    query = f"""
+    SELECT * FROM (
+        SELECT review_id, user_id, airline_id, rating, comment, ts_rank(comment_tsv, q) AS rank
+        FROM Reviews,
+             (SELECT websearch_to_tsquery('russian', $1) || websearch_to_tsquery('english', $1) AS q) query
+        WHERE {" AND ".join(conditions)}
+    ) found
+    {outer}
+    ORDER BY rank DESC, review_id DESC
+    LIMIT ${len(args)};
+    """
+    async with pool.acquire() as conn:
+        rows = await dynamic("flights.search_reviews", query).fetch(conn, *args)
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        return rows[:limit], (last['rank'], last['review_id'])
+    return rows, None
+
+_ALL_REVIEWS = register("flights.all_reviews", "SELECT * FROM Reviews")
+
 async def get_all_reviews(pool):
     async with pool.acquire() as conn:
-        reviews = await conn.fetch("SELECT * FROM Reviews")
-        return reviews
\ No newline at end of file
+        reviews = await _ALL_REVIEWS.fetch(conn)
+        return reviews
+
+async def get_reviews_page(pool, after=None, limit=50, descending=False, **filters):
+    return await fetch_page(pool, "reviews", after, limit, descending, filters)
+
+def stream_reviews(pool, batch_size=1000, **filters):
+    return stream_rows(pool, "reviews", filters, batch_size=batch_size)
@@ -0,0 +1,100 @@
+from typing import AsyncIterator
+from infra.queries import dynamic
+
+# Таблицы админских списков: ключ пагинации, выбираемые колонки и разрешённые фильтры.
+# Имена из этого словаря подставляются в SQL, значения фильтров - только параметрами.
+TABLES = {
+    "flights": {
+        "table": "Flights",
+        "key": "flight_id",
+        "columns": ("flight_id", "airline_id", "departure_airport_id", "arrival_airport_id",
+                    "departure_time", "arrival_time", "number_seats", "price"),
+        "filters": ("airline_id", "departure_airport_id", "arrival_airport_id"),
+    },
+    "flight_templates": {
+        "table": "flight_templates",
+        "key": "template_id",
+        "columns": ("template_id", "airline_id", "departure_airport_id", "arrival_airport_id", "weekdays",
+                    "departure_local_time", "duration", "number_seats", "price", "valid_from", "valid_to"),
+        "filters": ("airline_id",),
+    },
+    "bookings": {
+        "table": "Bookings",
+        "key": "booking_id",
+        "columns": ("booking_id", "user_id", "flight_id", "seat", "booking_time", "status"),
+        "filters": ("user_id", "flight_id", "status"),
+    },
+    "payments": {
+        "table": "Payments",
+        "key": "payment_id",
+        "columns": ("payment_id", "booking_id", "amount", "payment_date", "payment_method"),
+        "filters": ("booking_id", "payment_method"),
+    },
+    "reviews": {
+        "table": "Reviews",
+        "key": "review_id",
+        "columns": ("review_id", "user_id", "airline_id", "rating", "comment"),
+        "filters": ("user_id", "airline_id", "rating"),
+    },
+    "users": {
+        "table": "Users",
+        "key": "user_id",
+        "columns": ("user_id", "username", "login", "role"),
+        "filters": ("role",),
+    },
+}
+
+
+def build_select(name: str, filters: dict | None, after, descending: bool, limit: int | None):
+    spec = TABLES[name]
+    key = spec["key"]
+    conditions, args = [], []
+    for column, value in (filters or {}).items():
+        if column not in spec["filters"]:
+            raise ValueError(f"Фильтр по {column} не поддерживается для {name}")
+        if value is None:
+            continue
+        args.append(value)
+        conditions.append(f"{column} = ${len(args)}")
+    if after is not None:
+        args.append(after)
+        conditions.append(f"{key} {'<' if descending else '>'} ${len(args)}")
+
+    query = f"SELECT {', '.join(spec['columns'])} FROM {spec['table']}"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += f" ORDER BY {key} {'DESC' if descending else 'ASC'}"
+    if limit is not None:
+        args.append(limit)
+        query += f" LIMIT ${len(args)}"
+    return query, args
+
+
+async def fetch_page(pool, name: str, after=None, limit: int = 50, descending: bool = False,
+                     filters: dict | None = None) -> tuple[list, int | None]:
+    # Возвращает строки страницы и ключ для следующей (None - страница последняя)
+    query, args = build_select(name, filters, after, descending, limit + 1)
+    async with pool.acquire() as conn:
+        rows = await dynamic(f"pagination.{name}", query).fetch(conn, *args)
+    if len(rows) > limit:
+        return rows[:limit], rows[limit - 1][TABLES[name]["key"]]
+    return rows, None
+
+
+async def stream_rows(pool, name: str, filters: dict | None = None, descending: bool = False,
+                      batch_size: int = 1000) -> AsyncIterator[list]:
+    query, args = build_select(name, filters, None, descending, None)
+    async for rows in stream_query(pool, query, args, batch_size):
+        yield rows
+
+
+async def stream_query(pool, query: str, args: list, batch_size: int = 1000) -> AsyncIterator[list]:
+    # Серверный курсор: в памяти одновременно только batch_size строк
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            cursor = await conn.cursor(query, *args)
+            while True:
+                rows = await cursor.fetch(batch_size)
+                if not rows:
+                    break
+                yield rows
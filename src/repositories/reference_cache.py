@@ -0,0 +1,211 @@
+import asyncio
+import atexit
+import json
+import threading
+import time
+from collections import OrderedDict
+import redis.exceptions
+from infra.loop import get_background_loop
+from infra.pg_listener import get_pg_listener
+from infra.redis_pool import get_redis, get_redis_manager
+from repositories.single_flight import get_single_flight
+from settings import REDIS_KEY_PREFIX, REFERENCE_LOCAL_TTL, REFERENCE_LOCAL_MAX_SIZE, REFERENCE_STALE_TTL
+
+# Справочники (города, аэропорты, авиакомпании) кешируются в два уровня:
+# LRU в памяти процесса -> Redis -> Postgres. Ключи Redis содержат версию пространства имён,
+# версию повышает триггер в Postgres (reference_versions), процессы узнают о ней через pub/sub.
+REFERENCE_CHANGED_CHANNEL = "reference_changed"
+INVALIDATION_CHANNEL = f"{REDIS_KEY_PREFIX}ref:invalidate"
+
+# Версия и данные за один запрос
+_GET_SCRIPT = """
+local version = redis.call('GET', KEYS[1]) or '0'
+return {version, redis.call('GET', ARGV[1] .. version .. ':' .. ARGV[2])}
+"""
+
+# Версия только растёт: каждый процесс получает NOTIFY, но публикует изменение только первый
+_BUMP_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+if tonumber(ARGV[1]) <= current then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1])
+redis.call('PUBLISH', ARGV[2], ARGV[3])
+return 1
+"""
+
+
+def _version_key(namespace: str) -> str:
+    return f"{REDIS_KEY_PREFIX}ref:{namespace}:version"
+
+
+def _data_prefix(namespace: str) -> str:
+    return f"{REDIS_KEY_PREFIX}ref:{namespace}:"
+
+
+class ReferenceCache:
+    """LRU с TTL поверх Redis. Значения отдаются как есть - вызывающий код не должен их изменять."""
+
+    def __init__(self, max_size: int, local_ttl: float):
+        self._max_size = max_size
+        self._local_ttl = local_ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (namespace, key) -> (version, expires_at, value)
+        self._versions = {}  # namespace -> последняя известная версия
+        self._get_script = None
+        self._bump_script = None
+        self.counters = {"local_hits": 0, "redis_hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _get_local(self, namespace: str, key: str):
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                return None
+            version, expires_at, value = entry
+            if expires_at < time.monotonic() or version < self._versions.get(namespace, 0):
+                del self._entries[(namespace, key)]
+                return None
+            self._entries.move_to_end((namespace, key))
+            self.counters["local_hits"] += 1
+            return value
+
+    def _put_local(self, namespace: str, key: str, version: int, value):
+        with self._lock:
+            if version < self._versions.get(namespace, 0):
+                return
+            self._entries[(namespace, key)] = (version, time.monotonic() + self._local_ttl, value)
+            self._entries.move_to_end((namespace, key))
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def drop(self, namespace: str | None = None, version: int = 0):
+        # Сброс локального уровня: одного пространства имён или целиком
+        with self._lock:
+            if namespace is None:
+                self._entries.clear()
+                self._versions.clear()
+                return
+            self._versions[namespace] = max(self._versions.get(namespace, 0), version)
+            for cache_key in [cache_key for cache_key in self._entries if cache_key[0] == namespace]:
+                del self._entries[cache_key]
+            self.counters["invalidations"] += 1
+
+    async def get(self, namespace: str, key: str, loader, ttl: int):
+        """Значение из LRU, Redis или loader() - корутины, возвращающей JSON-сериализуемое значение."""
+        value = self._get_local(namespace, key)
+        if value is not None:
+            return value
+
+        redis_client = get_redis()
+        if self._get_script is None:
+            self._get_script = redis_client.register_script(_GET_SCRIPT)
+        version, cached = await self._get_script(keys=[_version_key(namespace)], args=[_data_prefix(namespace), key])
+        version = int(version)
+        self._count("redis_hits" if cached is not None else "misses")
+        # Промах и устаревшее значение обрабатывает single-flight: один запрос к Postgres на ключ
+        value = await get_single_flight().get(
+            f"{_data_prefix(namespace)}{version}:{key}", loader, ttl, REFERENCE_STALE_TTL, cached=cached
+        )
+        self._put_local(namespace, key, version, value)
+        return value
+
+    async def bump(self, namespace: str, version: int) -> bool:
+        redis_client = get_redis()
+        if self._bump_script is None:
+            self._bump_script = redis_client.register_script(_BUMP_SCRIPT)
+        payload = json.dumps({"namespace": namespace, "version": version})
+        return bool(await self._bump_script(keys=[_version_key(namespace)],
+                                            args=[version, INVALIDATION_CHANNEL, payload]))
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.counters["local_hits"] + self.counters["redis_hits"] + self.counters["misses"]
+            return {
+                **self.counters,
+                "size": len(self._entries),
+                "max_size": self._max_size,
+                "local_hit_ratio": self.counters["local_hits"] / lookups if lookups else 0.0,
+            }
+
+
+class InvalidationSubscriber:
+    """Подписка на INVALIDATION_CHANNEL в фоновом цикле; после обрыва локальный уровень сбрасывается целиком."""
+
+    def __init__(self, cache: ReferenceCache):
+        self._cache = cache
+        self._task = None
+
+    async def _run(self):
+        redis_client = get_redis_manager().raw_client
+        while True:
+            pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                # Сообщения, пропущенные до подписки, не восстановить
+                self._cache.drop()
+                while True:
+                    message = await pubsub.get_message(timeout=1.0)
+                    if message is None:
+                        continue
+                    change = json.loads(message["data"])
+                    self._cache.drop(change["namespace"], int(change["version"]))
+            except (redis.exceptions.RedisError, OSError) as e:
+                print(f"Подписка на сброс справочников потеряна: {e}")
+            finally:
+                await pubsub.aclose()
+            await asyncio.sleep(1)
+
+    async def _start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def _stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def start(self):
+        get_background_loop().run_sync(self._start())
+
+    def stop(self):
+        get_background_loop().run_sync(self._stop(), timeout=5)
+
+
+_cache = None
+_subscriber = None
+_cache_lock = threading.Lock()
+
+
+def get_reference_cache() -> ReferenceCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ReferenceCache(REFERENCE_LOCAL_MAX_SIZE, REFERENCE_LOCAL_TTL)
+    return _cache
+
+
+async def _on_reference_changed(payload: str):
+    change = json.loads(payload)
+    try:
+        await get_reference_cache().bump(change["namespace"], int(change["version"]))
+    except redis.exceptions.RedisError as e:
+        print(f"Не удалось сбросить кеш справочника {change}: {e}")
+
+
+def start_reference_cache_invalidation():
+    global _subscriber
+    cache = get_reference_cache()
+    with _cache_lock:
+        if _subscriber is None:
+            _subscriber = InvalidationSubscriber(cache)
+            _subscriber.start()
+            get_pg_listener().listen(REFERENCE_CHANGED_CHANNEL, _on_reference_changed)
+            atexit.register(_subscriber.stop)
@@ -0,0 +1,112 @@
+import json
+import threading
+import redis.exceptions
+from datetime import date, datetime
+from decimal import Decimal
+from infra.pg_listener import get_pg_listener
+from infra.redis_pool import get_redis
+from settings import REDIS_KEY_PREFIX, SEARCH_CACHE_TTL
+
+# Канал NOTIFY из триггера after_flight_search_change
+FLIGHTS_CHANGED_CHANNEL = "flights_changed"
+
+_COLUMNS = (
+    "flight_id", "airline_name", "departure_airport_name", "arrival_airport_name",
+    "departure_time", "arrival_time", "price", "number_seats",
+)
+
+# Результат пишется только если версия маршрута не изменилась с момента чтения,
+# иначе запрос, начатый до бронирования, перезаписал бы кеш устаревшими местами
+_STORE_SCRIPT = """
+local version = redis.call('HGET', KEYS[1], 'v') or '0'
+if version ~= ARGV[1] then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'data', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+
+_store_script = None
+_invalidation_started = False
+_invalidation_lock = threading.Lock()
+
+
+def search_cache_key(departure_airport: str, arrival_airport: str, departure_date) -> str:
+    if isinstance(departure_date, (date, datetime)):
+        departure_date = departure_date.isoformat()[:10]
+    return f"{REDIS_KEY_PREFIX}search:{departure_airport}:{arrival_airport}:{departure_date}"
+
+
+def _encode(flights) -> str:
+    # Строки без имён колонок: порядок задаёт _COLUMNS
+    return json.dumps(
+        [
+            [
+                flight["flight_id"], flight["airline_name"],
+                flight["departure_airport_name"], flight["arrival_airport_name"],
+                flight["departure_time"].isoformat(), flight["arrival_time"].isoformat(),
+                str(flight["price"]), flight["number_seats"],
+            ]
+            for flight in flights
+        ],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+
+
+def _decode(data: str) -> list[dict]:
+    flights = []
+    for row in json.loads(data):
+        flight = dict(zip(_COLUMNS, row))
+        flight["departure_time"] = datetime.fromisoformat(flight["departure_time"])
+        flight["arrival_time"] = datetime.fromisoformat(flight["arrival_time"])
+        flight["price"] = Decimal(flight["price"])
+        flights.append(flight)
+    return flights
+
+
+async def get_cached_search(redis_client, cache_key: str) -> tuple[list[dict] | None, str]:
+    version, data = await redis_client.hmget(cache_key, "v", "data")
+    flights = _decode(data) if data is not None else None
+    return flights, version or "0"
+
+
+async def store_search(redis_client, cache_key: str, version: str, flights) -> bool:
+    global _store_script
+    if _store_script is None:
+        _store_script = redis_client.register_script(_STORE_SCRIPT)
+    stored = await _store_script(keys=[cache_key], args=[version, _encode(flights), SEARCH_CACHE_TTL])
+    return bool(stored)
+
+
+async def invalidate_search(redis_client, departure_airport: str, arrival_airport: str, departure_date) -> None:
+    cache_key = search_cache_key(departure_airport, arrival_airport, departure_date)
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.hincrby(cache_key, "v", 1)
+    pipe.hdel(cache_key, "data")
+    pipe.expire(cache_key, SEARCH_CACHE_TTL)
+    await pipe.execute()
+
+
+async def clear_search_cache(redis_client) -> int:
+    deleted = 0
+    async for key in redis_client.scan_iter(match=f"{REDIS_KEY_PREFIX}search:*", count=1000):
+        deleted += await redis_client.delete(key)
+    return deleted
+
+
+async def _on_flights_changed(payload: str):
+    change = json.loads(payload)
+    try:
+        await invalidate_search(get_redis(), change["departure_airport"], change["arrival_airport"], change["date"])
+    except redis.exceptions.RedisError as e:
+        print(f"Не удалось сбросить кеш поиска {change}: {e}")
+
+
+def start_search_cache_invalidation():
+    global _invalidation_started
+    with _invalidation_lock:
+        if not _invalidation_started:
+            get_pg_listener().listen(FLIGHTS_CHANGED_CHANNEL, _on_flights_changed)
+            _invalidation_started = True
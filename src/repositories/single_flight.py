@@ -0,0 +1,163 @@
+import asyncio
+import json
+import threading
+import time
+import uuid
+from functools import wraps
+from infra.loop import get_background_loop
+from infra.redis_pool import get_redis
+from settings import SINGLE_FLIGHT_LOCK_TTL, SINGLE_FLIGHT_WAIT_INTERVAL
+
+# Защита от лавины промахов: в процессе один запрос к источнику на ключ
+# (загрузка идёт в фоновом цикле, сессии ждут общий future), между процессами - блокировка в Redis.
+# Значение хранится вместе со сроком свежести: после него ещё stale_ttl секунд
+# отдаётся старое значение, пока один процесс обновляет его в фоне.
+
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+MISSING = object()
+
+
+def encode_entry(value, ttl: float) -> str:
+    return json.dumps({"fresh_until": time.time() + ttl, "value": value}, ensure_ascii=False, separators=(",", ":"))
+
+
+def decode_entry(raw) -> tuple[object, bool]:
+    entry = json.loads(raw)
+    return entry["value"], entry["fresh_until"] > time.time()
+
+
+class SingleFlight:
+    def __init__(self, lock_ttl: float, wait_interval: float):
+        self._lock_ttl = lock_ttl
+        self._wait_interval = wait_interval
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._release_script = None
+        self.counters = {"fresh_hits": 0, "stale_hits": 0, "misses": 0, "loads": 0, "coalesced": 0, "lock_waits": 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _shared(self, flight_key: tuple, factory, on_done=None):
+        # Первый вызов запускает загрузку в фоновом цикле, остальные получают тот же future
+        with self._lock:
+            future = self._inflight.get(flight_key)
+            if future is not None:
+                self.counters["coalesced"] += 1
+                return future
+            future = get_background_loop().submit(factory())
+            self._inflight[flight_key] = future
+        future.add_done_callback(lambda done: self._forget(flight_key, done))
+        if on_done is not None:
+            future.add_done_callback(on_done)
+        return future
+
+    def _forget(self, flight_key: tuple, future):
+        with self._lock:
+            if self._inflight.get(flight_key) is future:
+                del self._inflight[flight_key]
+
+    async def _release(self, redis_client, lock_key: str, token: str):
+        if self._release_script is None:
+            self._release_script = redis_client.register_script(_RELEASE_SCRIPT)
+        await self._release_script(keys=[lock_key], args=[token])
+
+    async def _load(self, key: str, loader, ttl: float, stale_ttl: float, wait: bool):
+        redis_client = get_redis()
+        lock_key = f"{key}:lock"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self._lock_ttl
+        while not await redis_client.set(lock_key, token, nx=True, px=int(self._lock_ttl * 1000)):
+            if not wait:
+                # Фоновое обновление уже выполняет другой процесс
+                return MISSING
+            self._count("lock_waits")
+            if time.monotonic() >= deadline:
+                # Держатель блокировки не уложился в её срок - загружаем сами
+                break
+            await asyncio.sleep(self._wait_interval)
+            raw = await redis_client.get(key)
+            if raw is not None:
+                value, fresh = decode_entry(raw)
+                if fresh:
+                    return value
+        try:
+            # Пока ждали блокировку, значение мог обновить её прежний владелец
+            raw = await redis_client.get(key)
+            if raw is not None:
+                value, fresh = decode_entry(raw)
+                if fresh:
+                    return value
+            self._count("loads")
+            value = await loader()
+            await redis_client.set(key, encode_entry(value, ttl), ex=int(ttl + stale_ttl))
+            return value
+        finally:
+            await self._release(redis_client, lock_key, token)
+
+    async def get(self, key: str, loader, ttl: float, stale_ttl: float = 0, cached=MISSING):
+        """Значение ключа Redis key; при промахе - результат loader(), один на процесс и кластер.
+
+        cached - уже прочитанное сырое значение ключа (None - ключа нет), чтобы не читать его повторно.
+        """
+        if cached is MISSING:
+            cached = await get_redis().get(key)
+        if cached is not None:
+            value, fresh = decode_entry(cached)
+            if fresh:
+                self._count("fresh_hits")
+                return value
+            self._count("stale_hits")
+            self._shared(("refresh", key), lambda: self._load(key, loader, ttl, stale_ttl, wait=False),
+                         on_done=_log_refresh_error)
+            return value
+
+        self._count("misses")
+        future = self._shared(("load", key), lambda: self._load(key, loader, ttl, stale_ttl, wait=True))
+        # shield: отмена одной сессии не должна отменять загрузку, которую ждут остальные
+        return await asyncio.shield(asyncio.wrap_future(future))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self.counters, "inflight": len(self._inflight)}
+
+
+def _log_refresh_error(future):
+    if not future.cancelled() and future.exception() is not None:
+        print(f"Ошибка фонового обновления кеша: {future.exception()}")
+
+
+_single_flight = None
+_single_flight_lock = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    global _single_flight
+    with _single_flight_lock:
+        if _single_flight is None:
+            _single_flight = SingleFlight(SINGLE_FLIGHT_LOCK_TTL, SINGLE_FLIGHT_WAIT_INTERVAL)
+    return _single_flight
+
+
+def single_flight(key, ttl: float, stale_ttl: float = 0):
+    """Кеширует результат асинхронной функции чтения в Redis с защитой от одновременных промахов.
+
+    key(*args, **kwargs) возвращает ключ Redis, результат функции должен сериализоваться в JSON.
+    Исходная функция без кеша доступна как .uncached.
+    """
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await get_single_flight().get(
+                key(*args, **kwargs), lambda: func(*args, **kwargs), ttl, stale_ttl
+            )
+        wrapper.uncached = func
+        return wrapper
+    return decorator
@@ -1,23 +1,52 @@
 import asyncpg
-import bcrypt
+from infra.password_hasher import PasswordHasherBusy, get_password_hasher
+from infra.queries import register
+from repositories.pagination import fetch_page, stream_rows
+
+_AUTHENTICATE = register("user.authenticate", "SELECT * FROM Users WHERE login = $1")
+_REHASH_PASSWORD = register(
+    "user.rehash_password", "UPDATE Users SET password_hash = $1 WHERE user_id = $2 AND password_hash = $3"
+)
+_REGISTER = register(
+    "user.register", "INSERT INTO Users (username, login, password_hash, role) VALUES ($1, $2, $3, $4)"
+)
+_ALL_USERS = register("user.all_users", "SELECT user_id, username, login, role FROM Users")
+_GET_USER = register("user.get_user", "SELECT user_id, username, login, role FROM Users WHERE user_id = $1")
+_CHANGE_ROLES = register(
+    "user.change_roles", "UPDATE Users SET role = $1 WHERE user_id = ANY($2::int[]) RETURNING user_id"
+)
+_CHANGE_ROLE = register("user.change_role", "UPDATE Users SET role = $1 WHERE user_id = $2 RETURNING user_id")
+_CHANGE_USERNAME = register(
+    "user.change_username", "UPDATE Users SET username = $1 WHERE user_id = $2 RETURNING user_id"
+)
+_CHANGE_LOGIN = register("user.change_login", "UPDATE Users SET login = $1 WHERE user_id = $2 RETURNING user_id")
+_FIND_REVIEW = register("user.find_review", "SELECT * FROM Reviews WHERE review_id = $1")
+_DELETE_REVIEW = register("user.delete_review", "DELETE FROM Reviews WHERE review_id = $1")
 
 async def authenticate_user(pool, login: str, password: str):
     async with pool.acquire() as conn:
-        user = await conn.fetchrow("SELECT * FROM Users WHERE login = $1", login)
-
-    if user and bcrypt.checkpw(password.encode('utf-8'), user['password_hash'].encode('utf-8')):
+        user = await _AUTHENTICATE.fetchrow(conn, login)
+
+    hasher = get_password_hasher()
+    if user and await hasher.verify(password, user['password_hash']):
+        if hasher.needs_rehash(user['password_hash']):
+            # Стоимость bcrypt изменилась: пароль известен только сейчас, перехешируем его.
+            # При перегрузке пула перехеширование откладывается до следующего входа
+            try:
+                new_hash = await hasher.hash(password)
+            except PasswordHasherBusy:
+                return user
+            async with pool.acquire() as conn:
+                await _REHASH_PASSWORD.execute(conn, new_hash, user['user_id'], user['password_hash'])
         return user 
     return None 
 
 async def register_user(pool, name: str, login: str, password: str, role: str = 'user'):
 
-    hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8') 
+    hashed_password = await get_password_hasher().hash(password)
     async with pool.acquire() as conn:
         try:
-            await conn.execute(
-                "INSERT INTO Users (username, login, password_hash, role) VALUES ($1, $2, $3, $4)",
-                name, login, hashed_password, role
-            )
+            await _REGISTER.execute(conn, name, login, hashed_password, role)
             return True 
         except asyncpg.UniqueViolationError:
             return False
@@ -29,44 +58,85 @@ async def register_user(pool, name: str, login: str, password: str, role: str =
 async def get_all_users(pool):
     async with pool.acquire() as connection:
         try:
-            users = await connection.fetch("SELECT user_id, username, login, role FROM Users")
+            users = await _ALL_USERS.fetch(connection)
             return users
         except Exception as e:
             print(f"Ошибка: {e}")
             return []
 
-async def delete_user(pool, user_id: int):
-
+async def get_users_page(pool, after=None, limit=50, descending=False, **filters):
+    return await fetch_page(pool, "users", after, limit, descending, filters)
+
+def stream_users(pool, batch_size=1000, **filters):
+    return stream_rows(pool, "users", filters, batch_size=batch_size)
+
+USER_BATCH_SIZE = 1000
+
+# Пользователь и всё, что на него ссылается, удаляются одним оператором: изменяющие CTE
+# выполняются атомарно, внешние ключи проверяются в конце оператора. Администраторы не удаляются
+_DELETE_USERS = register("user.delete_users", """
+WITH target AS (
+    SELECT user_id FROM Users
+    WHERE user_id = ANY($1::int[]) AND role <> 'admin'
+    FOR UPDATE
+),
+deleted_payments AS (
+    DELETE FROM Payments p
+    USING Bookings b, target t
+    WHERE p.booking_id = b.booking_id AND b.user_id = t.user_id
+),
+deleted_bookings AS (
+    DELETE FROM Bookings b
+    USING target t
+    WHERE b.user_id = t.user_id
+),
+deleted_reviews AS (
+    DELETE FROM Reviews r
+    USING target t
+    WHERE r.user_id = t.user_id
+)
+DELETE FROM Users u
+USING target t
+WHERE u.user_id = t.user_id
+RETURNING u.user_id;
+""")
+
+
+def _batches(user_ids: list[int]):
+    unique_ids = sorted(set(user_ids))
+    for start in range(0, len(unique_ids), USER_BATCH_SIZE):
+        yield unique_ids[start:start + USER_BATCH_SIZE]
+
+
+async def delete_users(pool, user_ids: list[int]) -> list[int]:
+    # Возвращает id удалённых; не найденные и администраторы пропускаются.
+    # Каждая пачка - отдельная транзакция, чтобы не держать блокировки на всё удаление
+    deleted = []
     async with pool.acquire() as connection:
-        try:
+        for batch in _batches(user_ids):
+            rows = await _DELETE_USERS.fetch(connection, batch)
+            deleted.extend(row['user_id'] for row in rows)
+    return deleted
 
-            result = await connection.fetchrow("SELECT * FROM Users WHERE user_id = $1", user_id)
-            if result is None:
-                return False
-            user = await connection.fetchrow("SELECT role FROM Users WHERE user_id = $1", user_id)
-            if user and user['role'] == 'admin':
-                print("Нет прав удалить этого пользователя")
-                return False
-            
-            await connection.execute("""
-                DELETE FROM Payments 
-                WHERE booking_id IN (
-                    SELECT booking_id FROM Bookings WHERE user_id = $1
-                )
-            """, user_id)
-            
-            await connection.execute("DELETE FROM Bookings WHERE user_id = $1", user_id)
-            await connection.execute("DELETE FROM Reviews WHERE user_id = $1", user_id)
-            await connection.execute("DELETE FROM Users WHERE user_id = $1", user_id)
-            return True
-        except Exception as e:
-            print(f"Ошибка: {e}")
-            return False
+async def delete_user(pool, user_id: int):
+    try:
+        return bool(await delete_users(pool, [user_id]))
+    except Exception as e:
+        print(f"Ошибка: {e}")
+        return False
+
+async def change_users_role(pool, user_ids: list[int], new_role: str) -> list[int]:
+    updated = []
+    async with pool.acquire() as connection:
+        for batch in _batches(user_ids):
+            rows = await _CHANGE_ROLES.fetch(connection, new_role, batch)
+            updated.extend(row['user_id'] for row in rows)
+    return updated
 
 async def get_user(pool, user_id: int):
     async with pool.acquire() as conn:
         try:
-            users = await conn.fetch("SELECT user_id, username, login, role FROM Users WHERE user_id = $1", user_id)
+            users = await _GET_USER.fetch(conn, user_id)
             return users
         except Exception as e:
             print(f"Ошибка при получении пользователя: {e}")
@@ -75,13 +145,8 @@ async def get_user(pool, user_id: int):
 async def change_user_role(pool, user_id: int, new_role: str):
     async with pool.acquire() as connection:
         try:
-            
-            result = await connection.fetchrow("SELECT * FROM Users WHERE user_id = $1", user_id)
-            if result is None:
-                return False
-
-            await connection.execute("UPDATE Users SET role = $1 WHERE user_id = $2", new_role, user_id)
-            return True 
+            updated = await _CHANGE_ROLE.fetchval(connection, new_role, user_id)
+            return updated is not None
         except Exception as e:
             print(f"Ошибка: {e}")
             return False 
@@ -89,12 +154,8 @@ async def change_user_role(pool, user_id: int, new_role: str):
 async def change_user_username(pool, user_id: int, new_username: str):
     async with pool.acquire() as conn:
         try:
-            result = await conn.fetchrow("SELECT * FROM Users WHERE user_id = $1", user_id)
-            if result is None:
-                return False
-
-            await conn.execute("UPDATE Users SET username = $1 WHERE user_id = $2", new_username, user_id)
-            return True
+            updated = await _CHANGE_USERNAME.fetchval(conn, new_username, user_id)
+            return updated is not None
         except asyncpg.UniqueViolationError:
             return False
         except Exception as e:
@@ -104,12 +165,8 @@ async def change_user_username(pool, user_id: int, new_username: str):
 async def change_user_login(pool, user_id: int, new_login: str):
     async with pool.acquire() as conn:
         try:
-            result = await conn.fetchrow("SELECT * FROM Users WHERE user_id = $1", user_id)
-            if result is None:
-                return False
-            
-            await conn.execute("UPDATE Users SET login = $1 WHERE user_id = $2", new_login, user_id)
-            return True
+            updated = await _CHANGE_LOGIN.fetchval(conn, new_login, user_id)
+            return updated is not None
         except asyncpg.UniqueViolationError:
             return False
         except Exception as e:
@@ -119,11 +176,11 @@ async def change_user_login(pool, user_id: int, new_login: str):
 async def delete_review(pool, review_id: int):
     async with pool.acquire() as connection:
         try:
-            result = await connection.fetchrow("SELECT * FROM Reviews WHERE review_id = $1", review_id)
+            result = await _FIND_REVIEW.fetchrow(connection, review_id)
             if result is None:
                 return False
 
-            await connection.execute("DELETE FROM Reviews WHERE review_id = $1", review_id)
+            await _DELETE_REVIEW.execute(connection, review_id)
             return True
         except Exception as e:
             print(f"Ошибка: {e}")
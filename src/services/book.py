@@ -1,26 +1,43 @@
 from datetime import datetime
-from settings import get_redis, REDIS_KEY_PREFIX
+from infra.redis_pool import get_redis
 from repositories.flights import add_booking
+from services.booking_events import publish_booking_events
+from services.seat_inventory import get_seat_inventory, seats_by_flight
 from pandas import DataFrame
 import time
-import json
 
 
 class BookingService:
-    async def process_sale(self, sale_date: datetime, items: DataFrame, pool) -> int:
+    async def process_sale(self, sale_date: datetime, items: DataFrame, pool) -> list[int]:
         redis_client = get_redis()
         # time.sleep(10)
-        items = items.rename(columns={"Рейс": "flight_id", "Пользователь": "user_id"})
+        items = items.rename(columns={"Рейс": "flight_id", "Пользователь": "user_id", "Место": "seat"})
         items["booking_time"] = sale_date
-        await add_booking(pool, items)
 
-        for _, row in items.iterrows():
-            redis_client.publish(
-                f"{REDIS_KEY_PREFIX}bookings",
-                json.dumps({
-                    "event": "new_booking",
-                    "flight_id": int(row['flight_id']),
-                    "user_id": int(row['user_id']),
-                    "timestamp": datetime.now().isoformat()
-                }) 
-            )
\ No newline at end of file
+        # Места удерживаются в Redis до записи в Postgres: при распроданном рейсе
+        # запрос отклоняется, не вставая в очередь за блокировкой строки Flights
+        inventory = get_seat_inventory()
+        seats = seats_by_flight(items["flight_id"])
+        hold_id = await inventory.hold(pool, seats)
+        try:
+            booked = await add_booking(pool, items)
+        except Exception:
+            await inventory.release(hold_id, seats)
+            raise
+        await inventory.confirm(hold_id, seats)
+        booking_ids = [booking_id for booking_id, _ in booked]
+
+        timestamp = datetime.now().isoformat()
+        events = [
+            {
+                "event": "new_booking",
+                "booking_id": booking_id,
+                "flight_id": int(flight_id),
+                "seat": seat,
+                "user_id": int(user_id),
+                "timestamp": timestamp,
+            }
+            for (booking_id, seat), flight_id, user_id in zip(booked, items["flight_id"], items["user_id"])
+        ]
+        await publish_booking_events(redis_client, events)
+        return booking_ids
@@ -0,0 +1,77 @@
+import redis.exceptions
+from settings import REDIS_KEY_PREFIX, BOOKING_STREAM_MAXLEN
+
+BOOKING_STREAM = f"{REDIS_KEY_PREFIX}bookings:stream"
+
+_INT_FIELDS = ("booking_id", "flight_id", "seat", "user_id")
+
+
+def _encode(event: dict) -> dict:
+    return {key: str(value) for key, value in event.items()}
+
+
+def _decode(entry_id: str, fields: dict) -> dict:
+    event = dict(fields)
+    for key in _INT_FIELDS:
+        if key in event:
+            event[key] = int(event[key])
+    event["id"] = entry_id
+    return event
+
+
+async def publish_booking_events(redis_client, events: list[dict]) -> list[str]:
+    # Все события одной продажи уходят в поток одним конвейером
+    if not events:
+        return []
+    pipe = redis_client.pipeline(transaction=False)
+    for event in events:
+        pipe.xadd(BOOKING_STREAM, _encode(event), maxlen=BOOKING_STREAM_MAXLEN, approximate=True)
+    return await pipe.execute()
+
+
+async def ensure_consumer_group(redis_client, group: str, start_id: str = "$") -> None:
+    try:
+        await redis_client.xgroup_create(BOOKING_STREAM, group, id=start_id, mkstream=True)
+    except redis.exceptions.ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+async def read_booking_events(redis_client, group: str, consumer: str,
+                              count: int = 100, block_ms: int | None = None) -> list[dict]:
+    response = await redis_client.xreadgroup(
+        group, consumer, {BOOKING_STREAM: ">"}, count=count, block=block_ms
+    )
+    return [_decode(entry_id, fields) for _, entries in response or [] for entry_id, fields in entries]
+
+
+async def ack_booking_events(redis_client, group: str, event_ids: list[str]) -> int:
+    if not event_ids:
+        return 0
+    return await redis_client.xack(BOOKING_STREAM, group, *event_ids)
+
+
+async def claim_stale_booking_events(redis_client, group: str, consumer: str,
+                                     min_idle_ms: int = 60000, count: int = 100) -> list[dict]:
+    # Повторная доставка событий, которые другой потребитель прочитал, но не подтвердил
+    response = await redis_client.xautoclaim(
+        BOOKING_STREAM, group, consumer, min_idle_time=min_idle_ms, start_id="0-0", count=count
+    )
+    return [_decode(entry_id, fields) for entry_id, fields in response[1] if fields]
+
+
+async def replay_booking_events(redis_client, start_id: str = "-", count: int = 100) -> list[dict]:
+    entries = await redis_client.xrange(BOOKING_STREAM, min=start_id, count=count)
+    return [_decode(entry_id, fields) for entry_id, fields in entries]
+
+
+async def read_booking_events_after(redis_client, last_id: str = "$",
+                                    count: int = 100, block_ms: int | None = None) -> list[dict]:
+    response = await redis_client.xread({BOOKING_STREAM: last_id}, count=count, block=block_ms)
+    return [_decode(entry_id, fields) for _, entries in response or [] for entry_id, fields in entries]
+
+
+async def latest_booking_event_id(redis_client) -> str:
+    # Позиция для XREAD вместо "$": события между двумя вызовами XREAD не теряются
+    entries = await redis_client.xrevrange(BOOKING_STREAM, count=1)
+    return entries[0][0] if entries else "0-0"
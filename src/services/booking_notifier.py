@@ -0,0 +1,123 @@
+import asyncio
+import atexit
+import threading
+import time
+from collections import deque
+import redis.exceptions
+from infra.loop import BackgroundLoop, get_background_loop
+from infra.redis_pool import get_redis_manager
+from services.booking_events import latest_booking_event_id, read_booking_events_after
+from settings import BOOKING_NOTIFY_QUEUE_SIZE, BOOKING_NOTIFY_BLOCK_MS, SESSION_TTL
+
+
+class BookingNotifier:
+    """Один на процесс читатель потока бронирований с раздачей событий по сессиям.
+
+    Читает поток блокирующим XREAD в фоновом цикле и складывает события
+    в ограниченные очереди админских сессий; сессии забирают их через drain().
+    """
+
+    def __init__(self, background: BackgroundLoop, redis_client, queue_size: int, block_ms: int,
+                 idle_ttl: float):
+        self._background = background
+        self._redis = redis_client
+        self._queue_size = queue_size
+        self._block_ms = block_ms
+        self._idle_ttl = idle_ttl
+        self._queues: dict[str, deque] = {}
+        self._last_seen: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._task = None
+        self._stopped = False
+        self.dropped = 0
+
+    async def _run(self):
+        last_id = None
+        while not self._stopped:
+            try:
+                if last_id is None:
+                    last_id = await latest_booking_event_id(self._redis)
+                events = await read_booking_events_after(
+                    self._redis, last_id, count=100, block_ms=self._block_ms
+                )
+                if events:
+                    last_id = events[-1]["id"]
+                    self._fan_out(events)
+                self._prune()
+            except redis.exceptions.RedisError as e:
+                print(f"Ошибка чтения потока бронирований: {e}")
+                await asyncio.sleep(1)
+            except Exception as e:
+                # Например, повреждённая запись потока: чтение продолжается с текущего конца,
+                # иначе та же запись читалась бы снова
+                print(f"Ошибка обработки потока бронирований, события до текущего конца пропущены: {e!r}")
+                last_id = None
+                await asyncio.sleep(1)
+
+    def _fan_out(self, events: list[dict]):
+        with self._lock:
+            for queue in self._queues.values():
+                overflow = len(queue) + len(events) - self._queue_size
+                if overflow > 0:
+                    self.dropped += overflow
+                queue.extend(events)
+
+    def _prune(self):
+        # Сессии, которые давно не забирали события, считаем закрытыми
+        deadline = time.monotonic() - self._idle_ttl
+        with self._lock:
+            for session_id in [s for s, seen in self._last_seen.items() if seen < deadline]:
+                self._queues.pop(session_id, None)
+                self._last_seen.pop(session_id, None)
+
+    async def _start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def _stop(self):
+        self._stopped = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def start(self):
+        self._background.run_sync(self._start())
+
+    def stop(self):
+        if not self._stopped:
+            self._background.run_sync(self._stop(), timeout=5)
+
+    def drain(self, session_id: str) -> list[dict]:
+        with self._lock:
+            self._last_seen[session_id] = time.monotonic()
+            queue = self._queues.setdefault(session_id, deque(maxlen=self._queue_size))
+            events = list(queue)
+            queue.clear()
+        return events
+
+    def unsubscribe(self, session_id: str):
+        with self._lock:
+            self._queues.pop(session_id, None)
+            self._last_seen.pop(session_id, None)
+
+
+_notifier = None
+_notifier_lock = threading.Lock()
+
+
+def get_booking_notifier() -> BookingNotifier:
+    global _notifier
+    with _notifier_lock:
+        if _notifier is None:
+            _notifier = BookingNotifier(
+                get_background_loop(),
+                get_redis_manager().raw_client,
+                queue_size=BOOKING_NOTIFY_QUEUE_SIZE,
+                block_ms=BOOKING_NOTIFY_BLOCK_MS,
+                idle_ttl=SESSION_TTL,
+            )
+            _notifier.start()
+            atexit.register(_notifier.stop)
+    return _notifier
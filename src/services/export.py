@@ -0,0 +1,114 @@
+import io
+import os
+from datetime import datetime
+from repositories.flights import USER_BOOKINGS_QUERY
+from repositories.pagination import build_select, stream_query
+from settings import EXPORT_DIR
+
+EXPORT_TABLES = ("bookings", "payments", "flights")
+EXPORT_FORMATS = ("csv", "parquet")
+
+
+def _table_query(name: str, filters: dict | None = None) -> tuple[str, list]:
+    if name not in EXPORT_TABLES:
+        raise ValueError(f"Выгрузка таблицы {name} не поддерживается")
+    return build_select(name, filters, None, False, None)
+
+
+async def copy_query_csv(pool, query: str, args: list, output) -> None:
+    # COPY ... TO STDOUT: asyncpg пишет поток в output частями, не собирая результат в памяти.
+    # output - путь, файловый объект или корутинная функция, принимающая bytes
+    async with pool.acquire() as conn:
+        await conn.copy_from_query(query, *args, output=output, format="csv", header=True)
+
+
+# Типы Postgres -> Arrow. Схема берётся из описания запроса, а не из первой порции строк:
+# пустой результат даёт корректный файл, а колонка из одних NULL не получает тип null
+_ARROW_TYPES = {
+    "bool": "bool_", "int2": "int16", "int4": "int32", "int8": "int64",
+    "float4": "float32", "float8": "float64", "text": "string", "varchar": "string",
+    "bpchar": "string", "name": "string", "date": "date32", "time": "time64",
+    "timestamp": "timestamp", "timestamptz": "timestamp", "interval": "duration", "numeric": "decimal128",
+}
+
+
+def _arrow_type(pa, type_name: str):
+    if type_name.startswith("_"):
+        item = _arrow_type(pa, type_name[1:])
+        return None if item is None else pa.list_(item)
+    kind = _ARROW_TYPES.get(type_name)
+    if kind is None:
+        return None
+    if kind == "time64":
+        return pa.time64("us")
+    if kind == "timestamp":
+        return pa.timestamp("us", tz="UTC" if type_name == "timestamptz" else None)
+    if kind == "duration":
+        return pa.duration("us")
+    if kind == "decimal128":
+        return pa.decimal128(38, 10)
+    return getattr(pa, kind)()
+
+
+async def _query_columns(pool, query: str) -> list[tuple[str, str]]:
+    async with pool.acquire() as conn:
+        statement = await conn.prepare(query)
+        return [(attribute.name, attribute.type.name) for attribute in statement.get_attributes()]
+
+
+async def write_query_parquet(pool, query: str, args: list, output, batch_size: int = 50000) -> int:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Для выгрузки в Parquet нужен пакет pyarrow") from e
+
+    columns = await _query_columns(pool, query)
+    # Типы без соответствия в Arrow (bit varying и т.п.) выгружаются строками
+    fields = [(name, _arrow_type(pa, type_name)) for name, type_name in columns]
+    as_text = {name for name, arrow_type in fields if arrow_type is None}
+    schema = pa.schema([(name, arrow_type or pa.string()) for name, arrow_type in fields])
+
+    rows_written = 0
+    with pq.ParquetWriter(output, schema) as writer:
+        async for rows in stream_query(pool, query, args, batch_size):
+            records = [dict(row) for row in rows]
+            for record in records:
+                for name in as_text:
+                    if record[name] is not None:
+                        record[name] = str(record[name])
+            writer.write_table(pa.Table.from_pylist(records, schema=schema))
+            rows_written += len(rows)
+    return rows_written
+
+
+async def export_query(pool, query: str, args: list, fmt: str, output) -> None:
+    if fmt == "csv":
+        await copy_query_csv(pool, query, args, output)
+    elif fmt == "parquet":
+        await write_query_parquet(pool, query, args, output)
+    else:
+        raise ValueError(f"Неизвестный формат выгрузки: {fmt}")
+
+
+async def export_table(pool, name: str, fmt: str, output, filters: dict | None = None) -> None:
+    query, args = _table_query(name, filters)
+    await export_query(pool, query, args, fmt, output)
+
+
+async def export_user_bookings(pool, user_id: int, fmt: str, output) -> None:
+    await export_query(pool, USER_BOOKINGS_QUERY, [user_id], fmt, output)
+
+
+async def export_user_bookings_bytes(pool, user_id: int, fmt: str) -> bytes:
+    # История одного пользователя небольшая, её можно отдать через st.download_button
+    buffer = io.BytesIO()
+    await export_user_bookings(pool, user_id, fmt, buffer)
+    return buffer.getvalue()
+
+
+async def export_table_to_file(pool, name: str, fmt: str, filters: dict | None = None) -> str:
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    path = os.path.join(EXPORT_DIR, f"{name}_{datetime.now():%Y%m%d_%H%M%S}.{fmt}")
+    await export_table(pool, name, fmt, path, filters)
+    return path
@@ -0,0 +1,27 @@
+from datetime import date, timedelta
+from repositories.flights import get_active_template_ids, expand_flight_templates
+from settings import FLIGHT_TEMPLATE_HORIZON_DAYS, FLIGHT_TEMPLATE_BATCH_SIZE
+
+WEEKDAYS = {
+    1: "Пн", 2: "Вт", 3: "Ср", 4: "Чт", 5: "Пт", 6: "Сб", 7: "Вс",
+}
+
+
+async def generate_flights(pool, horizon_days: int = FLIGHT_TEMPLATE_HORIZON_DAYS,
+                           batch_size: int = FLIGHT_TEMPLATE_BATCH_SIZE, start: date | None = None) -> dict:
+    # Один INSERT ... SELECT на пачку шаблонов; повторный запуск добавляет только недостающие даты
+    horizon_start = start or date.today()
+    horizon_end = horizon_start + timedelta(days=horizon_days)
+    template_ids = await get_active_template_ids(pool, horizon_start, horizon_end)
+
+    created = 0
+    for i in range(0, len(template_ids), batch_size):
+        created += await expand_flight_templates(
+            pool, template_ids[i:i + batch_size], horizon_start, horizon_end
+        )
+    return {
+        "templates": len(template_ids),
+        "created": created,
+        "horizon_start": horizon_start,
+        "horizon_end": horizon_end,
+    }
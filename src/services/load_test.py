@@ -0,0 +1,240 @@
+import asyncio
+import random
+import subprocess
+import time
+from collections import defaultdict
+from datetime import datetime
+from pandas import DataFrame
+from infra.password_hasher import get_password_hasher
+from infra.queries import get_query_registry, register
+from infra.redis_pool import get_redis_manager
+from repositories.flights import add_payment, confirm_booking, get_user_bookings, search_flights
+from repositories.user import authenticate_user, register_user
+from services.book import BookingService
+
+# Нагрузочный прогон без браузера: виртуальные пользователи вызывают те же функции
+# репозиториев и сервисов, что и страницы, через общий пул процесса.
+
+SCENARIOS = ("search", "book", "login", "my_bookings")
+DEFAULT_MIX = {"search": 60, "book": 10, "login": 10, "my_bookings": 20}
+LOAD_USER_PREFIX = "load_user_"
+
+_ROUTES = register("load_test.routes", """
+    SELECT flight_id, departure_airport_name, arrival_airport_name, departure_time::date AS departure_date, price
+    FROM flight_search
+    WHERE departure_time >= now() AND number_seats > 0
+    ORDER BY flight_id DESC
+    LIMIT $1;
+""")
+_LOAD_USERS = register("load_test.users", """
+    SELECT user_id, login FROM Users
+    WHERE login LIKE $1 || '%'
+    ORDER BY user_id
+    LIMIT $2;
+""")
+
+
+def parse_mix(text: str) -> dict[str, int]:
+    # "search=60,book=10" -> {"search": 60, "book": 10}
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.strip().partition("=")
+        if name not in SCENARIOS:
+            raise ValueError(f"Неизвестный сценарий {name}, доступны: {', '.join(SCENARIOS)}")
+        if not weight.isdigit():
+            raise ValueError(f"Вес сценария {name} должен быть целым числом")
+        mix[name] = int(weight)
+    if not any(mix.values()):
+        raise ValueError("Нужен хотя бы один сценарий с ненулевым весом")
+    return mix
+
+
+def _percentile(values: list[float], q: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+class Recorder:
+    """Время и ошибки операций всех виртуальных пользователей."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(lambda: defaultdict(int))
+
+    async def measure(self, operation: str, coro, expect=None):
+        # expect(result) - проверка для функций, которые сообщают об ошибке результатом, а не исключением
+        started = time.perf_counter()
+        try:
+            result = await coro
+        except Exception as e:
+            self.errors[operation][type(e).__name__] += 1
+            self.latencies[operation].append(time.perf_counter() - started)
+            return None
+        self.latencies[operation].append(time.perf_counter() - started)
+        if expect is not None and not expect(result):
+            self.errors[operation]["UnexpectedResult"] += 1
+        return result
+
+    def report(self, elapsed: float) -> dict:
+        operations = {}
+        for operation, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            errors = sum(self.errors[operation].values())
+            operations[operation] = {
+                "count": len(values),
+                "throughput_per_s": len(values) / elapsed if elapsed else 0.0,
+                "error_rate": errors / len(values),
+                "errors": dict(self.errors[operation]),
+                "p50_ms": _percentile(values, 0.5) * 1000,
+                "p90_ms": _percentile(values, 0.9) * 1000,
+                "p95_ms": _percentile(values, 0.95) * 1000,
+                "p99_ms": _percentile(values, 0.99) * 1000,
+                "max_ms": values[-1] * 1000,
+            }
+        return operations
+
+
+class LoadTest:
+    def __init__(self, pool, users: int, duration: float, mix: dict[str, int], think_time: tuple[float, float],
+                 ramp_up: float = 0, password: str = "load_password", seed: int | None = None):
+        self.pool = pool
+        self.users = users
+        self.duration = duration
+        self.mix = mix
+        self.think_time = think_time
+        self.ramp_up = ramp_up
+        self.password = password
+        self.seed = seed
+        self.recorder = Recorder()
+        self.booking_service = BookingService()
+        self.routes = []
+        self.accounts = []
+
+    async def prepare(self):
+        # Учётные записи load_user_N создаются один раз и переиспользуются между прогонами
+        async with self.pool.acquire() as conn:
+            self.routes = [dict(row) for row in await _ROUTES.fetch(conn, 1000)]
+            existing = {row['login'] for row in await _LOAD_USERS.fetch(conn, LOAD_USER_PREFIX, self.users)}
+        for number in range(self.users):
+            login = f"{LOAD_USER_PREFIX}{number}"
+            if login not in existing:
+                await register_user(self.pool, login, login, self.password)
+        async with self.pool.acquire() as conn:
+            self.accounts = [dict(row) for row in await _LOAD_USERS.fetch(conn, LOAD_USER_PREFIX, self.users)]
+        if not self.routes and any(self.mix.get(name) for name in ("search", "book")):
+            raise RuntimeError("Нет будущих рейсов со свободными местами для сценариев search и book")
+        if not self.accounts:
+            raise RuntimeError("Не удалось создать пользователей для нагрузки")
+
+    async def _search(self, rng: random.Random, account: dict):
+        route = rng.choice(self.routes)
+        await self.recorder.measure("search", search_flights(
+            self.pool, route['departure_airport_name'], route['arrival_airport_name'], route['departure_date']
+        ))
+
+    async def _book(self, rng: random.Random, account: dict):
+        route = rng.choice(self.routes)
+        items = DataFrame({"Рейс": [route['flight_id']], "Пользователь": [account['user_id']]})
+        booking_ids = await self.recorder.measure(
+            "book", self.booking_service.process_sale(datetime.now(), items, self.pool)
+        )
+        if not booking_ids:
+            return
+        await self.recorder.measure("confirm", confirm_booking(self.pool, booking_ids[0]), expect=bool)
+        await self.recorder.measure("pay", add_payment(
+            self.pool, booking_ids[0], float(route['price']), datetime.now(), "load_test"
+        ), expect=bool)
+
+    async def _login(self, rng: random.Random, account: dict):
+        await self.recorder.measure(
+            "login", authenticate_user(self.pool, account['login'], self.password),
+            expect=lambda user: user is not None,
+        )
+
+    async def _my_bookings(self, rng: random.Random, account: dict):
+        await self.recorder.measure("my_bookings", get_user_bookings(self.pool, account['user_id']))
+
+    async def _virtual_user(self, number: int, deadline: float):
+        rng = random.Random(None if self.seed is None else self.seed + number)
+        account = self.accounts[number % len(self.accounts)]
+        scenarios = {name: getattr(self, f"_{name}") for name in self.mix}
+        names, weights = list(self.mix), list(self.mix.values())
+        if self.ramp_up:
+            await asyncio.sleep(self.ramp_up * number / self.users)
+        while time.monotonic() < deadline:
+            await scenarios[rng.choices(names, weights)[0]](rng, account)
+            await asyncio.sleep(rng.uniform(*self.think_time))
+
+    async def run(self) -> dict:
+        await self.prepare()
+        pool_before = self.pool.stats()
+        # Ожидания acquire только этого прогона: stats() пула накоплена за всю жизнь процесса
+        # и включает подготовку в prepare()
+        acquire_waits = []
+        listener = acquire_waits.append
+        self.pool.add_acquire_listener(listener)
+        started_at = datetime.now()
+        started = time.monotonic()
+        deadline = started + self.duration
+        try:
+            await asyncio.gather(*(self._virtual_user(number, deadline) for number in range(self.users)))
+        finally:
+            self.pool.remove_acquire_listener(listener)
+        elapsed = time.monotonic() - started
+        pool_after = self.pool.stats()
+
+        acquire_waits.sort()
+        return {
+            "started_at": started_at.isoformat(timespec="seconds"),
+            "commit": _current_commit(),
+            "config": {
+                "users": self.users,
+                "duration_s": self.duration,
+                "mix": self.mix,
+                "think_time_s": list(self.think_time),
+                "ramp_up_s": self.ramp_up,
+                "seed": self.seed,
+            },
+            "elapsed_s": elapsed,
+            "operations": self.recorder.report(elapsed),
+            "pool": {
+                "acquires": len(acquire_waits),
+                "acquire_errors": pool_after["acquire_errors"] - pool_before["acquire_errors"],
+                "acquire_wait_avg_ms": sum(acquire_waits) / len(acquire_waits) * 1000 if acquire_waits else 0.0,
+                "acquire_wait_p95_ms": _percentile(acquire_waits, 0.95) * 1000 if acquire_waits else 0.0,
+                "acquire_wait_max_ms": acquire_waits[-1] * 1000 if acquire_waits else 0.0,
+                "size": pool_after["size"],
+                "max_size": pool_after["max_size"],
+            },
+            "password_hasher": get_password_hasher().stats(),
+            "redis": get_redis_manager().metrics.snapshot(),
+            "queries": {name: {key: value for key, value in item.items() if key != "buckets"}
+                        for name, item in get_query_registry().snapshot().items() if item["count"]},
+        }
+
+
+def _current_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_reports(baseline: dict, current: dict) -> dict:
+    """Изменение пропускной способности, p95 и доли ошибок по операциям относительно baseline."""
+    result = {}
+    for operation, item in current["operations"].items():
+        base = baseline["operations"].get(operation)
+        if base is None:
+            continue
+        result[operation] = {
+            "throughput_change_pct": _change(base["throughput_per_s"], item["throughput_per_s"]),
+            "p95_change_pct": _change(base["p95_ms"], item["p95_ms"]),
+            "error_rate_delta": item["error_rate"] - base["error_rate"],
+        }
+    return result
+
+
+def _change(before: float, after: float) -> float | None:
+    return (after - before) / before * 100 if before else None
@@ -0,0 +1,190 @@
+import csv
+import io
+
+SCHEDULE_COLUMNS = (
+    "airline_id", "departure_airport_id", "arrival_airport_id",
+    "departure_time", "arrival_time", "number_seats", "price",
+)
+MAX_REPORTED_ERRORS = 1000
+
+# Файл разбирается csv.reader, строки попадают в текстовые колонки как есть: строка с неверным
+# числом полей получает error ещё при разборе, остальные проверяются в SQL. Типизированные v_*
+# заполняются только для строк, прошедших проверку. line_no - номер строки в файле
+_CREATE_STAGE = """
+CREATE TEMP TABLE flight_schedule_stage (
+    line_no BIGINT NOT NULL,
+    airline_id TEXT,
+    departure_airport_id TEXT,
+    arrival_airport_id TEXT,
+    departure_time TEXT,
+    arrival_time TEXT,
+    number_seats TEXT,
+    price TEXT,
+    v_airline_id INT,
+    v_departure_airport_id INT,
+    v_arrival_airport_id INT,
+    v_departure_time TIMESTAMP,
+    v_arrival_time TIMESTAMP,
+    v_number_seats INT,
+    v_price DECIMAL(10, 2),
+    error TEXT
+) ON COMMIT DROP;
+"""
+
+_VALIDATE_FORMAT = r"""
+UPDATE flight_schedule_stage SET error = CASE
+    WHEN airline_id IS NULL OR airline_id !~ '^\d{1,9}$' THEN 'airline_id должен быть целым числом'
+    WHEN departure_airport_id IS NULL OR departure_airport_id !~ '^\d{1,9}$' THEN 'departure_airport_id должен быть целым числом'
+    WHEN arrival_airport_id IS NULL OR arrival_airport_id !~ '^\d{1,9}$' THEN 'arrival_airport_id должен быть целым числом'
+    WHEN departure_airport_id = arrival_airport_id THEN 'аэропорты вылета и прилета совпадают'
+    WHEN departure_time IS NULL OR NOT is_valid_timestamp(departure_time) THEN 'некорректное время вылета'
+    WHEN arrival_time IS NULL OR NOT is_valid_timestamp(arrival_time) THEN 'некорректное время прилета'
+    WHEN arrival_time::TIMESTAMP <= departure_time::TIMESTAMP THEN 'время прилета раньше времени вылета'
+    WHEN number_seats IS NULL OR number_seats !~ '^\d{1,6}$' OR number_seats::INT = 0 THEN 'количество мест должно быть положительным'
+    WHEN price IS NULL OR price !~ '^\d{1,8}(\.\d{1,2})?$' THEN 'некорректная цена'
+END
+WHERE error IS NULL;
+"""
+
+_FILL_TYPED = """
+UPDATE flight_schedule_stage SET
+    v_airline_id = airline_id::INT,
+    v_departure_airport_id = departure_airport_id::INT,
+    v_arrival_airport_id = arrival_airport_id::INT,
+    v_departure_time = departure_time::TIMESTAMP,
+    v_arrival_time = arrival_time::TIMESTAMP,
+    v_number_seats = number_seats::INT,
+    v_price = price::DECIMAL(10, 2)
+WHERE error IS NULL;
+"""
+
+# Проверки внешних ключей - анти-соединения по всей таблице сразу, а не запрос на строку
+_VALIDATE_REFERENCES = (
+    """
+    UPDATE flight_schedule_stage s SET error = 'авиакомпания ' || s.airline_id || ' не найдена'
+    WHERE s.error IS NULL AND NOT EXISTS (SELECT 1 FROM Airlines a WHERE a.airline_id = s.v_airline_id);
+    """,
+    """
+    UPDATE flight_schedule_stage s SET error = 'аэропорт вылета ' || s.departure_airport_id || ' не найден'
+    WHERE s.error IS NULL AND NOT EXISTS (SELECT 1 FROM Airports a WHERE a.airport_id = s.v_departure_airport_id);
+    """,
+    """
+    UPDATE flight_schedule_stage s SET error = 'аэропорт прилета ' || s.arrival_airport_id || ' не найден'
+    WHERE s.error IS NULL AND NOT EXISTS (SELECT 1 FROM Airports a WHERE a.airport_id = s.v_arrival_airport_id);
+    """,
+    # Повтор рейса внутри файла: побеждает последняя строка
+    """
+    UPDATE flight_schedule_stage s SET error = 'рейс повторяется ниже в файле'
+    FROM (
+        SELECT line_no, MAX(line_no) OVER (
+            PARTITION BY v_airline_id, v_departure_airport_id, v_departure_time
+        ) AS last_line_no
+        FROM flight_schedule_stage
+        WHERE error IS NULL
+    ) d
+    WHERE s.line_no = d.line_no AND d.line_no <> d.last_line_no;
+    """,
+)
+
+# Места существующего рейса не перезаписываются: number_seats уменьшается бронированиями
+_UPSERT = """
+WITH upserted AS (
+    INSERT INTO Flights (airline_id, departure_airport_id, arrival_airport_id,
+                         departure_time, arrival_time, number_seats, price)
+    SELECT v_airline_id, v_departure_airport_id, v_arrival_airport_id,
+           v_departure_time, v_arrival_time, v_number_seats, v_price
+    FROM flight_schedule_stage
+    WHERE error IS NULL
+    ON CONFLICT (airline_id, departure_airport_id, departure_time) DO UPDATE
+    SET arrival_airport_id = EXCLUDED.arrival_airport_id,
+        arrival_time = EXCLUDED.arrival_time,
+        price = EXCLUDED.price
+    RETURNING (xmax = 0) AS inserted
+)
+SELECT COUNT(*) FILTER (WHERE inserted) AS inserted,
+       COUNT(*) FILTER (WHERE NOT inserted) AS updated
+FROM upserted;
+"""
+
+_ERRORS = """
+SELECT line_no AS line, error
+FROM flight_schedule_stage
+WHERE error IS NOT NULL
+ORDER BY line_no
+LIMIT $1;
+"""
+
+
+def _read_header(reader) -> list[str]:
+    columns = [column.strip() for column in next(reader, [])]
+    missing = set(SCHEDULE_COLUMNS) - set(columns)
+    unknown = set(columns) - set(SCHEDULE_COLUMNS)
+    if missing or unknown or len(columns) != len(set(columns)):
+        raise ValueError(
+            f"Заголовок CSV должен содержать ровно колонки {', '.join(SCHEDULE_COLUMNS)}"
+        )
+    return columns
+
+
+def _stage_records(reader, columns: list[str]):
+    # (line_no, колонки файла..., error); пустые поля - NULL, как у COPY в формате csv
+    try:
+        for row in reader:
+            if not row:
+                continue
+            if len(row) != len(columns):
+                yield (reader.line_num, *([None] * len(columns)),
+                       f"ожидается полей: {len(columns)}, получено: {len(row)}")
+            else:
+                yield (reader.line_num, *(value or None for value in row), None)
+    except csv.Error as e:
+        raise ValueError(f"Строка {reader.line_num}: некорректный CSV ({e})") from e
+    except UnicodeDecodeError as e:
+        raise ValueError("Файл расписания должен быть в кодировке UTF-8") from e
+
+
+async def import_schedule(pool, source) -> dict:
+    """Загружает расписание из CSV (путь или бинарный файловый объект) в Flights.
+
+    Корректные строки вставляются или обновляются, по остальным возвращаются ошибки
+    с номером строки файла.
+    """
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            return await import_schedule(pool, f)
+
+    text = io.TextIOWrapper(source, encoding="utf-8-sig", newline="")
+    try:
+        reader = csv.reader(text)
+        try:
+            columns = _read_header(reader)
+        except UnicodeDecodeError as e:
+            raise ValueError("Файл расписания должен быть в кодировке UTF-8") from e
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(_CREATE_STAGE)
+                await conn.copy_records_to_table(
+                    "flight_schedule_stage", records=_stage_records(reader, columns),
+                    columns=["line_no", *columns, "error"],
+                )
+                await conn.execute(_VALIDATE_FORMAT)
+                await conn.execute(_FILL_TYPED)
+                for query in _VALIDATE_REFERENCES:
+                    await conn.execute(query)
+                counts = await conn.fetchrow(_UPSERT)
+                total = await conn.fetchval("SELECT COUNT(*) FROM flight_schedule_stage;")
+                error_count = await conn.fetchval(
+                    "SELECT COUNT(*) FROM flight_schedule_stage WHERE error IS NOT NULL;"
+                )
+                errors = await conn.fetch(_ERRORS, MAX_REPORTED_ERRORS)
+    finally:
+        # Файл закрывает вызывающий код, обёртка только отсоединяется
+        text.detach()
+
+    return {
+        "total": total,
+        "inserted": counts["inserted"],
+        "updated": counts["updated"],
+        "error_count": error_count,
+        "errors": [(row["line"], row["error"]) for row in errors],
+    }
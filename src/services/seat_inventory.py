@@ -0,0 +1,293 @@
+import asyncio
+import atexit
+import threading
+import time
+import uuid
+from collections import Counter
+import asyncpg
+import redis.exceptions
+from infra.loop import get_background_loop
+from infra.redis_pool import get_redis
+from settings import REDIS_KEY_PREFIX, SEAT_HOLD_TTL, SEAT_RECONCILE_INTERVAL, SEAT_RECONCILE_BATCH
+
+# Оперативный остаток мест в Redis. Для каждого рейса три ключа:
+#   seats:{id}         HASH available - свободно мест, epoch - счётчик подтверждённых броней
+#   seats:{id}:holds   ZSET hold_id -> время истечения удержания (мс)
+#   seats:{id}:qty     HASH hold_id -> удержано мест
+# Postgres остаётся источником истины: триггер decrement_seat_count отклоняет бронь без мест,
+# а reconciler периодически выравнивает available по Flights.number_seats.
+TRACKED_KEY = f"{REDIS_KEY_PREFIX}seats:tracked"
+
+_RECLAIM = """
+local function reclaim(state, holds, qty, now)
+    local expired = redis.call('ZRANGEBYSCORE', holds, '-inf', now)
+    for _, id in ipairs(expired) do
+        local q = tonumber(redis.call('HGET', qty, id) or '0')
+        redis.call('HINCRBY', state, 'available', q)
+        redis.call('HDEL', qty, id)
+    end
+    if #expired > 0 then
+        redis.call('ZREMRANGEBYSCORE', holds, '-inf', now)
+    end
+end
+"""
+
+# ARGV: now_ms, expires_ms, hold_id, количество мест по каждому рейсу
+_HOLD_SCRIPT = _RECLAIM + """
+local now, expires, hold_id = ARGV[1], ARGV[2], ARGV[3]
+local n = #KEYS / 3
+for i = 1, n do
+    local state, holds, qty = KEYS[3 * i - 2], KEYS[3 * i - 1], KEYS[3 * i]
+    if redis.call('HEXISTS', state, 'available') == 0 then
+        return {-1, i}
+    end
+    reclaim(state, holds, qty, now)
+    if tonumber(redis.call('HGET', state, 'available')) < tonumber(ARGV[3 + i]) then
+        return {0, i}
+    end
+end
+for i = 1, n do
+    local state, holds, qty = KEYS[3 * i - 2], KEYS[3 * i - 1], KEYS[3 * i]
+    redis.call('HINCRBY', state, 'available', -tonumber(ARGV[3 + i]))
+    redis.call('ZADD', holds, expires, hold_id)
+    redis.call('HSET', qty, hold_id, ARGV[3 + i])
+end
+return {1, 0}
+"""
+
+# Бронь записана в Postgres: удержание снимается без возврата мест.
+# Если удержание уже истекло и места вернулись в остаток, списываем их снова
+_CONFIRM_SCRIPT = """
+local hold_id = ARGV[1]
+for i = 1, #KEYS / 3 do
+    local state, holds, qty = KEYS[3 * i - 2], KEYS[3 * i - 1], KEYS[3 * i]
+    if redis.call('HDEL', qty, hold_id) == 0 then
+        redis.call('HINCRBY', state, 'available', -tonumber(ARGV[1 + i]))
+    end
+    redis.call('ZREM', holds, hold_id)
+    redis.call('HINCRBY', state, 'epoch', 1)
+end
+return 1
+"""
+
+_RELEASE_SCRIPT = """
+local hold_id = ARGV[1]
+for i = 1, #KEYS / 3 do
+    local state, holds, qty = KEYS[3 * i - 2], KEYS[3 * i - 1], KEYS[3 * i]
+    local q = redis.call('HGET', qty, hold_id)
+    if q then
+        redis.call('HINCRBY', state, 'available', tonumber(q))
+        redis.call('HDEL', qty, hold_id)
+    end
+    redis.call('ZREM', holds, hold_id)
+end
+return 1
+"""
+
+_INIT_SCRIPT = """
+redis.call('HSETNX', KEYS[1], 'available', ARGV[1])
+redis.call('SADD', KEYS[2], ARGV[2])
+return 1
+"""
+
+# ARGV: epoch на момент чтения Postgres, number_seats из Postgres, now_ms.
+# Если за это время подтвердилась бронь, данные Postgres могли устареть - пропускаем рейс до следующего прохода
+_RECONCILE_SCRIPT = _RECLAIM + """
+local state, holds, qty = KEYS[1], KEYS[2], KEYS[3]
+if (redis.call('HGET', state, 'epoch') or '0') ~= ARGV[1] then
+    return nil
+end
+if redis.call('HEXISTS', state, 'available') == 0 then
+    return nil
+end
+reclaim(state, holds, qty, ARGV[3])
+local held = 0
+for _, q in ipairs(redis.call('HVALS', qty)) do
+    held = held + tonumber(q)
+end
+local expected = tonumber(ARGV[2]) - held
+local drift = expected - tonumber(redis.call('HGET', state, 'available'))
+if drift ~= 0 then
+    redis.call('HSET', state, 'available', expected)
+end
+return drift
+"""
+
+
+class SeatsUnavailableError(Exception):
+    def __init__(self, flight_id: int):
+        super().__init__(f"Нет свободных мест на рейс {flight_id}")
+        self.flight_id = flight_id
+
+
+def _flight_keys(flight_id: int) -> list[str]:
+    base = f"{REDIS_KEY_PREFIX}seats:{flight_id}"
+    return [base, f"{base}:holds", f"{base}:qty"]
+
+
+class SeatInventory:
+    def __init__(self, redis_client):
+        self._redis = redis_client
+        self._hold = redis_client.register_script(_HOLD_SCRIPT)
+        self._confirm = redis_client.register_script(_CONFIRM_SCRIPT)
+        self._release = redis_client.register_script(_RELEASE_SCRIPT)
+        self._init = redis_client.register_script(_INIT_SCRIPT)
+        self._reconcile = redis_client.register_script(_RECONCILE_SCRIPT)
+
+    @staticmethod
+    def _keys_and_args(seats: dict[int, int]) -> tuple[list[int], list[str], list[int]]:
+        flight_ids = sorted(seats)
+        keys = [key for flight_id in flight_ids for key in _flight_keys(flight_id)]
+        return flight_ids, keys, [seats[flight_id] for flight_id in flight_ids]
+
+    async def _load(self, pool, flight_ids: list[int]):
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(
+                "SELECT flight_id, number_seats FROM Flights WHERE flight_id = ANY($1::int[]);", flight_ids
+            )
+        found = {row['flight_id'] for row in rows}
+        for flight_id in flight_ids:
+            if flight_id not in found:
+                raise SeatsUnavailableError(flight_id)
+        for row in rows:
+            await self._init(keys=[_flight_keys(row['flight_id'])[0], TRACKED_KEY],
+                             args=[row['number_seats'], row['flight_id']])
+
+    async def hold(self, pool, seats: dict[int, int], ttl: float = SEAT_HOLD_TTL) -> str:
+        # Атомарно удерживает места на всех рейсах корзины или не удерживает ни одного
+        flight_ids, keys, quantities = self._keys_and_args(seats)
+        hold_id = uuid.uuid4().hex
+        for _ in range(2):
+            now_ms = int(time.time() * 1000)
+            status, index = await self._hold(
+                keys=keys, args=[now_ms, now_ms + int(ttl * 1000), hold_id, *quantities]
+            )
+            if status == 1:
+                return hold_id
+            if status == 0:
+                raise SeatsUnavailableError(flight_ids[index - 1])
+            await self._load(pool, flight_ids)
+        raise SeatsUnavailableError(flight_ids[index - 1])
+
+    async def confirm(self, hold_id: str, seats: dict[int, int]) -> None:
+        _, keys, quantities = self._keys_and_args(seats)
+        await self._confirm(keys=keys, args=[hold_id, *quantities])
+
+    async def release(self, hold_id: str, seats: dict[int, int]) -> None:
+        _, keys, _ = self._keys_and_args(seats)
+        await self._release(keys=keys, args=[hold_id])
+
+    async def reconcile(self, pool, flight_ids: list[int]) -> dict[int, int]:
+        pipe = self._redis.pipeline(transaction=False)
+        for flight_id in flight_ids:
+            pipe.hget(_flight_keys(flight_id)[0], "epoch")
+        epochs = dict(zip(flight_ids, await pipe.execute()))
+
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(
+                "SELECT flight_id, number_seats FROM Flights WHERE flight_id = ANY($1::int[]);", flight_ids
+            )
+        db_seats = {row['flight_id']: row['number_seats'] for row in rows}
+
+        drift = {}
+        now_ms = int(time.time() * 1000)
+        for flight_id in flight_ids:
+            if flight_id not in db_seats:
+                # Рейс удалён: счётчик больше не нужен
+                await self._redis.delete(*_flight_keys(flight_id))
+                await self._redis.srem(TRACKED_KEY, flight_id)
+                continue
+            result = await self._reconcile(
+                keys=_flight_keys(flight_id), args=[epochs[flight_id] or "0", db_seats[flight_id], now_ms]
+            )
+            if result:
+                drift[flight_id] = result
+        return drift
+
+
+def seats_by_flight(flight_ids) -> dict[int, int]:
+    return dict(Counter(int(flight_id) for flight_id in flight_ids))
+
+
+_inventory = None
+_inventory_lock = threading.Lock()
+
+
+def get_seat_inventory() -> SeatInventory:
+    global _inventory
+    with _inventory_lock:
+        if _inventory is None:
+            _inventory = SeatInventory(get_redis())
+    return _inventory
+
+
+class SeatReconciler:
+    def __init__(self, pool, inventory: SeatInventory, interval: float, batch_size: int):
+        self._pool = pool
+        self._inventory = inventory
+        self._interval = interval
+        self._batch_size = batch_size
+        self._task = None
+        self.corrections = 0
+
+    async def run_once(self) -> int:
+        corrected = 0
+        redis_client = get_redis()
+        async for flight_ids in self._tracked_batches(redis_client):
+            drift = await self._inventory.reconcile(self._pool, flight_ids)
+            for flight_id, delta in drift.items():
+                print(f"Расхождение мест на рейсе {flight_id}: {delta:+d}, исправлено")
+            corrected += len(drift)
+        self.corrections += corrected
+        return corrected
+
+    async def _tracked_batches(self, redis_client):
+        batch = []
+        async for flight_id in redis_client.sscan_iter(TRACKED_KEY, count=self._batch_size):
+            batch.append(int(flight_id))
+            if len(batch) >= self._batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self._interval)
+            try:
+                await self.run_once()
+            except (redis.exceptions.RedisError, asyncpg.PostgresError, OSError) as e:
+                print(f"Ошибка сверки мест: {e}")
+
+    async def _start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def _stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def start(self):
+        get_background_loop().run_sync(self._start())
+
+    def stop(self):
+        get_background_loop().run_sync(self._stop(), timeout=5)
+
+
+_reconciler = None
+_reconciler_lock = threading.Lock()
+
+
+def start_seat_reconciler(pool) -> SeatReconciler:
+    global _reconciler
+    # Отдельная блокировка: get_seat_inventory() берёт _inventory_lock сам
+    with _reconciler_lock:
+        if _reconciler is None:
+            _reconciler = SeatReconciler(pool, get_seat_inventory(), SEAT_RECONCILE_INTERVAL, SEAT_RECONCILE_BATCH)
+            _reconciler.start()
+            atexit.register(_reconciler.stop)
+    return _reconciler
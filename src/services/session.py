@@ -0,0 +1,93 @@
+import secrets
+import threading
+import time
+from datetime import datetime
+from infra.redis_pool import get_redis
+from settings import REDIS_KEY_PREFIX, TOKEN_TTL, SESSION_TTL, SESSION_LOCAL_TTL, SESSION_LOCAL_MAX_SIZE
+
+# Проверка токена и продление сессии одним вызовом: GET токена, HSET last_activity,
+# два EXPIRE и чтение данных сессии выполняются атомарно на сервере
+_VALIDATE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 or redis.call('EXISTS', KEYS[2]) == 0 then
+    return false
+end
+redis.call('HSET', KEYS[2], 'last_activity', ARGV[1])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return redis.call('HGETALL', KEYS[2])
+"""
+
+_validate_script = None
+# Недавно проверенные токены: частые rerun одной сессии не ходят в Redis
+_recent = {}
+_recent_lock = threading.Lock()
+
+
+def _token_key(token: str) -> str:
+    return f"{REDIS_KEY_PREFIX}auth_token:{token}"
+
+
+def _session_key(token: str) -> str:
+    return f"{REDIS_KEY_PREFIX}session:{token}"
+
+
+def _to_user(session: dict) -> dict:
+    return {
+        "id": int(session["user_id"]),
+        "role": session["role"],
+        "username": session.get("username", session.get("login")),
+    }
+
+
+async def create_session(user) -> str:
+    token = secrets.token_hex(16)
+    now = datetime.now().isoformat()
+    pipe = get_redis().pipeline(transaction=True)
+    pipe.setex(_token_key(token), TOKEN_TTL, user['user_id'])
+    pipe.hset(_session_key(token), mapping={
+        "user_id": str(user['user_id']),
+        "role": user['role'],
+        "login": user['login'],
+        "username": user['username'],
+        "created_at": now,
+        "last_activity": now,
+    })
+    pipe.expire(_session_key(token), SESSION_TTL)
+    await pipe.execute()
+    return token
+
+
+async def validate_session(token: str) -> dict | None:
+    """Данные пользователя по токену с продлением сессии; None - сессия истекла."""
+    with _recent_lock:
+        cached = _recent.get(token)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+
+    global _validate_script
+    redis_client = get_redis()
+    if _validate_script is None:
+        _validate_script = redis_client.register_script(_VALIDATE_SCRIPT)
+    response = await _validate_script(
+        keys=[_token_key(token), _session_key(token)],
+        args=[datetime.now().isoformat(), TOKEN_TTL, SESSION_TTL],
+    )
+    if not response:
+        forget_session(token)
+        return None
+    user = _to_user(dict(zip(response[::2], response[1::2])))
+
+    with _recent_lock:
+        now = time.monotonic()
+        if len(_recent) >= SESSION_LOCAL_MAX_SIZE:
+            for expired in [key for key, (expires_at, _) in _recent.items() if expires_at <= now]:
+                del _recent[expired]
+            if len(_recent) >= SESSION_LOCAL_MAX_SIZE:
+                _recent.clear()
+        _recent[token] = (now + SESSION_LOCAL_TTL, user)
+    return user
+
+
+def forget_session(token: str) -> None:
+    with _recent_lock:
+        _recent.pop(token, None)
@@ -0,0 +1,538 @@
+import asyncio
+import math
+import multiprocessing
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+import asyncpg
+
+# Детерминированный генератор объёмных данных поверх migrations/dml.sql.
+# Новые строки получают id после уже существующих, поэтому на одной и той же исходной базе
+# результат зависит только от seed, объёмов, as_of и days. Каждая порция (chunk) строится
+# своим генератором случайных чисел с зерном "{seed}:{таблица}:{номер}", поэтому число
+# процессов влияет только на скорость, но не на данные.
+#
+# Порции грузятся бинарным COPY из отдельных процессов. Сессии загрузки работают с
+# session_replication_role = replica: строковые триггеры и проверки внешних ключей
+# не срабатывают. Поэтому карту мест, остаток мест и flight_search генератор заполняет сам,
+# а сводку оценок пересобирает в конце. Нужны права суперпользователя или
+# GRANT SET ON PARAMETER session_replication_role.
+
+# Объёмы при scale = 1; bookings_per_flight - в среднем на вылетевший рейс, на будущие продано меньше
+DEFAULT_VOLUMES = {
+    "airlines": 300,
+    "airports": 20_000,
+    "users": 500_000,
+    "flights": 2_000_000,
+    "bookings_per_flight": 10,
+    "reviews": 2_000_000,
+}
+
+# Размеры порций фиксированы: от них зависит раскладка зёрен по строкам
+FLIGHTS_PER_CHUNK = 20_000
+ROWS_PER_CHUNK = 100_000
+
+COUNTRIES = (
+    "Россия", "Китай", "США", "Германия", "Франция", "Турция", "ОАЭ", "Испания", "Италия", "Индия",
+    "Япония", "Бразилия", "Канада", "Великобритания", "Австралия", "Мексика", "Индонезия", "Таиланд",
+    "Египет", "Казахстан", "Узбекистан", "Армения", "Грузия", "Израиль", "Греция", "Португалия",
+    "Ирландия", "Исландия", "Швейцария", "Австрия", "Польша", "Чехия", "Болгария", "Румыния",
+    "Сербия", "Финляндия", "Норвегия", "Швеция", "Вьетнам", "Южная Корея",
+)
+_SYLLABLES = (
+    "но", "во", "ка", "ре", "ми", "ла", "то", "ро", "са", "ве", "ли", "ни", "да", "ко", "мо",
+    "ра", "бе", "зо", "ту", "ге", "ор", "ан", "ел", "ус", "ир", "ст", "бор", "град", "поль", "дар",
+)
+_CITY_SUFFIXES = ("ск", "ов", "ино", "град", "поль", "ань", "ево", "ир", "ия", "он")
+_AIRPORT_SUFFIXES = ("Международный", "Северный", "Южный", "Центральный", "Восточный", "Западный")
+_AIRLINE_SUFFIXES = ("Air", "Airlines", "Airways", "Авиа", "Jet", "Wings")
+_CODE_CHARS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+_CAPACITIES = ((1000, (50, 76, 100)), (4000, (150, 180, 189)), (math.inf, (250, 300, 350)))
+# Доля рейсов по числу дней в неделю
+_FREQUENCIES = ((7, 0.45), (5, 0.2), (3, 0.2), (2, 0.1), (1, 0.05))
+_PAYMENT_METHODS = ("Кредитная карта", "Кредитная карта", "Кредитная карта", "СБП", "PayPal")
+_CONFIRMED = "Подтверждено"
+_PENDING = "ожидает подтверждения"
+
+_COMMENTS = {
+    "ru": {
+        "good": ("Отличный сервис", "Вылетели вовремя", "Вежливый экипаж", "Удобные кресла",
+                 "Вкусное питание на борту", "Багаж выдали быстро", "Буду летать ещё"),
+        "neutral": ("Обычный перелёт", "Ничего особенного", "Задержка на полчаса",
+                    "Питание так себе", "Тесновато, но терпимо", "Цена соответствует качеству"),
+        "bad": ("Рейс задержали на несколько часов", "Потеряли багаж", "Грубый персонал",
+                "Очень тесные кресла", "Не вернули деньги за отмену", "Больше не полечу"),
+    },
+    "en": {
+        "good": ("Great service", "On time departure", "Friendly crew", "Comfortable seats",
+                 "Tasty food on board", "Fast baggage delivery"),
+        "neutral": ("Average flight", "Nothing special", "Half an hour delay", "Food was okay",
+                    "A bit cramped"),
+        "bad": ("Flight delayed for hours", "Lost my luggage", "Rude staff", "Terrible legroom",
+                "No refund for cancellation"),
+    },
+}
+
+
+def scaled_volumes(scale: float, overrides: dict | None = None) -> dict:
+    volumes = {
+        name: value if name == "bookings_per_flight" else max(1, round(value * scale))
+        for name, value in DEFAULT_VOLUMES.items()
+    }
+    volumes.update({name: value for name, value in (overrides or {}).items() if value is not None})
+    return volumes
+
+
+def _zipf_cum_weights(count: int, rng: random.Random, exponent: float = 1.1) -> list[float]:
+    # Немногие крупные узлы и длинный хвост мелких; ранги перемешаны, чтобы узлы не шли подряд по id
+    ranks = list(range(1, count + 1))
+    rng.shuffle(ranks)
+    total, cum = 0.0, []
+    for rank in ranks:
+        total += rank ** -exponent
+        cum.append(total)
+    return cum
+
+
+def _word(rng: random.Random, syllables: int) -> str:
+    return "".join(rng.choice(_SYLLABLES) for _ in range(syllables)).capitalize()
+
+
+def _distance_km(a: tuple[float, float], b: tuple[float, float]) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371 * math.asin(math.sqrt(h))
+
+
+def _departure_minute(rng: random.Random) -> int:
+    # Утренний и вечерний пики плюс равномерный фон с 6 до 23 часов, шаг 5 минут
+    choice = rng.random()
+    if choice < 0.45:
+        minute = rng.gauss(8 * 60, 90)
+    elif choice < 0.8:
+        minute = rng.gauss(18 * 60, 120)
+    else:
+        minute = rng.uniform(6 * 60, 23 * 60)
+    return int(min(max(minute, 0), 1435)) // 5 * 5
+
+
+def _days_with_weekday(horizon_start: date, days: int, weekday: int) -> int:
+    return days // 7 + (1 if (weekday - horizon_start.weekday()) % 7 < days % 7 else 0)
+
+
+class Dimensions:
+    """Авиакомпании, аэропорты и маршруты: строятся в основном процессе, они небольшие."""
+
+    def __init__(self, seed: int, volumes: dict, bases: dict, horizon_start: date, days: int):
+        if volumes["airports"] < 2:
+            raise ValueError("Для маршрутов нужно хотя бы два аэропорта")
+        self.airlines = []
+        self.airports = []
+        self.routes = []
+        self._build_airlines(random.Random(f"{seed}:airlines"), volumes["airlines"], bases["airlines"])
+        self._build_airports(random.Random(f"{seed}:airports"), volumes["airports"], bases["airports"])
+        self._build_routes(random.Random(f"{seed}:routes"), volumes["flights"], horizon_start, days)
+
+    def _build_airlines(self, rng: random.Random, count: int, base: int):
+        self.airline_cum = _zipf_cum_weights(count, rng)
+        for number in range(count):
+            name = f"{_word(rng, rng.randint(2, 3))} {rng.choice(_AIRLINE_SUFFIXES)}"
+            code = "".join(rng.choice(_CODE_CHARS) for _ in range(2))
+            # Качество задаёт среднюю оценку в отзывах
+            self.airlines.append((base + number + 1, name[:100], code, rng.choice(COUNTRIES), rng.uniform(2.5, 4.7)))
+        self.airlines_by_country = {}
+        for index, airline in enumerate(self.airlines):
+            self.airlines_by_country.setdefault(airline[3], []).append(index)
+
+    def _build_airports(self, rng: random.Random, count: int, base: int):
+        country_cum = _zipf_cum_weights(len(COUNTRIES), rng, exponent=0.8)
+        centers = {country: (rng.uniform(-40, 65), rng.uniform(-120, 150)) for country in COUNTRIES}
+        names, cities = set(), set()
+        airport_id = base
+        while len(self.airports) < count:
+            country = rng.choices(COUNTRIES, cum_weights=country_cum)[0]
+            city = _word(rng, rng.randint(1, 2)) + rng.choice(_CITY_SUFFIXES)
+            while city in cities:
+                city += rng.choice(_CITY_SUFFIXES)
+            cities.add(city)
+            center = centers[country]
+            location = (center[0] + rng.uniform(-8, 8), center[1] + rng.uniform(-12, 12))
+            for suffix in rng.sample(_AIRPORT_SUFFIXES, rng.choices((1, 2, 3), (0.8, 0.15, 0.05))[0]):
+                name = city if suffix == _AIRPORT_SUFFIXES[0] else f"{city} {suffix}"
+                if name in names or len(self.airports) >= count:
+                    continue
+                names.add(name)
+                airport_id += 1
+                self.airports.append((airport_id, name[:100], city[:50], country, location))
+        self.airport_cum = _zipf_cum_weights(count, rng)
+        self.airports_by_country = {}
+        for index, airport in enumerate(self.airports):
+            self.airports_by_country.setdefault(airport[3], []).append(index)
+        self.country_airport_cum = {
+            country: _cum([self.airport_cum[i] - (self.airport_cum[i - 1] if i else 0) for i in indexes])
+            for country, indexes in self.airports_by_country.items()
+        }
+
+    def _pick_airport(self, rng: random.Random, country: str | None = None) -> int:
+        if country is None:
+            return rng.choices(range(len(self.airports)), cum_weights=self.airport_cum)[0]
+        indexes = self.airports_by_country[country]
+        return rng.choices(indexes, cum_weights=self.country_airport_cum[country])[0]
+
+    def _pick_airline(self, rng: random.Random, country: str) -> int:
+        local = self.airlines_by_country.get(country)
+        if local and rng.random() < 0.7:
+            return rng.choice(local)
+        return rng.choices(range(len(self.airlines)), cum_weights=self.airline_cum)[0]
+
+    def _build_routes(self, rng: random.Random, flights: int, horizon_start: date, days: int):
+        # Маршрут - рейс авиакомпании по расписанию: одно время вылета в выбранные дни недели.
+        # (авиакомпания, аэропорт вылета, минута) не повторяются, поэтому uq_flights_schedule не нарушается
+        slots = len(self.airlines) * len(self.airports) * (1440 // 5)
+        if flights > slots * days:
+            raise ValueError(f"{flights} рейсов не помещаются в {days} дней: не больше {slots * days} "
+                             f"при {len(self.airlines)} авиакомпаниях и {len(self.airports)} аэропортах")
+        taken = set()
+        planned = 0
+        # Подряд неудачных попыток; при почти исчерпанных слотах случайный выбор может не найти свободный
+        misses = 0
+        frequencies, frequency_weights = zip(*_FREQUENCIES)
+        while planned < flights:
+            if misses > len(self.airlines) * len(self.airports):
+                raise ValueError(f"Не удалось разместить рейсы: запланировано {planned} из {flights}, "
+                                 f"свободных слотов расписания не осталось")
+            departure = self._pick_airport(rng)
+            country = self.airports[departure][3]
+            arrival = departure
+            while arrival == departure:
+                domestic = rng.random() < 0.6 and len(self.airports_by_country[country]) > 1
+                arrival = self._pick_airport(rng, country if domestic else None)
+            airline = self._pick_airline(rng, country)
+            weekdays = tuple(sorted(rng.sample(range(7), rng.choices(frequencies, frequency_weights)[0])))
+            count = sum(_days_with_weekday(horizon_start, days, weekday) for weekday in weekdays)
+            if not count:
+                # Короткий горизонт без этих дней недели: слот не резервируется
+                misses += 1
+                continue
+            minute = _departure_minute(rng)
+            for _ in range(1440 // 5):
+                if (airline, departure, minute) not in taken:
+                    break
+                minute = (minute + 5) % 1440
+            else:
+                # Все слоты авиакомпании в этом аэропорту заняты
+                misses += 1
+                continue
+            taken.add((airline, departure, minute))
+            misses = 0
+
+            distance = _distance_km(self.airports[departure][4], self.airports[arrival][4])
+            capacity = rng.choice(next(options for limit, options in _CAPACITIES if distance < limit))
+            duration = max(45, int(distance / 13.3) + 30)
+            base_price = int((1500 + distance * 4.5) * rng.uniform(0.8, 1.3) * 100)
+            self.routes.append((
+                self.airlines[airline][0], self.airports[departure][0], self.airports[arrival][0],
+                minute, weekdays, duration, capacity, base_price, count,
+            ))
+            planned += count
+
+    def airline_records(self) -> list[tuple]:
+        return [airline[:4] for airline in self.airlines]
+
+    def airport_records(self) -> list[tuple]:
+        return [airport[:4] for airport in self.airports]
+
+    def flight_chunks(self) -> list[list[tuple]]:
+        chunks, current, size = [], [], 0
+        for route in self.routes:
+            current.append(route)
+            size += route[-1]
+            if size >= FLIGHTS_PER_CHUNK:
+                chunks.append(current)
+                current, size = [], 0
+        if current:
+            chunks.append(current)
+        return chunks
+
+
+def _cum(weights: list[float]) -> list[float]:
+    total, cum = 0.0, []
+    for weight in weights:
+        total += weight
+        cum.append(total)
+    return cum
+
+
+def _iter_flights(spec: dict):
+    # Общая для планирования и загрузки часть: даты рейсов и число броней на каждом.
+    # Число броней берётся из отдельного генератора, чтобы план совпадал с загрузкой
+    counts_rng = random.Random(f"{spec['seed']}:booking_counts:{spec['chunk']}")
+    horizon_start, as_of, mean = spec["horizon_start"], spec["as_of"], spec["bookings_per_flight"]
+    flight_id = spec["flight_base"]
+    for route in spec["routes"]:
+        weekdays, capacity = route[4], route[6]
+        for offset in range(spec["days"]):
+            day = horizon_start + timedelta(days=offset)
+            if day.weekday() not in weekdays:
+                continue
+            flight_id += 1
+            # Продажи на дальние даты только начались
+            days_ahead = (day - as_of).days
+            fill = 1.0 if days_ahead <= 0 else max(0.1, 1 - days_ahead / 120)
+            bookings = min(capacity, round(counts_rng.betavariate(2, 2) * 2 * mean * fill))
+            yield flight_id, route, day, bookings
+
+
+def plan_flight_chunk(spec: dict) -> tuple[int, int]:
+    flights = bookings = 0
+    for _, _, _, count in _iter_flights(spec):
+        flights += 1
+        bookings += count
+    return flights, bookings
+
+
+def _flight_chunk_records(spec: dict):
+    rng = random.Random(f"{spec['seed']}:flights:{spec['chunk']}")
+    as_of_dt = datetime.combine(spec["as_of"], datetime.min.time())
+    user_base, user_count = spec["user_base"], spec["user_count"]
+    booking_id = spec["booking_base"]
+    payment_offset = spec["payment_base"] - spec["booking_base"]
+    flights, bookings, payments = [], [], []
+    for flight_id, route, day, count in _iter_flights(spec):
+        airline_id, departure_id, arrival_id, minute, _, duration, capacity, base_price, _ = route
+        departure = datetime.combine(day, datetime.min.time()) + timedelta(minutes=minute)
+        arrival = departure + timedelta(minutes=duration + rng.randint(-10, 15))
+        price_cents = int(base_price * rng.uniform(0.85, 1.25))
+        price = Decimal(price_cents).scaleb(-2)
+
+        seat_map = bytearray(b"0" * capacity)
+        past = departure < as_of_dt
+        for seat in rng.sample(range(1, capacity + 1), count):
+            seat_map[seat - 1] = 49
+            booking_id += 1
+            # Часть пользователей летает заметно чаще остальных
+            user_id = user_base + 1 + int(user_count * rng.random() ** 2)
+            lead = timedelta(days=min(180, int(rng.expovariate(1 / 21))), seconds=rng.randrange(86400))
+            booked_at = min(departure - lead, as_of_dt - timedelta(seconds=rng.randrange(60, 86400)))
+            confirmed = rng.random() < (0.95 if past else 0.7)
+            bookings.append((booking_id, user_id, flight_id, booked_at, _CONFIRMED if confirmed else _PENDING, seat))
+            if confirmed:
+                payments.append((
+                    booking_id + payment_offset, booking_id, price,
+                    booked_at + timedelta(seconds=rng.randrange(30, 1800)), rng.choice(_PAYMENT_METHODS),
+                ))
+        flights.append((
+            flight_id, airline_id, departure_id, arrival_id, departure, arrival,
+            capacity - count, price, asyncpg.BitString(seat_map.decode()),
+        ))
+    return flights, bookings, payments
+
+
+# flight_search обычно ведёт триггер; при загрузке с отключёнными триггерами строки порции добавляются здесь
+_FILL_FLIGHT_SEARCH = """
+INSERT INTO flight_search
+SELECT f.flight_id, f.airline_id, f.departure_airport_id, f.arrival_airport_id,
+       a.name, dep.name, arr.name,
+       f.departure_time, f.arrival_time, f.price, f.number_seats
+FROM Flights f
+JOIN Airlines a ON f.airline_id = a.airline_id
+JOIN Airports dep ON f.departure_airport_id = dep.airport_id
+JOIN Airports arr ON f.arrival_airport_id = arr.airport_id
+WHERE f.flight_id > $1 AND f.flight_id <= $2;
+"""
+
+
+async def _connect(db_config: dict):
+    return await asyncpg.connect(**db_config, server_settings={"session_replication_role": "replica"})
+
+
+async def _load_flight_chunk(db_config: dict, spec: dict) -> dict:
+    flights, bookings, payments = _flight_chunk_records(spec)
+    conn = await _connect(db_config)
+    try:
+        async with conn.transaction():
+            await conn.copy_records_to_table("flights", records=flights, columns=(
+                "flight_id", "airline_id", "departure_airport_id", "arrival_airport_id",
+                "departure_time", "arrival_time", "number_seats", "price", "seat_map",
+            ))
+            await conn.copy_records_to_table("bookings", records=bookings, columns=(
+                "booking_id", "user_id", "flight_id", "booking_time", "status", "seat",
+            ))
+            await conn.copy_records_to_table("payments", records=payments, columns=(
+                "payment_id", "booking_id", "amount", "payment_date", "payment_method",
+            ))
+            await conn.execute(_FILL_FLIGHT_SEARCH, spec["flight_base"], spec["flight_base"] + len(flights))
+    finally:
+        await conn.close()
+    return {"flights": len(flights), "bookings": len(bookings), "payments": len(payments)}
+
+
+def load_flight_chunk(db_config: dict, spec: dict) -> dict:
+    return asyncio.run(_load_flight_chunk(db_config, spec))
+
+
+async def _load_user_chunk(db_config: dict, seed: int, chunk: int, first_id: int, count: int,
+                           password_hash: str) -> dict:
+    rng = random.Random(f"{seed}:users:{chunk}")
+    records = []
+    for user_id in range(first_id, first_id + count):
+        username = f"{_word(rng, rng.randint(2, 3))} {_word(rng, rng.randint(2, 4))}"
+        records.append((user_id, username[:50], f"user{user_id}@aviapp.test", password_hash, "user"))
+    conn = await _connect(db_config)
+    try:
+        await conn.copy_records_to_table(
+            "users", records=records, columns=("user_id", "username", "login", "password_hash", "role")
+        )
+    finally:
+        await conn.close()
+    return {"users": len(records)}
+
+
+def load_user_chunk(db_config: dict, seed: int, chunk: int, first_id: int, count: int, password_hash: str) -> dict:
+    return asyncio.run(_load_user_chunk(db_config, seed, chunk, first_id, count, password_hash))
+
+
+def _comment(rng: random.Random, rating: int) -> str | None:
+    if rng.random() < 0.15:
+        return None
+    phrases = _COMMENTS["en" if rng.random() < 0.2 else "ru"]
+    mood = "good" if rating >= 4 else "neutral" if rating == 3 else "bad"
+    return ". ".join(rng.sample(phrases[mood], rng.randint(1, 3))) + "."
+
+
+async def _load_review_chunk(db_config: dict, seed: int, chunk: int, first_id: int, count: int,
+                             user_base: int, user_count: int, airlines: list[tuple], airline_cum: list[float]) -> dict:
+    rng = random.Random(f"{seed}:reviews:{chunk}")
+    records = []
+    for review_id in range(first_id, first_id + count):
+        airline_id, quality = rng.choices(airlines, cum_weights=airline_cum)[0]
+        rating = min(5, max(1, round(rng.gauss(quality, 1.0))))
+        user_id = user_base + 1 + rng.randrange(user_count)
+        records.append((review_id, user_id, airline_id, rating, _comment(rng, rating)))
+    conn = await _connect(db_config)
+    try:
+        await conn.copy_records_to_table(
+            "reviews", records=records, columns=("review_id", "user_id", "airline_id", "rating", "comment")
+        )
+    finally:
+        await conn.close()
+    return {"reviews": len(records)}
+
+
+def load_review_chunk(db_config: dict, seed: int, chunk: int, first_id: int, count: int,
+                      user_base: int, user_count: int, airlines: list[tuple], airline_cum: list[float]) -> dict:
+    return asyncio.run(_load_review_chunk(
+        db_config, seed, chunk, first_id, count, user_base, user_count, airlines, airline_cum
+    ))
+
+
+_SEQUENCES = (
+    ("users", "user_id"), ("airlines", "airline_id"), ("airports", "airport_id"), ("flights", "flight_id"),
+    ("bookings", "booking_id"), ("payments", "payment_id"), ("reviews", "review_id"),
+)
+
+
+class SyntheticDataGenerator:
+    def __init__(self, db_config: dict, seed: int, volumes: dict, as_of: date, days: int, workers: int):
+        self.db_config = db_config
+        self.seed = seed
+        self.volumes = volumes
+        self.as_of = as_of
+        self.days = days
+        self.horizon_start = as_of - timedelta(days=days // 2)
+        self.workers = workers
+
+    async def _bases(self, pool) -> dict:
+        async with pool.acquire() as conn:
+            return {
+                table: await conn.fetchval(f"SELECT COALESCE(MAX({column}), 0) FROM {table}")
+                for table, column in _SEQUENCES
+            }
+
+    def _flight_specs(self, dimensions: Dimensions, bases: dict) -> list[dict]:
+        specs, flight_base = [], bases["flights"]
+        for chunk, routes in enumerate(dimensions.flight_chunks()):
+            specs.append({
+                "seed": self.seed, "chunk": chunk, "routes": routes, "flight_base": flight_base,
+                "horizon_start": self.horizon_start, "days": self.days, "as_of": self.as_of,
+                "bookings_per_flight": self.volumes["bookings_per_flight"],
+                "user_base": bases["users"], "user_count": self.volumes["users"],
+            })
+            flight_base += sum(route[-1] for route in routes)
+        return specs
+
+    async def _run_chunks(self, executor, label: str, calls: list[tuple]) -> dict:
+        loop = asyncio.get_running_loop()
+        totals = {}
+        started = time.perf_counter()
+        futures = [loop.run_in_executor(executor, func, *args) for func, *args in calls]
+        for done, future in enumerate(asyncio.as_completed(futures), 1):
+            for name, value in (await future).items():
+                totals[name] = totals.get(name, 0) + value
+            print(f"{label}: {done}/{len(futures)} порций, {time.perf_counter() - started:.0f} с")
+        return totals
+
+    async def run(self, pool, password_hash: str, dry_run: bool = False) -> dict:
+        started = time.perf_counter()
+        bases = await self._bases(pool)
+        dimensions = Dimensions(self.seed, self.volumes, bases, self.horizon_start, self.days)
+        specs = self._flight_specs(dimensions, bases)
+
+        # spawn: рабочим не нужны потоки фонового цикла и пула из основного процесса
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as executor:
+            loop = asyncio.get_running_loop()
+            plans = await asyncio.gather(*(loop.run_in_executor(executor, plan_flight_chunk, spec) for spec in specs))
+            booking_base, payment_base = bases["bookings"], bases["payments"]
+            for spec, (_, bookings) in zip(specs, plans):
+                spec["booking_base"], spec["payment_base"] = booking_base, payment_base
+                booking_base += bookings
+                payment_base += bookings
+            planned = {
+                "airlines": len(dimensions.airlines),
+                "airports": len(dimensions.airports),
+                "users": self.volumes["users"],
+                "flights": sum(flights for flights, _ in plans),
+                "bookings": sum(bookings for _, bookings in plans),
+                "reviews": self.volumes["reviews"],
+            }
+            if dry_run:
+                return {"planned": planned}
+
+            # Справочники грузятся в обычном режиме: триггеры версий сбросят кеш справочников
+            async with pool.acquire() as conn:
+                await conn.copy_records_to_table("airlines", records=dimensions.airline_records(),
+                                                 columns=("airline_id", "name", "code", "country"))
+                await conn.copy_records_to_table("airports", records=dimensions.airport_records(),
+                                                 columns=("airport_id", "name", "city", "country"))
+
+            loaded = {"airlines": len(dimensions.airlines), "airports": len(dimensions.airports)}
+            users = self.volumes["users"]
+            loaded.update(await self._run_chunks(executor, "users", [
+                (load_user_chunk, self.db_config, self.seed, chunk, bases["users"] + 1 + start,
+                 min(ROWS_PER_CHUNK, users - start), password_hash)
+                for chunk, start in enumerate(range(0, users, ROWS_PER_CHUNK))
+            ]))
+            loaded.update(await self._run_chunks(executor, "flights", [
+                (load_flight_chunk, self.db_config, spec) for spec in specs
+            ]))
+            airlines = [(airline[0], airline[4]) for airline in dimensions.airlines]
+            reviews = self.volumes["reviews"]
+            loaded.update(await self._run_chunks(executor, "reviews", [
+                (load_review_chunk, self.db_config, self.seed, chunk, bases["reviews"] + 1 + start,
+                 min(ROWS_PER_CHUNK, reviews - start), bases["users"], users, airlines, dimensions.airline_cum)
+                for chunk, start in enumerate(range(0, reviews, ROWS_PER_CHUNK))
+            ]))
+
+        async with pool.acquire() as conn:
+            for table, column in _SEQUENCES:
+                await conn.execute(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', '{column}'), "
+                    f"(SELECT COALESCE(MAX({column}), 1) FROM {table}))"
+                )
+            await conn.execute("CALL rebuild_airline_rating_summary();")
+            for table, _ in _SEQUENCES + (("flight_search", None),):
+                await conn.execute(f"ANALYZE {table}")
+        return {"planned": planned, "loaded": loaded, "seconds": time.perf_counter() - started}
@@ -1,5 +1,4 @@
 import os
-import redis
 from dotenv import load_dotenv
 
 load_dotenv("env.env")
@@ -27,12 +26,64 @@ REDIS_CONFIG = {
 
 POOL_MIN_CONN = int(os.getenv("POOL_MIN_CONN", 1))
 POOL_MAX_CONN = int(os.getenv("POOL_MAX_CONN", 10))
+POOL_ACQUIRE_TIMEOUT = float(os.getenv("POOL_ACQUIRE_TIMEOUT", 10))
+POOL_HEALTHCHECK_INTERVAL = float(os.getenv("POOL_HEALTHCHECK_INTERVAL", 30))
+POOL_MAX_INACTIVE_LIFETIME = float(os.getenv("POOL_MAX_INACTIVE_LIFETIME", 300))
+# Подготовленных операторов на соединение; должно вмещать все запросы реестра
+POOL_STATEMENT_CACHE_SIZE = int(os.getenv("POOL_STATEMENT_CACHE_SIZE", 256))
+# Порт для /metrics в формате Prometheus; не задан - сервер метрик не запускается
+METRICS_PORT = int(os.getenv("METRICS_PORT")) if os.getenv("METRICS_PORT") else None
 
 REDIS_KEY_PREFIX = "aviapp:"
 TOKEN_TTL = int(os.getenv("REDIS_TOKEN_TTL", 3600))
 SESSION_TTL = int(os.getenv("REDIS_SESSION_TTL", 1800))
+# Сколько секунд проверенный токен принимается без обращения к Redis
+SESSION_LOCAL_TTL = float(os.getenv("SESSION_LOCAL_TTL", 5))
+SESSION_LOCAL_MAX_SIZE = int(os.getenv("SESSION_LOCAL_MAX_SIZE", 10000))
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+# Одновременных вычислений bcrypt и запросов в очереди сверх них; остальные сразу отклоняются
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 4))
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", 32))
 
 CITIES_TTL = int(os.getenv("REDIS_TOKEN_TTL", 86400 * 7))
 AIRPORTS_TTL = int(os.getenv("REDIS_TOKEN_TTL", 86400 * 7))
-def get_redis():
-    return redis.Redis(**REDIS_CONFIG)
\ No newline at end of file
+AIRLINES_TTL = int(os.getenv("AIRLINES_TTL", 86400 * 7))
+# Локальный уровень кеша справочников; TTL ограничивает устаревание, если сброс через pub/sub потерян
+REFERENCE_LOCAL_TTL = float(os.getenv("REFERENCE_LOCAL_TTL", 60))
+REFERENCE_LOCAL_MAX_SIZE = int(os.getenv("REFERENCE_LOCAL_MAX_SIZE", 1000))
+# Сколько ещё отдавать справочник после истечения TTL, пока он обновляется в фоне
+REFERENCE_STALE_TTL = int(os.getenv("REFERENCE_STALE_TTL", 3600))
+RATING_SUMMARY_TTL = int(os.getenv("RATING_SUMMARY_TTL", 30))
+SINGLE_FLIGHT_LOCK_TTL = float(os.getenv("SINGLE_FLIGHT_LOCK_TTL", 10))
+SINGLE_FLIGHT_WAIT_INTERVAL = float(os.getenv("SINGLE_FLIGHT_WAIT_INTERVAL", 0.05))
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", 600))
+BOOKING_STREAM_MAXLEN = int(os.getenv("BOOKING_STREAM_MAXLEN", 100000))
+BOOKING_NOTIFY_QUEUE_SIZE = int(os.getenv("BOOKING_NOTIFY_QUEUE_SIZE", 100))
+# Должно быть меньше REDIS_SOCKET_TIMEOUT, иначе блокирующее чтение оборвётся по таймауту
+BOOKING_NOTIFY_BLOCK_MS = int(os.getenv("BOOKING_NOTIFY_BLOCK_MS", 2000))
+BOOKING_NOTIFY_INTERVAL = float(os.getenv("BOOKING_NOTIFY_INTERVAL", 5))
+
+# Удержание мест в Redis должно пережить запись брони в Postgres
+SEAT_HOLD_TTL = float(os.getenv("SEAT_HOLD_TTL", 30))
+SEAT_RECONCILE_INTERVAL = float(os.getenv("SEAT_RECONCILE_INTERVAL", 60))
+SEAT_RECONCILE_BATCH = int(os.getenv("SEAT_RECONCILE_BATCH", 500))
+
+FLIGHT_TEMPLATE_HORIZON_DAYS = int(os.getenv("FLIGHT_TEMPLATE_HORIZON_DAYS", 90))
+FLIGHT_TEMPLATE_BATCH_SIZE = int(os.getenv("FLIGHT_TEMPLATE_BATCH_SIZE", 50))
+
+# Профилирование reruns: включается PROFILE_RENDERS=1, медленные попадают в PROFILE_DIR/slow_renders.jsonl.
+# PROFILE_SAMPLE_RATE - доля reruns под cProfile, дамп сохраняется только для медленных
+PROFILE_RENDERS = os.getenv("PROFILE_RENDERS", "0") == "1"
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", 1000))
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_HISTORY_SIZE = int(os.getenv("PROFILE_HISTORY_SIZE", 500))
+
+EXPORT_DIR = os.getenv("EXPORT_DIR", "exports")
+EXPORT_DOWNLOAD_LIMIT_MB = int(os.getenv("EXPORT_DOWNLOAD_LIMIT_MB", 50))
+
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 50))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", 5))
+REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", 5))
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", 30))